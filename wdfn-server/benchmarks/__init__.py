@@ -0,0 +1,71 @@
+"""
+Performance benchmarks for the WDFN server. They are not run as part of the test suite.
+Run a benchmark from the wdfn-server directory, for example:
+
+    env/bin/python -m benchmarks.time_zone_engines --help
+"""
+import statistics
+import time
+import tracemalloc
+
+
+def time_calls(func, args_list):
+    """
+    Call func once for each set of arguments in args_list.
+
+    :param callable func:
+    :param list args_list: list of argument tuples
+    :return: latency of each call in seconds
+    :rtype: list
+    """
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize_latencies(latencies):
+    """
+    :param list latencies: seconds
+    :return: mean, median and 95th percentile in milliseconds
+    :rtype: dict
+    """
+    ordered = sorted(latencies)
+    return {
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000
+    }
+
+
+def measure_allocations(func, *args, **kwargs):
+    """
+    Call func and measure the memory it allocates with tracemalloc.
+
+    :param callable func:
+    :return: the value returned by func, bytes still allocated after the call and peak bytes allocated
+    :rtype: tuple
+    """
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def print_table(headers, rows):
+    """
+    Print rows as a plain text table.
+
+    :param list headers: column names
+    :param list rows: list of row values
+    """
+    text_rows = [[f'{value:.3f}' if isinstance(value, float) else str(value) for value in row] for row in rows]
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *text_rows)]
+    print('  '.join(header.ljust(width) for header, width in zip(headers, widths)))
+    for row in text_rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,81 @@
+"""
+Compare the bytes on the wire and the CPU cost of compressing typical responses at each gzip and brotli level.
+
+The responses are the home page, a monitoring location page and its JSON summary, rendered with the test
+client from the mock site data. Brotli levels are only measured if the brotli package is installed.
+"""
+import argparse
+import gzip
+from unittest import mock
+
+from waterdata import app
+from waterdata.static_pages import clear_static_pages
+from waterdata.tests.mock_test_data import SITE_RDB, PARAMETER_RDB
+from waterdata.utils import parse_rdb
+
+from . import print_table, summarize_latencies, time_calls
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # pylint: disable=C0103
+
+GZIP_LEVELS = [1, 4, 6, 9]
+BROTLI_QUALITIES = [1, 4, 5, 9, 11]
+
+
+def render_responses():
+    """
+    :return: name and uncompressed body of each response
+    :rtype: list
+    """
+    site_data = (200, 'OK', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+    period_of_record = (200, 'OK', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+    clear_static_pages()
+    with mock.patch.dict(app.config, {'COMPRESSION_MIN_SIZE': None, 'PAGE_CACHE_MAX_ENTRIES': 0}), \
+            mock.patch('waterdata.views.site_service.get_site_data', return_value=site_data), \
+            mock.patch('waterdata.views.site_service.get_period_of_record', return_value=period_of_record), \
+            mock.patch('waterdata.views.sifta_service.get', return_value=(200, 'OK', [])), \
+            mock.patch('waterdata.views.time_zone_service.get_iana_time_zone', return_value='America/New_York'), \
+            mock.patch('waterdata.views.get_monitoring_location_camera_details', return_value=[]):
+        client = app.test_client()
+        return [
+            ('home', client.get('/').data),
+            ('monitoring location', client.get('/monitoring-location/01630500/').data),
+            ('summary JSON', client.get('/api/v1/monitoring-location/01630500/').data)
+        ]
+
+
+def get_compressors():
+    """
+    :return: name and function of each encoding and level
+    :rtype: list
+    """
+    compressors = [(f'gzip {level}', lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0))
+                   for level in GZIP_LEVELS]
+    if brotli is not None:
+        compressors.extend((f'br {quality}', lambda body, quality=quality: brotli.compress(body, quality=quality))
+                           for quality in BROTLI_QUALITIES)
+    return compressors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50, help='compressions of each response at each level')
+    args = parser.parse_args()
+
+    rows = []
+    for name, body in render_responses():
+        rows.append([name, 'identity', len(body), 1.0, 0.0, 0.0])
+        for compressor_name, compressor in get_compressors():
+            compressed_size = len(compressor(body))
+            latency = summarize_latencies(time_calls(compressor, [(body,)] * args.repeat))
+            rows.append([name, compressor_name, compressed_size, len(body) / compressed_size, latency['mean_ms'],
+                         len(body) / 2 ** 20 / (latency['mean_ms'] / 1000)])
+    print_table(['response', 'encoding', 'bytes', 'ratio', 'CPU ms', 'MB/s'], rows)
+    if brotli is None:
+        print('Install the brotli package to also measure brotli.')
+
+
+if __name__ == '__main__':
+    main()
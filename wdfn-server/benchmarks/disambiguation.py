@@ -0,0 +1,128 @@
+"""
+Measure get_disambiguated_values over synthetic periods of record of realistic sizes, using the lookup
+files in the data directory.
+
+The indexed implementation is compared with the previous one, which looked up state abbreviations by
+scanning US_STATES and walked the nested lookups for every series. Both the series indexes (without
+political units, as used for the period of record) and the site indexes are measured.
+"""
+import argparse
+import random
+import time
+
+from waterdata import app
+from waterdata.constants import US_STATES
+from waterdata.location_utils import LookupIndexes, get_disambiguated_values
+
+from . import print_table, summarize_latencies, time_calls
+
+DATA_TYPES = ['uv', 'dv', 'gw', 'qw', 'pk', 'sv', 'ad', 'aw']
+
+
+def legacy_get_disambiguated_values(location, code_lookups, country_state_county_lookups, huc_lookups):
+    """
+    get_disambiguated_values as it was before the lookup indexes were added
+    """
+    # pylint: disable=R0912,R0914
+    def get_state_abbreviation(state_full_name):
+        state = filter(lambda record: record['name'] == state_full_name, US_STATES)
+        try:
+            return next(state).get('abbreviation')
+        except StopIteration:
+            return None
+
+    def get_state_name(country_code, state_code):
+        country_lookup = country_state_county_lookups.get(country_code, {})
+        return country_lookup.get('state_cd', {}).get(state_code, {}).get('name')
+
+    transformed_location = {}
+    country_code = location.get('country_cd')
+    state_code = location.get('state_cd')
+    county_code = location.get('county_cd')
+    district_code = location.get('district_cd')
+    for (key, value) in location.items():
+        if key == 'state_cd' and country_code and state_code:
+            state_name = get_state_name(country_code, state_code)
+            transformed_value = {'name': state_name or state_code,
+                                 'abbreviation': get_state_abbreviation(state_name),
+                                 'code': state_code if state_name != state_code else None}
+        elif key == 'district_cd' and country_code and district_code:
+            state_name = get_state_name(country_code, district_code)
+            transformed_value = {'name': state_name or district_code,
+                                 'abbreviation': get_state_abbreviation(state_name),
+                                 'code': district_code if state_name != district_code else None}
+        elif key == 'county_cd' and country_code and state_code:
+            state_lookup = country_state_county_lookups.get(country_code, {}).get('state_cd', {}).get(state_code, {})
+            county_name = state_lookup.get('county_cd', {}).get(county_code, {}).get('name')
+            transformed_value = {'name': county_name or county_code,
+                                 'code': county_code if county_name != county_code else None}
+        elif key in code_lookups:
+            if key == 'parm_grp_cd':
+                value_dict = code_lookups.get(key).get(value)
+                if value_dict is None:
+                    parameter_metadata = code_lookups.get('parm_cd').get(location['parm_cd']) or {}
+                    value_dict = {'name': parameter_metadata.get('group', value)}
+            else:
+                value_dict = code_lookups.get(key).get(value) or {'name': value}
+            transformed_value = dict(code=value, **value_dict)
+        elif key == 'huc_cd':
+            transformed_value = {'name': huc_lookups['hucs'].get(value, {}).get('huc_nm'), 'code': value}
+        else:
+            transformed_value = {'name': value, 'code': value}
+        transformed_location[key] = transformed_value
+    return transformed_location
+
+
+def synthetic_period_of_record(size, rng):
+    """
+    Return size period of record series for a site in Wisconsin.
+    """
+    parm_cds = list(app.config['NWIS_CODE_LOOKUP']['parm_cd'])
+    return [{
+        'agency_cd': 'USGS', 'site_no': '05427718', 'station_nm': 'YAHARA RIVER AT WINDSOR, WI',
+        'site_tp_cd': 'ST', 'dec_lat_va': '43.2091667', 'dec_long_va': '-89.3530556', 'coord_acy_cd': 'S',
+        'dec_coord_datum_cd': 'NAD83', 'alt_va': '880', 'alt_acy_va': '.1', 'alt_datum_cd': 'NAVD88',
+        'country_cd': 'US', 'state_cd': '55', 'district_cd': '55', 'county_cd': '025', 'huc_cd': '07090001',
+        'data_type_cd': rng.choice(DATA_TYPES), 'parm_cd': rng.choice(parm_cds), 'stat_cd': '',
+        'ts_id': str(index), 'loc_web_ds': '', 'medium_grp_cd': 'wat',
+        'parm_grp_cd': rng.choice(['', 'PHY', 'INF', 'NUT']), 'srs_id': '1645597', 'access_cd': '0',
+        'begin_date': '2007-10-01', 'end_date': '2018-01-10', 'count_nu': '3754'
+    } for index in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200, 1000])
+    parser.add_argument('--repeat', type=int, default=50, help='number of times to disambiguate each record')
+    args = parser.parse_args()
+
+    code_lookups = app.config['NWIS_CODE_LOOKUP']
+    country_state_county_lookups = app.config['COUNTRY_STATE_COUNTY_LOOKUP']
+    huc_lookups = app.config['HUC_LOOKUP']
+    start = time.perf_counter()
+    site_indexes = LookupIndexes(code_lookups, country_state_county_lookups, huc_lookups)
+    series_indexes = site_indexes.without_political_units()
+    print(f'Built indexes in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    implementations = [
+        ('legacy series', lambda record: [legacy_get_disambiguated_values(series, code_lookups, {}, huc_lookups)
+                                          for series in record]),
+        ('indexed series', lambda record: [get_disambiguated_values(series, series_indexes) for series in record]),
+        ('legacy site', lambda record: [legacy_get_disambiguated_values(
+            series, code_lookups, country_state_county_lookups, huc_lookups) for series in record]),
+        ('indexed site', lambda record: [get_disambiguated_values(series, site_indexes) for series in record])
+    ]
+    rng = random.Random(1)
+    rows = []
+    with app.test_request_context():
+        for size in args.sizes:
+            record = synthetic_period_of_record(size, rng)
+            for name, func in implementations:
+                latency = summarize_latencies(time_calls(func, [(record,)] * args.repeat))
+                rows.append([size, name, latency['mean_ms'], latency['p50_ms'], latency['p95_ms'],
+                             size / latency['mean_ms'] * 1000])
+    print_table(['series', 'implementation', 'mean ms', 'p50 ms', 'p95 ms', 'series/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Compare sync and gevent gunicorn workers serving monitoring location pages while the upstream services
+are slow.
+
+The site, cooperator, time zone and network services are replaced by a local stub which takes --delay
+seconds to respond. --concurrency clients request monitoring location pages in a loop for --duration
+seconds against each configuration:
+
+- sync with 1 worker, which serves one request at a time
+- sync with as many preloaded workers as there are clients
+- gevent with 1 worker
+
+The page and service caches are disabled so every request waits for the stub. Memory is the total PSS of
+the gunicorn master and workers, read from /proc while the clients are running, so this benchmark only
+runs on Linux.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+import config
+
+from . import print_table, summarize_latencies
+from .preload import CONFIG_TEMPLATE, read_memory
+
+SITE_NUMBERS = ['01630500', '01646500', '05427718', '04891899']
+
+
+def create_app():
+    """
+    Application factory used by gunicorn in the benchmark. The upstream endpoints are pointed at the stub
+    server before the application is imported.
+    """
+    stub_url = os.environ['BENCHMARK_STUB_URL']
+    config.SITE_DATA_ENDPOINT = f'{stub_url}/nwis/site/'
+    config.COOPERATOR_SERVICE_ENDPOINT = f'{stub_url}/customer/stories/'
+    config.WEATHER_SERVICE_ENDPOINT = stub_url
+    config.MONITORING_LOCATIONS_OBSERVATIONS_ENDPOINT = f'{stub_url}/collections/'
+    config.MONITORING_LOCATION_CAMERA_ENABLED = False
+    config.PAGE_CACHE_MAX_ENTRIES = 0
+    config.SITE_PAGE_MODEL_CACHE_MAX_ENTRIES = 0
+    from waterdata import app  # pylint: disable=C0415
+    return app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(worker_class, workers, stub_url, temp_dir, timeout):
+    """
+    Start gunicorn and wait for its workers to be ready.
+
+    :return: the gunicorn process, its URL and the worker pids
+    """
+    server_dir = os.path.dirname(os.path.abspath(config.__file__))
+    config_path = os.path.join(temp_dir, 'gunicorn.conf.py')
+    ready_path = os.path.join(temp_dir, f'{worker_class}_{workers}.ready')
+    with open(config_path, 'w') as config_file:
+        config_file.write(CONFIG_TEMPLATE.format(config_path=os.path.join(server_dir, 'gunicorn.conf.py')))
+    port = free_port()
+    env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_PRELOAD=str(workers > 1).lower(), BENCHMARK_READY_FILE=ready_path,
+               BENCHMARK_STUB_URL=stub_url)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', config_path, '--bind', f'127.0.0.1:{port}',
+         '--timeout', '120', 'benchmarks.gevent_workers:create_app()'],
+        cwd=server_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    start = time.perf_counter()
+    worker_pids = []
+    while len(worker_pids) < workers:
+        if time.perf_counter() - start > timeout:
+            process.kill()
+            raise RuntimeError(f'{workers} {worker_class} workers did not start within {timeout} seconds')
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with {process.returncode}')
+        time.sleep(0.05)
+        if os.path.exists(ready_path):
+            with open(ready_path, 'r') as ready_file:
+                worker_pids = [int(line) for line in ready_file if line.strip()]
+    return process, f'http://127.0.0.1:{port}', worker_pids
+
+
+def run_clients(url, concurrency, duration, on_loaded):
+    """
+    Request monitoring location pages from concurrency threads for duration seconds. on_loaded is called
+    once all of the clients are running.
+
+    :return: latencies in seconds of the successful requests and the number of failed requests
+    """
+    latencies = []
+    failures = []
+    deadline = time.monotonic() + duration
+    started = threading.Barrier(concurrency + 1)
+
+    def run_client(index):
+        site_no = SITE_NUMBERS[index % len(SITE_NUMBERS)]
+        started.wait()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = requests.get(f'{url}/monitoring-location/{site_no}/?agency_cd=USGS', timeout=60)
+                ok = response.status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures.append(1)
+
+    threads = [threading.Thread(target=run_client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    # Let the workers fill up with requests before measuring them
+    time.sleep(min(duration / 2, 2))
+    on_loaded()
+    for thread in threads:
+        thread.join()
+    return latencies, len(failures)
+
+
+def main():
+    from waterdata.tests.mock_test_data import SITE_RDB, PARAMETER_RDB  # pylint: disable=C0415
+    from waterdata.tests.stub_server import StubRoute, StubServer  # pylint: disable=C0415
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--delay', type=float, default=0.3, help='upstream response time in seconds')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for the workers')
+    args = parser.parse_args()
+
+    routes = {
+        '/nwis/site/?format=rdb&sites=': StubRoute(SITE_RDB, delay=args.delay),
+        # The period of record request also asks for the series catalog
+        **{f'/nwis/site/?format=rdb&sites={site_no}&seriesCatalogOutput': StubRoute(PARAMETER_RDB, delay=args.delay)
+           for site_no in SITE_NUMBERS},
+        '/customer/stories/': StubRoute('{"Customers": []}', delay=args.delay, content_type='application/json'),
+        '/points/': StubRoute('{"properties": {"timeZone": "America/New_York"}}', delay=args.delay,
+                              content_type='application/json')
+    }
+    configurations = [('sync', 1), ('sync', args.concurrency), ('gevent', 1)]
+    rows = []
+    with StubServer(routes) as stub, tempfile.TemporaryDirectory() as temp_dir:
+        for worker_class, workers in configurations:
+            process, url, worker_pids = start_gunicorn(worker_class, workers, stub.url, temp_dir, args.timeout)
+            memory = {}
+
+            def measure_memory():
+                # pylint: disable=W0640
+                memory['pss'] = sum(read_memory(pid)[1] for pid in [process.pid] + worker_pids)
+
+            try:
+                latencies, failures = run_clients(url, args.concurrency, args.duration, measure_memory)
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait()
+            in_flight = min(args.concurrency, workers) if worker_class == 'sync' else args.concurrency
+            latency = summarize_latencies(latencies) if latencies else {'p50_ms': 0.0, 'p95_ms': 0.0}
+            rows.append([
+                worker_class, workers, len(latencies) / args.duration, latency['p50_ms'], latency['p95_ms'],
+                failures, memory['pss'] / 2 ** 20, memory['pss'] / in_flight / 2 ** 20
+            ])
+    print_table(['worker class', 'workers', 'pages/s', 'p50 ms', 'p95 ms', 'failures', 'total PSS MB',
+                 'PSS MB per in-flight request'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Compare startup time and per-worker memory of loading the lookups from the JSON files with reading them
+from the compiled lookup store.
+
+--workers processes are started for each mode, like gunicorn workers on one host. Each loads the lookups
+the way waterdata/__init__.py does, reads the values used by a monitoring location page and then waits
+until every worker is ready before reporting its RSS and PSS. PSS divides shared pages between the
+processes sharing them, so it is the better measure of what each worker adds to a host. PSS is read from
+/proc/self/smaps_rollup and is only reported on Linux.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+
+from . import print_table
+
+MODES = ['json', 'store']
+
+
+def _import_lookups_module():
+    """
+    Import waterdata/lookups.py without importing the waterdata package, which would create the
+    application and load the lookups itself.
+    """
+    path = os.path.join(os.path.dirname(config.__file__), 'waterdata', 'lookups.py')
+    spec = importlib.util.spec_from_file_location('lookups', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _read_lookups(mode, store_path):
+    lookups_module = _import_lookups_module()
+    if mode == 'json':
+        lookups = {}
+        for name, filename_key, _ in lookups_module.LOOKUPS:
+            with open(os.path.join(config.DATA_DIR, getattr(config, filename_key)), 'r') as lookup_file:
+                lookups[name] = json.loads(lookup_file.read())
+        return lookups
+    store = lookups_module.LookupStore(store_path)
+    return {name: store.lookup(name) for name, _, _ in lookups_module.LOOKUPS}
+
+
+def _touch_lookups(lookups):
+    """Read the values used by a monitoring location page"""
+    codes = lookups['NWIS_CODE_LOOKUP']
+    for code, value in [('site_tp_cd', 'ST'), ('agency_cd', 'USGS'), ('coord_acy_cd', 'S'),
+                        ('alt_datum_cd', 'NAVD88'), ('reliability_cd', 'C')]:
+        codes.get(code, {}).get(value)
+    lookups['COUNTRY_STATE_COUNTY_LOOKUP']['US']['state_cd']['55']['county_cd'].get('025')
+    lookups['HUC_LOOKUP']['hucs'].get('07090001')
+
+
+def _memory():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    memory = {'peak_rss': max_rss if sys.platform == 'darwin' else max_rss * 1024, 'rss': None, 'pss': None}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as smaps:
+            for line in smaps:
+                field, value = line.split(':', 1)
+                if field in ('Rss', 'Pss'):
+                    memory[field.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return memory
+
+
+def run_case(mode, store_path):
+    """
+    Load and read the lookups, report the elapsed seconds, then report memory use once a line is read
+    from stdin.
+    """
+    start = time.perf_counter()
+    lookups = _read_lookups(mode, store_path)
+    _touch_lookups(lookups)
+    print(json.dumps({'seconds': time.perf_counter() - start}), flush=True)
+    sys.stdin.readline()
+    print(json.dumps(_memory()), flush=True)
+
+
+def run_workers(mode, store_path, workers):
+    """
+    Start workers processes for mode and return a list of their results.
+    """
+    processes = [
+        subprocess.Popen([sys.executable, '-m', 'benchmarks.lookup_store', '--run-case', mode, store_path],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    results = [json.loads(process.stdout.readline()) for process in processes]
+    for process in processes:
+        process.stdin.write('\n')
+        process.stdin.flush()
+    for process, result in zip(processes, results):
+        result.update(json.loads(process.stdout.readline()))
+        process.communicate()
+    return results
+
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 9])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--run-case', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case(*args.run_case)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store_path = os.path.join(temp_dir, 'lookups.sqlite')
+        start = time.perf_counter()
+        _import_lookups_module().compile_lookup_files(vars(config), store_path)
+        print(f'Compiled {os.path.getsize(store_path) / 2 ** 20:.1f} MB store in '
+              f'{time.perf_counter() - start:.2f} s')
+        for workers in args.workers:
+            for mode in args.modes:
+                results = run_workers(mode, store_path, workers)
+                rows.append([
+                    workers, mode,
+                    _mean([result['seconds'] for result in results]) * 1000,
+                    _mean([result['rss'] for result in results]) / 2 ** 20,
+                    _mean([result['pss'] for result in results]) / 2 ** 20,
+                    sum(result['pss'] or 0 for result in results) / 2 ** 20
+                ])
+    print_table(['workers', 'mode', 'load ms', 'RSS MB', 'PSS MB', 'total PSS MB'], rows)
+
+
+if __name__ == '__main__':
+    main()
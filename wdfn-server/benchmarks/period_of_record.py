@@ -0,0 +1,126 @@
+"""
+Measure the period of record aggregation over synthetic series catalogs of 100 to 10,000 series.
+
+Two steps are measured, each with the previous implementation and the current one:
+
+- periods: the merged uv and gw period of record of each parameter code. Previously the records were read
+  once for each data type and dates were parsed with strptime on every comparison.
+- rollup: rollup_dataseries, which previously parsed every begin and end date with pendulum. The current
+  implementation is measured with an empty date cache, as for the first request after a worker starts, and
+  with the cache filled. The legacy case only replaces the date parsing.
+"""
+import argparse
+from datetime import datetime
+import random
+from unittest import mock
+
+import pendulum
+
+from waterdata import location_utils
+
+from . import print_table, summarize_latencies, time_calls
+
+DATA_TYPES = ['uv', 'dv', 'gw', 'qw', 'pk', 'sv']
+GROUPS = ['Physical', 'Information', 'Nutrient', 'Inorganics, Major, Metals', 'Organics, PCBs']
+
+
+def legacy_get_period_of_record_by_parm_cd(site_records, data_type_cd='uv'):
+    """
+    get_period_of_record_by_parm_cd as it was before get_periods_of_record was added
+    """
+    date_format = '%Y-%m-%d'
+    records_by_parm_cd = {}
+    for record in filter(lambda record: record['data_type_cd'] == data_type_cd, site_records):
+        this_parm_cd = record['parm_cd']
+        if this_parm_cd in records_by_parm_cd:
+            current = records_by_parm_cd[this_parm_cd]
+            if datetime.strptime(record['begin_date'], date_format) < \
+                    datetime.strptime(current['begin_date'], date_format):
+                current['begin_date'] = record['begin_date']
+            if datetime.strptime(record['end_date'], date_format) > \
+                    datetime.strptime(current['end_date'], date_format):
+                current['end_date'] = record['end_date']
+        else:
+            records_by_parm_cd[this_parm_cd] = {'begin_date': record['begin_date'], 'end_date': record['end_date']}
+    return records_by_parm_cd
+
+
+def synthetic_catalog(size, rng):
+    """
+    Return size series catalog records. Most series of a water-quality site share a few parameter codes and
+    active series end on the same day, so dates repeat as they do in real catalogs.
+    """
+    parm_cds = [f'{code:05d}' for code in rng.sample(range(1, 99999), max(size // 8, 10))]
+    records = []
+    for _ in range(size):
+        begin = pendulum.date(1900, 1, 1).add(days=rng.randrange(120 * 365))
+        end = pendulum.date(2021, 10, 1) if rng.random() < 0.6 else begin.add(days=rng.randrange(3650))
+        records.append({
+            'data_type_cd': rng.choice(DATA_TYPES),
+            'parm_cd': rng.choice(parm_cds),
+            'begin_date': begin.to_date_string(),
+            'end_date': end.to_date_string()
+        })
+    return records
+
+
+def disambiguated(records, rng):
+    """
+    Return the records in the form rollup_dataseries receives them.
+    """
+    return [{
+        'parm_cd': {'code': record['parm_cd'], 'name': f'Parameter {record["parm_cd"]}'},
+        'parm_grp_cd': {'code': '', 'name': rng.choice(GROUPS)},
+        'data_type_cd': {'code': record['data_type_cd'], 'name': record['data_type_cd']},
+        'begin_date': {'code': record['begin_date'], 'name': record['begin_date']},
+        'end_date': {'code': record['end_date'], 'name': record['end_date']}
+    } for record in records]
+
+
+def rollup_cold(series):
+    location_utils._parse_date.cache_clear()  # pylint: disable=W0212
+    return location_utils.rollup_dataseries(series)
+
+
+def rollup_legacy(series):
+    with mock.patch.object(location_utils, '_parse_date', pendulum.parse):
+        return location_utils.rollup_dataseries(series)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    rows = []
+    for size in args.sizes:
+        records = synthetic_catalog(size, rng)
+        series = disambiguated(records, rng)
+
+        # The legacy and current implementations must agree
+        assert location_utils.get_periods_of_record(records, ('uv', 'gw')) == {
+            data_type_cd: legacy_get_period_of_record_by_parm_cd(records, data_type_cd)
+            for data_type_cd in ('uv', 'gw')
+        }
+        assert rollup_legacy(series) == location_utils.rollup_dataseries(series)
+
+        cases = [
+            ('periods', 'legacy', lambda: [legacy_get_period_of_record_by_parm_cd(records, 'uv'),
+                                           legacy_get_period_of_record_by_parm_cd(records, 'gw')]),
+            ('periods', 'current, cold', lambda: [location_utils._parse_iso_date.cache_clear(),  # pylint: disable=W0212
+                                                  location_utils.get_periods_of_record(records, ('uv', 'gw'))]),
+            ('periods', 'current, warm', lambda: location_utils.get_periods_of_record(records, ('uv', 'gw'))),
+            ('rollup', 'legacy', lambda: rollup_legacy(series)),
+            ('rollup', 'current, cold', lambda: rollup_cold(series)),
+            ('rollup', 'current, warm', lambda: location_utils.rollup_dataseries(series))
+        ]
+        for step, implementation, func in cases:
+            latency = summarize_latencies(time_calls(func, [()] * args.repeat))
+            rows.append([size, step, implementation, latency['mean_ms'], latency['p95_ms']])
+    print_table(['series', 'step', 'implementation', 'mean ms', 'p95 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Compare startup time and memory of gunicorn with and without preloading the application.
+
+For each number of --workers, gunicorn is started with gunicorn.conf.py in each mode:
+
+- load: every worker imports the application and parses the lookups itself (GUNICORN_PRELOAD=false)
+- preload: the master loads the application and forks the workers from it (GUNICORN_PRELOAD=true)
+
+Startup time is measured until every worker has finished initializing. RSS and PSS are then read from
+/proc/<pid>/smaps_rollup for the master and each worker, so this benchmark only runs on Linux. PSS
+divides shared pages between the processes sharing them, so the total PSS is the memory used on the host.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+
+from . import print_table
+
+MODES = ['load', 'preload']
+
+CONFIG_TEMPLATE = '''
+import os
+
+exec(open({config_path!r}).read())
+
+
+def post_worker_init(worker):
+    with open(os.environ['BENCHMARK_READY_FILE'], 'a') as ready_file:
+        ready_file.write(str(os.getpid()) + '\\n')
+'''
+
+
+def read_memory(pid):
+    """
+    :param int pid:
+    :return: RSS and PSS of the process in bytes
+    :rtype: tuple
+    """
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as smaps:
+        for line in smaps:
+            field, value = line.split(':', 1)
+            if field in ('Rss', 'Pss'):
+                memory[field] = int(value.split()[0]) * 1024
+    return memory['Rss'], memory['Pss']
+
+
+def run_gunicorn(mode, workers, temp_dir, timeout):
+    """
+    Start gunicorn, wait for its workers to be ready and return the startup time in seconds and the
+    memory of the master and of each worker.
+    """
+    server_dir = os.path.dirname(os.path.abspath(config.__file__))
+    config_path = os.path.join(temp_dir, 'gunicorn.conf.py')
+    ready_path = os.path.join(temp_dir, f'{mode}_{workers}.ready')
+    with open(config_path, 'w') as config_file:
+        config_file.write(CONFIG_TEMPLATE.format(config_path=os.path.join(server_dir, 'gunicorn.conf.py')))
+    env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_PRELOAD=str(mode == 'preload').lower(),
+               BENCHMARK_READY_FILE=ready_path)
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', config_path,
+         '--bind', f'unix:{os.path.join(temp_dir, "gunicorn.sock")}', 'waterdata:app'],
+        cwd=server_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        worker_pids = []
+        while len(worker_pids) < workers:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f'{workers} {mode} workers did not start within {timeout} seconds')
+            if process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with {process.returncode}')
+            time.sleep(0.01)
+            if os.path.exists(ready_path):
+                with open(ready_path, 'r') as ready_file:
+                    worker_pids = [int(line) for line in ready_file if line.strip()]
+        elapsed = time.perf_counter() - start
+        return elapsed, read_memory(process.pid), [read_memory(pid) for pid in worker_pids]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 33])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for the workers')
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for workers in args.workers:
+            for mode in args.modes:
+                elapsed, (_, master_pss), worker_memory = run_gunicorn(mode, workers, temp_dir, args.timeout)
+                rows.append([
+                    workers, mode, elapsed,
+                    master_pss / 2 ** 20,
+                    sum(rss for rss, _ in worker_memory) / len(worker_memory) / 2 ** 20,
+                    sum(pss for _, pss in worker_memory) / len(worker_memory) / 2 ** 20,
+                    (master_pss + sum(pss for _, pss in worker_memory)) / 2 ** 20
+                ])
+    print_table(['workers', 'mode', 'startup s', 'master PSS MB', 'worker RSS MB', 'worker PSS MB',
+                 'total PSS MB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure throughput and peak memory of the RDB parsers over synthetic site listing files.
+
+Each combination of parser mode and file size runs in its own process so that its peak RSS is not
+affected by the other runs. The modes are:
+
+- dict_list: list(parse_rdb(...)), what SiteService.get does
+- dict_stream: consume parse_rdb(...) without keeping the rows
+- rows_list: list(parse_rdb_rows(...))
+- rows_stream: consume parse_rdb_rows(...) without keeping the rows
+- typed_rows_list: list(parse_rdb_rows(..., typed=True))
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import print_table
+
+HEADERS = ['agency_cd', 'site_no', 'station_nm', 'site_tp_cd', 'dec_lat_va', 'dec_long_va', 'coord_acy_cd',
+           'dec_coord_datum_cd', 'alt_va', 'alt_acy_va', 'alt_datum_cd', 'huc_cd']
+FORMATS = ['5s', '15s', '50s', '7s', '16n', '16n', '1s', '10s', '8n', '3n', '10s', '16s']
+MODES = ['dict_list', 'dict_stream', 'rows_list', 'rows_stream', 'typed_rows_list']
+
+
+def write_synthetic_rdb(path, row_count):
+    """
+    Write an RDB file with row_count site records to path.
+    """
+    rng = random.Random(row_count)
+    with open(path, 'w') as rdb_file:
+        rdb_file.write('#\n# Synthetic site listing\n#\n')
+        rdb_file.write('\t'.join(HEADERS) + '\n')
+        rdb_file.write('\t'.join(FORMATS) + '\n')
+        for index in range(row_count):
+            rdb_file.write('\t'.join([
+                'USGS', f'{index:08d}', f'SOME CREEK NEAR SOMEWHERE {index}', 'ST',
+                f'{rng.uniform(25, 49):.8f}', f'{rng.uniform(-124, -67):.8f}', 'S', 'NAD83',
+                f'{rng.uniform(0, 3000):.2f}', '.1', 'NAVD88', f'{rng.randrange(10 ** 8):08d}'
+            ]) + '\n')
+
+
+def run_case(mode, path):
+    """
+    Parse path with mode and return the elapsed seconds, row count and peak RSS in bytes.
+    """
+    # pylint: disable=C0415
+    from waterdata.utils import parse_rdb, parse_rdb_rows
+
+    start = time.perf_counter()
+    with open(path, 'r') as rdb_file:
+        lines = (line.rstrip('\n') for line in rdb_file)
+        if mode == 'dict_list':
+            count = len(list(parse_rdb(lines)))
+        elif mode == 'dict_stream':
+            count = sum(1 for _ in parse_rdb(lines))
+        elif mode == 'rows_list':
+            count = len(list(parse_rdb_rows(lines)))
+        elif mode == 'rows_stream':
+            count = sum(1 for _ in parse_rdb_rows(lines))
+        else:
+            count = len(list(parse_rdb_rows(lines, typed=True)))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'seconds': elapsed,
+        'rows': count,
+        'peak_rss': max_rss if sys.platform == 'darwin' else max_rss * 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000, 500000])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--run-case', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(*args.run_case)))
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in args.sizes:
+            path = os.path.join(temp_dir, f'sites_{size}.rdb')
+            write_synthetic_rdb(path, size)
+            for mode in args.modes:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.rdb_parser', '--run-case', mode, path],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                rows.append([size, mode, result['rows'] / result['seconds'], result['peak_rss'] / 2 ** 20])
+    print_table(['rows', 'mode', 'rows/s', 'peak RSS MB'], rows)
+
+
+if __name__ == '__main__':
+    main()
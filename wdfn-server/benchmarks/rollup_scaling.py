@@ -0,0 +1,141 @@
+"""
+Check that rollup_dataseries scales linearly with the number of series, up to 20,000 series.
+
+The time per series at the largest size must be within --tolerance times the time per series at the
+smallest size. Otherwise the benchmark exits with status 1. With --legacy, the previous implementation,
+which found the series without a parameter group with a list membership test, is timed alongside for
+comparison. It is quadratic, so it is only run up to --legacy-max series.
+"""
+import argparse
+import itertools
+import random
+import sys
+
+import pendulum
+
+from waterdata import location_utils
+from waterdata.location_utils import rollup_dataseries
+
+from . import print_table, summarize_latencies, time_calls
+
+PARAMETER_DATA_TYPES = [('uv', 'Unit Values'), ('dv', 'Daily Values'), ('qw', 'Water-quality')]
+OTHER_DATA_TYPES = [('ad', 'USGS Annual Water Data Reports Site'), ('pk', 'Peak Measurements'),
+                    ('sv', 'Site Visits'), ('gw', 'Groundwater levels')]
+GROUPS = [('PHY', 'Physical'), ('INF', 'Information'), ('NUT', 'Nutrient'), ('INM', 'Inorganics, Major, Metals'),
+          ('', 'Physical'), ('ALL', 'ALL')]
+
+
+def legacy_rollup_dataseries(dataseries):
+    """
+    rollup_dataseries as it was before it was rewritten as a single pass
+    """
+    def collapse(grouped_series, sort_data_col):
+        rolled_up_series = {}
+        for key, grp in grouped_series:
+            grp_pcode_series = []
+            for key_pc, pc_grp in itertools.groupby(sorted(grp, key=lambda item: item[sort_data_col]['code']),
+                                                    key=lambda item: item[sort_data_col]['code']):
+                series_by_pc = list(pc_grp)
+                grp_pcode_series.append({
+                    'start_date': min(pendulum.parse(series['begin_date']['code']) for series in series_by_pc),
+                    'end_date': max(pendulum.parse(series['end_date']['code']) for series in series_by_pc),
+                    'data_types': [series['data_type_cd']['name'] for series in series_by_pc],
+                    'parameter_code': key_pc,
+                    'parameter_name': series_by_pc[0]['parm_cd']['name']
+                })
+            rolled_up_series[key] = grp_pcode_series
+        return rolled_up_series
+
+    def summary(series_list, name=None):
+        return {
+            'name': name,
+            'start_date': min(series['start_date'] for series in series_list),
+            'end_date': max(series['end_date'] for series in series_list),
+            'data_types': ', '.join(sorted(set(itertools.chain.from_iterable(
+                series['data_types'] for series in series_list)))),
+            'parameters': series_list
+        }
+
+    display_series = list(itertools.filterfalse(
+        lambda x: x['parm_cd']['code'] == '' and x['parm_grp_cd']['code'] == '', dataseries))
+    other_series = [s for s in dataseries if s not in display_series]
+    by_group = collapse(itertools.groupby(sorted(display_series, key=lambda item: item['parm_grp_cd']['name']),
+                                          key=lambda item: item['parm_grp_cd']['name']), 'parm_cd')
+    by_group.pop('ALL', None)
+    by_data_type = collapse(itertools.groupby(sorted(other_series, key=lambda item: item['data_type_cd']['name']),
+                                              key=lambda item: item['data_type_cd']['name']), 'data_type_cd')
+    return [summary(v, k) for k, v in by_group.items()] + [summary(v) for v in by_data_type.values()]
+
+
+def synthetic_dataseries(size, rng):
+    """
+    Return size disambiguated data series like those of a heavily sampled water-quality site, where a
+    tenth of the series have no parameter code.
+    """
+    parm_cds = [f'{code:05d}' for code in rng.sample(range(1, 99999), max(size // 4, 10))]
+    dataseries = []
+    for index in range(size):
+        begin = pendulum.date(1950, 1, 1).add(days=rng.randrange(70 * 365))
+        end = begin.add(days=rng.randrange(3650))
+        if rng.random() < 0.1:
+            data_type_cd, data_type_name = rng.choice(OTHER_DATA_TYPES)
+            parm_cd, parm_grp_cd, group_name = '', '', ''
+        else:
+            data_type_cd, data_type_name = rng.choice(PARAMETER_DATA_TYPES)
+            parm_cd = rng.choice(parm_cds)
+            parm_grp_cd, group_name = rng.choice(GROUPS)
+        dataseries.append({
+            'site_no': {'code': '04891899', 'name': '04891899'},
+            'ts_id': {'code': str(index), 'name': str(index)},
+            'data_type_cd': {'code': data_type_cd, 'name': data_type_name},
+            'parm_cd': {'code': parm_cd, 'name': f'Parameter {parm_cd}'},
+            'parm_grp_cd': {'code': parm_grp_cd, 'name': group_name},
+            'begin_date': {'code': begin.to_date_string(), 'name': begin.to_date_string()},
+            'end_date': {'code': end.to_date_string(), 'name': end.to_date_string()}
+        })
+    return dataseries
+
+
+def rollup_cold(dataseries):
+    """
+    Roll up dataseries with an empty date cache. Whether dates are found in the cache depends on its size
+    rather than on the rollup, so the cache is cleared to time every size the same way.
+    """
+    location_utils._parse_date.cache_clear()  # pylint: disable=W0212
+    return rollup_dataseries(dataseries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1250, 2500, 5000, 10000, 20000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=2.5,
+                        help='largest allowed ratio of the time per series at the largest and smallest sizes')
+    parser.add_argument('--legacy', action='store_true', help='also time the previous implementation')
+    parser.add_argument('--legacy-max', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    rows = []
+    per_series = {}
+    for size in sorted(args.sizes):
+        dataseries = synthetic_dataseries(size, rng)
+        latency = summarize_latencies(time_calls(rollup_cold, [(dataseries,)] * args.repeat))
+        per_series[size] = latency['p50_ms'] * 1000 / size
+        rows.append([size, 'current', latency['p50_ms'], per_series[size]])
+        if args.legacy and size <= args.legacy_max:
+            assert legacy_rollup_dataseries(dataseries) == rollup_dataseries(dataseries)
+            latency = summarize_latencies(time_calls(legacy_rollup_dataseries, [(dataseries,)] * args.repeat))
+            rows.append([size, 'legacy', latency['p50_ms'], latency['p50_ms'] * 1000 / size])
+    print_table(['series', 'implementation', 'p50 ms', 'us/series'], rows)
+
+    smallest, largest = min(per_series), max(per_series)
+    ratio = per_series[largest] / per_series[smallest]
+    print(f'Time per series at {largest} series is {ratio:.2f} times that at {smallest} series '
+          f'(tolerance {args.tolerance})')
+    if ratio > args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
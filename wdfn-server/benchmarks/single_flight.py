@@ -0,0 +1,116 @@
+"""
+Load test of a flood event: many concurrent requests for the same few monitoring locations, measured as the
+number of requests the site service sends upstream.
+
+Every simulated worker process runs --threads threads which call get_site_data for one of --sites sites
+in a loop for --duration seconds. The upstream site service is a local stub which takes --delay seconds
+to respond. Four modes are compared:
+
+- none: no cache and no single-flight, as before the requests were deduplicated
+- single-flight: concurrent identical requests within a worker share one upstream call
+- shared cache: single-flight and a SQLite cache shared by the workers, with a --ttl second time to live so
+  that the sites keep expiring during the test
+- shared cache and locks: as shared cache, and one worker at a time fetches a missing site while the
+  others wait for it to be cached
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from waterdata.services.cache import ServiceCache, SqliteCacheBackend
+from waterdata.services.nwissite import SiteService
+from waterdata.services.single_flight import FileLockStore
+from waterdata.tests.mock_test_data import SITE_RDB
+from waterdata.tests.stub_server import StubRoute, StubServer
+
+from . import print_table
+
+MODES = ['none', 'single-flight', 'shared cache', 'shared cache and locks']
+
+
+def create_site_service(mode, endpoint, temp_dir, ttl):
+    """
+    Return a SiteService configured for mode.
+    """
+    if mode == 'none':
+        site_service = SiteService(endpoint)
+        site_service.flights = None
+    elif mode == 'single-flight':
+        site_service = SiteService(endpoint)
+    else:
+        locks = FileLockStore(os.path.join(temp_dir, 'locks')) if mode == 'shared cache and locks' else None
+        backend = SqliteCacheBackend(os.path.join(temp_dir, 'cache.sqlite'))
+        site_service = SiteService(endpoint, cache=ServiceCache(backend, 'site', ttl, locks=locks))
+    return site_service
+
+
+def run_worker(mode, endpoint, temp_dir, args, results):
+    """
+    Simulate one worker process and put the number of completed calls in results.
+    """
+    site_service = create_site_service(mode, endpoint, temp_dir, args.ttl)
+    deadline = time.monotonic() + args.duration
+    counts = []
+
+    def run_thread(index):
+        count = 0
+        site_no = f'{index % args.sites:08d}'
+        while time.monotonic() < deadline:
+            site_service.get_site_data(site_no, 'USGS')
+            count += 1
+        counts.append(count)
+
+    threads = [threading.Thread(target=run_thread, args=(index,)) for index in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(sum(counts))
+
+
+def run_mode(mode, args):
+    """
+    :return: calls made by the workers and requests received by the upstream service
+    :rtype: tuple
+    """
+    route = StubRoute(SITE_RDB, delay=args.delay)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    with StubServer({'/nwis/site': route}) as server, tempfile.TemporaryDirectory() as temp_dir:
+        workers = [
+            context.Process(target=run_worker, args=(mode, f'{server.url}/nwis/site', temp_dir, args, results))
+            for _ in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        calls = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        return calls, route.call_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16, help='concurrent requests in each worker')
+    parser.add_argument('--sites', type=int, default=3, help='number of hot monitoring locations')
+    parser.add_argument('--delay', type=float, default=0.2, help='upstream response time in seconds')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds to run each mode')
+    parser.add_argument('--ttl', type=float, default=1.0, help='cache time to live in seconds')
+    args = parser.parse_args()
+
+    rows = []
+    baseline = None
+    for mode in MODES:
+        calls, upstream = run_mode(mode, args)
+        baseline = baseline or upstream
+        rows.append([mode, calls / args.duration, upstream / args.duration, upstream / calls,
+                     f'{(1 - upstream / baseline) * 100:.0f}%'])
+    print_table(['mode', 'calls/s', 'upstream QPS', 'upstream/call', 'upstream reduction'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare the cold start of a worker compiling the templates itself with loading them from the template
+bytecode cache created by the compile-templates management command.
+
+--workers processes are started one after another for each mode, each like a new gunicorn worker. Each
+loads the application, which prerenders the static pages, then requests a monitoring location page twice
+with the test client and the mock site data. The first request is the cold first request of the worker, the
+second shows the cost of rendering once the templates are loaded.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import config
+
+from . import print_table, summarize_latencies
+
+MODES = ['compile', 'bytecode']
+
+PATH = '/monitoring-location/01630500/'
+
+
+def run_case(mode, cache_dir):
+    """
+    Load the application, request the monitoring location page twice and report the elapsed seconds.
+    """
+    config.TEMPLATE_BYTECODE_CACHE_DIR = cache_dir if mode == 'bytecode' else None
+    start = time.perf_counter()
+    # pylint: disable=C0415
+    from waterdata import app
+    from waterdata.tests.mock_test_data import SITE_RDB, PARAMETER_RDB
+    from waterdata.utils import parse_rdb
+    startup = time.perf_counter() - start
+
+    site_data = (200, 'OK', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+    period_of_record = (200, 'OK', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+    latencies = []
+    with mock.patch.dict(app.config, {'PAGE_CACHE_MAX_ENTRIES': 0}), \
+            mock.patch('waterdata.views.site_service.get_site_data', return_value=site_data), \
+            mock.patch('waterdata.views.site_service.get_period_of_record', return_value=period_of_record), \
+            mock.patch('waterdata.views.sifta_service.get', return_value=(200, 'OK', [])), \
+            mock.patch('waterdata.views.time_zone_service.get_iana_time_zone', return_value='America/New_York'), \
+            mock.patch('waterdata.views.get_monitoring_location_camera_details', return_value=[]):
+        client = app.test_client()
+        for _ in range(2):
+            start = time.perf_counter()
+            response = client.get(PATH)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f'{PATH} returned {response.status_code}')
+    print(json.dumps({'startup': startup, 'first': latencies[0], 'second': latencies[1]}), flush=True)
+
+
+def run_worker(mode, cache_dir):
+    """
+    Run one worker process for mode and return its result.
+    """
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.template_cache', '--run-case', mode, cache_dir],
+                            stdout=subprocess.PIPE, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=10, help='worker processes started for each mode')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--run-case', nargs=2, metavar=('MODE', 'CACHE_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case(*args.run_case)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        subprocess.run([sys.executable, 'manage.py', 'compile-templates', '--output', cache_dir], check=True)
+        for mode in args.modes:
+            results = [run_worker(mode, cache_dir) for _ in range(args.workers)]
+            startup = summarize_latencies([result['startup'] for result in results])
+            first = summarize_latencies([result['first'] for result in results])
+            second = summarize_latencies([result['second'] for result in results])
+            rows.append([mode, startup['p50_ms'], first['p50_ms'], first['p95_ms'], second['p50_ms']])
+    print_table(['mode', 'startup ms', 'first request ms', 'first request p95 ms', 'second request ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
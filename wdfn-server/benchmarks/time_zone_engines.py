@@ -0,0 +1,83 @@
+"""
+Compare lookup latency and memory use of the time zone engines.
+
+The boundary engine uses --boundaries if given, otherwise a synthetic grid of polygons covering the
+conterminous US. The weather service engine is called through a local stub server which adds --delay
+seconds to each response, or the real weather service with --live.
+"""
+import argparse
+import json
+import math
+import random
+
+from waterdata.services.timezone import TimeZoneService
+from waterdata.services.timezone_boundaries import TimeZoneBoundaryResolver
+from waterdata.tests.stub_server import StubRoute, StubServer
+
+from . import measure_allocations, print_table, summarize_latencies, time_calls
+
+
+def synthetic_boundaries(cell_degrees=2.0, vertices=400):
+    """
+    Polygons covering the conterminous US, each a circle with the given number of vertices inscribed in a
+    cell so that point in polygon tests do as much work as real, detailed boundaries.
+    """
+    polygons = []
+    lon = -125.0
+    while lon < -66.0:
+        lat = 24.0
+        while lat < 50.0:
+            center_lon, center_lat, radius = lon + cell_degrees / 2, lat + cell_degrees / 2, cell_degrees / 2
+            ring = [[center_lon + radius * math.cos(2 * math.pi * i / vertices),
+                     center_lat + radius * math.sin(2 * math.pi * i / vertices)] for i in range(vertices)]
+            ring.append(ring[0])
+            polygons.append((f'Zone/{len(polygons)}', [ring]))
+            lat += cell_degrees
+        lon += cell_degrees
+    return polygons
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--boundaries', help='GeoJSON or index file of time zone boundaries')
+    parser.add_argument('--lookups', type=int, default=1000, help='number of lookups for the boundary engine')
+    parser.add_argument('--http-lookups', type=int, default=50, help='number of lookups for the weather service')
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds the stub weather service waits')
+    parser.add_argument('--live', action='store_true', help='call api.weather.gov instead of a stub')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    locations = [(f'{rng.uniform(25.0, 49.0):.4f}', f'{rng.uniform(-124.0, -67.0):.4f}')
+                 for _ in range(max(args.lookups, args.http_lookups))]
+
+    if args.boundaries:
+        resolver, retained, peak = measure_allocations(TimeZoneBoundaryResolver.from_file, args.boundaries)
+    else:
+        polygons = synthetic_boundaries()
+        resolver, retained, peak = measure_allocations(TimeZoneBoundaryResolver, polygons)
+    boundary_latency = summarize_latencies(time_calls(resolver.get_iana_time_zone, locations[:args.lookups]))
+
+    body = json.dumps({'properties': {'timeZone': 'America/Chicago'}})
+    if args.live:
+        service = TimeZoneService('https://api.weather.gov')
+        http_latency = summarize_latencies(time_calls(service.get_iana_time_zone, locations[:args.http_lookups]))
+    else:
+        with StubServer({'/points/': StubRoute(body, delay=args.delay, content_type='application/json')}) as server:
+            service = TimeZoneService(server.url)
+            http_latency = summarize_latencies(
+                time_calls(service.get_iana_time_zone, locations[:args.http_lookups]))
+    _, http_retained, http_peak = measure_allocations(TimeZoneService, 'https://api.weather.gov')
+
+    print_table(
+        ['engine', 'mean ms', 'p50 ms', 'p95 ms', 'retained MB', 'peak MB'],
+        [
+            ['boundaries', boundary_latency['mean_ms'], boundary_latency['p50_ms'], boundary_latency['p95_ms'],
+             retained / 2 ** 20, peak / 2 ** 20],
+            ['weather_service', http_latency['mean_ms'], http_latency['p50_ms'], http_latency['p95_ms'],
+             http_retained / 2 ** 20, http_peak / 2 ** 20]
+        ]
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -62,6 +62,166 @@ TNM_USGS_IMAGERY_TOPO_ENDPOINT = 'https://basemap.nationalmap.gov/arcgis/rest/se
 TNM_HYDRO_ENDPOINT = 'https://basemap.nationalmap.gov/arcgis/rest/services/USGSHydroCached/MapServer'
 
 MONITORING_LOCATION_CAMERA_ENDPOINT = 'https://apps.usgs.gov/sstl/'
+# The list of cameras is reloaded in the background every REFRESH_INTERVAL seconds. After a load which failed or
+# found no cameras, the previous list is used and loading is tried again after RETRY_INTERVAL seconds.
+MONITORING_LOCATION_CAMERA_REFRESH_INTERVAL = 60 * 60
+MONITORING_LOCATION_CAMERA_RETRY_INTERVAL = 5 * 60
+
+# Upstream calls for the monitoring location page are made concurrently. A call which takes longer than its
+# timeout (in seconds) is given up on and the page is rendered without that data. Gevent workers use
+# FAN_OUT_MAX_GREENLETS greenlets instead of FAN_OUT_MAX_WORKERS threads.
+FAN_OUT_MAX_WORKERS = 16
+FAN_OUT_MAX_GREENLETS = 1000
+FAN_OUT_TIMEOUT = 20
+FAN_OUT_TIMEOUTS = {
+    'period_of_record': 20,
+    'cooperators': 5,
+    'time_zone': 5,
+    'cameras': 5
+}
+
+# Successful responses from the site, cooperator, time zone and network services can be cached.
+# SERVICE_CACHE_BACKEND may be None (no caching), 'memory' (each worker has its own cache) or 'sqlite'
+# (all workers on a host share the database file at SERVICE_CACHE_PATH). The oldest entries are evicted
+# when either of the size limits is reached. Time to live is in seconds.
+SERVICE_CACHE_BACKEND = None
+SERVICE_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'service_cache.sqlite')
+SERVICE_CACHE_MAX_ENTRIES = 10000
+SERVICE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+SERVICE_CACHE_TTLS = {
+    'site': 15 * 60,
+    'cooperators': 24 * 60 * 60,
+    'time_zone': 30 * 24 * 60 * 60,
+    'networks': 60 * 60
+}
+# Expired responses are kept so that pages keep working when a service is slow or down. Within the
+# SERVICE_CACHE_STALE_WHILE_REVALIDATE window after expiring, a response is used at once and refreshed in
+# the background by one of SERVICE_CACHE_REFRESH_WORKERS threads. After that and within the
+# SERVICE_CACHE_STALE_IF_ERROR window, the service is called and the expired response is used if it fails.
+# Windows are in seconds and default to 0.
+SERVICE_CACHE_STALE_WHILE_REVALIDATE = {
+    'site': 5 * 60,
+    'cooperators': 60 * 60,
+    'time_zone': 24 * 60 * 60,
+    'networks': 15 * 60
+}
+SERVICE_CACHE_STALE_IF_ERROR = {
+    'site': 24 * 60 * 60,
+    'cooperators': 7 * 24 * 60 * 60,
+    'time_zone': 30 * 24 * 60 * 60,
+    'networks': 24 * 60 * 60
+}
+SERVICE_CACHE_REFRESH_WORKERS = 4
+# Concurrent identical requests from the threads of a worker always share one upstream call. Set
+# SERVICE_CACHE_LOCK_DIR to a directory to also let only one worker on a host at a time fetch a response
+# which is missing from the 'sqlite' cache. The other workers wait for up to SERVICE_CACHE_LOCK_TIMEOUT
+# seconds and then use the cached response.
+SERVICE_CACHE_LOCK_DIR = None
+SERVICE_CACHE_LOCK_TIMEOUT = 10
+
+# The /api/sites/ endpoint requests up to SITE_SERVICE_BATCH_SIZE sites from the NWIS site service at a time
+# and accepts up to SITES_API_MAX_SITES site numbers.
+SITE_SERVICE_BATCH_SIZE = 100
+SITES_API_MAX_SITES = 1000
+
+# Time zones are kept in a SQLite file so that they survive restarts. The file can be filled ahead of time
+# with the warm-time-zones management command. Locations are rounded to TIME_ZONE_STORE_PRECISION decimal
+# places. Set TIME_ZONE_STORE_PATH to None to always use the weather service.
+TIME_ZONE_STORE_PATH = None
+TIME_ZONE_STORE_PRECISION = 2
+
+# TIME_ZONE_ENGINE may be 'weather_service' to look up time zones with the weather service or 'boundaries'
+# to look them up offline in TIME_ZONE_BOUNDARY_FILE. The file can be a GeoJSON release of
+# timezone-boundary-builder or an index created from one with the index-time-zone-boundaries command. If the
+# file is not set or can not be loaded, the weather service is used and an error is logged.
+TIME_ZONE_ENGINE = 'weather_service'
+TIME_ZONE_BOUNDARY_FILE = None
+
+# Monitoring location lists on the hydrologic unit and county pages are paginated. Pages past
+# MONITORING_LOCATIONS_MAX_PAGE are not found. Pages can be streamed instead with the stream=true query
+# parameter, in which case the rendered page is sent in chunks of MONITORING_LOCATIONS_STREAM_BUFFER
+# template fragments.
+MONITORING_LOCATIONS_PAGE_SIZE = 100
+MONITORING_LOCATIONS_MAX_PAGE_SIZE = 1000
+MONITORING_LOCATIONS_MAX_PAGE = 1000
+MONITORING_LOCATIONS_STREAM_BUFFER = 50
+
+# Data derived from each site's period of record for its monitoring location page is cached in each worker,
+# keyed by the site and a fingerprint of the site and period of record data, so it is recomputed only when
+# that data changes. Set SITE_PAGE_MODEL_CACHE_MAX_ENTRIES to 0 to disable the cache.
+SITE_PAGE_MODEL_CACHE_MAX_ENTRIES = 5000
+SITE_PAGE_MODEL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+SITE_PAGE_MODEL_CACHE_TTL = 24 * 60 * 60
+
+# Rendered monitoring location, hydrologic unit, state and county and network pages are cached in each
+# worker for PAGE_CACHE_TTL seconds, keyed by URL and the request headers which change the page. Pages
+# get strong ETags whether or not they are cached. Set PAGE_CACHE_MAX_ENTRIES to 0 to disable the cache.
+PAGE_CACHE_MAX_ENTRIES = 1000
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PAGE_CACHE_TTL = 5 * 60
+
+# Cache lifetimes in seconds of the pages of each view, keyed by endpoint. max_age is sent to browsers in
+# Cache-Control and surrogate_max_age to the CDN in Surrogate-Control. Pages are tagged with Surrogate-Key
+# headers naming their endpoint, site, hydrologic unit, state, county or network so that the CDN can purge
+# them selectively. Not found pages are cached for at most CACHE_NOT_FOUND_MAX_AGE seconds and error pages
+# are not cached. Views without a policy get no caching headers.
+CACHE_POLICIES = {
+    'home': {'max_age': 60 * 60, 'surrogate_max_age': 24 * 60 * 60},
+    'provisional_data_statement': {'max_age': 60 * 60, 'surrogate_max_age': 24 * 60 * 60},
+    'iv_data_availability': {'max_age': 60 * 60, 'surrogate_max_age': 24 * 60 * 60},
+    'hydrological_unit': {'max_age': 15 * 60, 'surrogate_max_age': 60 * 60},
+    'hydrological_unit_locations': {'max_age': 5 * 60, 'surrogate_max_age': 15 * 60},
+    'states_counties': {'max_age': 15 * 60, 'surrogate_max_age': 60 * 60},
+    'county_station_locations': {'max_age': 5 * 60, 'surrogate_max_age': 15 * 60},
+    'networks': {'max_age': 15 * 60, 'surrogate_max_age': 60 * 60},
+    'monitoring_location': {'max_age': 60, 'surrogate_max_age': 5 * 60},
+    'time_series_component': {'max_age': 60 * 60, 'surrogate_max_age': 24 * 60 * 60},
+    'sites_api': {'max_age': 60, 'surrogate_max_age': 5 * 60},
+    'monitoring_location_summary': {'max_age': 60, 'surrogate_max_age': 5 * 60}
+}
+CACHE_NOT_FOUND_MAX_AGE = 60
+
+# Responses of COMPRESSION_MIMETYPES of at least COMPRESSION_MIN_SIZE bytes are compressed with gzip or, if the
+# brotli package is installed, brotli. Set COMPRESSION_MIN_SIZE to None to not compress responses. Levels are
+# 1-9 for gzip and 0-11 for brotli; benchmarks.compression compares them.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_MIMETYPES = ['text/html', 'text/plain', 'text/css', 'application/json', 'application/ld+json',
+                         'application/javascript']
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Pages which only depend on the lookups, such as the home, state, county and hydrologic unit pages, are
+# rendered and compressed once and kept in memory, up to STATIC_PAGES_MAX_BYTES. Pages without URL arguments
+# are rendered when the application is loaded if STATIC_PAGES_PRERENDER is set. Pages which are not in memory
+# are read from STATIC_PAGES_SNAPSHOT_DIR, if it is set, which the generate-static-pages management command
+# fills. Pages rendered while a request waits are compressed at the COMPRESSION_* levels; only the snapshot,
+# which is written ahead of time, is compressed at the slower STATIC_PAGES_* levels.
+STATIC_PAGES_PRERENDER = True
+STATIC_PAGES_SNAPSHOT_DIR = None
+STATIC_PAGES_MAX_BYTES = 64 * 1024 * 1024
+STATIC_PAGES_TTL = 24 * 60 * 60
+STATIC_PAGES_GZIP_LEVEL = 9
+STATIC_PAGES_BROTLI_QUALITY = 11
+
+# HTTP sessions used to call upstream services keep up to HTTP_CLIENT_POOL_MAXSIZE connections to each host
+# alive, or the size given for the host in HTTP_CLIENT_HOST_POOL_MAXSIZE, for up to
+# HTTP_CLIENT_POOL_CONNECTIONS hosts. Gevent workers keep at least HTTP_CLIENT_COOPERATIVE_POOL_MAXSIZE.
+# GET requests which fail to connect or get a 502, 503 or 504 response are retried HTTP_CLIENT_RETRIES
+# times, waiting HTTP_CLIENT_RETRY_BACKOFF * 2 ** (retry - 1) seconds between retries. Read timeouts are
+# not retried. Timeouts are in seconds.
+HTTP_CLIENT_POOL_CONNECTIONS = 10
+HTTP_CLIENT_POOL_MAXSIZE = 10
+HTTP_CLIENT_COOPERATIVE_POOL_MAXSIZE = 100
+HTTP_CLIENT_HOST_POOL_MAXSIZE = {
+    'waterservices.usgs.gov': 20
+}
+HTTP_CLIENT_CONNECT_TIMEOUT = 3.05
+HTTP_CLIENT_READ_TIMEOUT = 30
+HTTP_CLIENT_RETRIES = 2
+HTTP_CLIENT_RETRY_BACKOFF = 0.1
+
+# Serve cache statistics for this worker as JSON at /metrics/
+METRICS_ENABLED = False
 
 LOGGING_ENABLED = True
 LOGGING_DIRECTORY = None
@@ -71,6 +231,12 @@ DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 NWIS_CODE_LOOKUP_FILENAME = 'nwis_lookup.json'
 COUNTRY_STATE_COUNTY_LOOKUP_FILENAME = 'nwis_country_state_lookup.json'
 HUC_LOOKUP_FILENAME = 'huc_lookup.json'
+# If this file exists, the lookups are read from it rather than the JSON files above. Workers share the
+# file's memory-mapped pages. Create it with the compile-lookups management command.
+LOOKUP_STORE_PATH = os.path.join(DATA_DIR, 'lookups.sqlite')
+# If this directory exists, compiled templates are loaded from it rather than compiled on their first use in
+# each worker. Create it with the compile-templates management command.
+TEMPLATE_BYTECODE_CACHE_DIR = os.path.join(DATA_DIR, 'template_cache')
 
 GA_TRACKING_CODE = ''
 ENABLE_USGS_GA = False
@@ -1,5 +1,37 @@
+import gc
 import multiprocessing
+import os
 
 
 bind = ':5050'
-workers = multiprocessing.cpu_count()*2 + 1
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()*2 + 1))
+
+# Set GUNICORN_WORKER_CLASS=gevent to let each worker serve up to GUNICORN_WORKER_CONNECTIONS requests at once.
+# Requests then wait for upstream services without blocking the worker.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+if worker_class == 'gevent':
+    # Patch before the application is imported, which happens in this process when preloading
+    from gevent import monkey
+    monkey.patch_all()
+
+# Set GUNICORN_PRELOAD=true to load the application and its lookups once in the master process and fork
+# the workers from it, so that the workers share those memory pages rather than each loading its own copy.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+if preload_app:
+    # Avoid leaving freed holes in the pages which the workers will share
+    gc.disable()
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from waterdata.workers import prepare_fork
+        server.log.info(f'Froze {prepare_fork()} objects before forking workers')
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from waterdata.workers import init_worker
+        init_worker()
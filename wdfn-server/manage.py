@@ -4,6 +4,9 @@
 Entrypoint for Flask development server.
 """
 
+import os
+import time
+
 import click
 from flask.cli import FlaskGroup
 
@@ -49,6 +52,128 @@ def generate_lookups(datadir, **lookups):
         from waterdata.commands.lookup_generation.huc_lookups import generate_hucs_file
         generate_hucs_file(datadir)
 
+    # Keep the lookup store in step with the files it is compiled from
+    store_path = app.config.get('LOOKUP_STORE_PATH')
+    if store_path and os.path.abspath(datadir) == os.path.abspath(app.config['DATA_DIR']):
+        from waterdata.lookups import compile_lookup_files
+        compile_lookup_files(app.config, store_path)
+        click.echo(f'Compiled lookups to {store_path}.')
+
+
+@cli.command()
+@click.option('--output', type=click.Path(dir_okay=False), default=app.config.get('LOOKUP_STORE_PATH'),
+              help='Path of the compiled lookup store.')
+def compile_lookups(output):
+    """
+    Compiles the lookup JSON files into the lookup store used by the application.
+    """
+    from waterdata.lookups import compile_lookup_files
+    compile_lookup_files(app.config, output)
+    click.echo(f'Compiled lookups to {output}.')
+
+
+@cli.command()
+@click.option('--output', type=click.Path(file_okay=False), default=app.config.get('TEMPLATE_BYTECODE_CACHE_DIR'),
+              help='Directory of the template bytecode cache.')
+def compile_templates(output):
+    """
+    Compiles the templates into the bytecode cache used by the application.
+    """
+    from waterdata.template_cache import compile_templates as compile_template_files
+    compiled = compile_template_files(app.jinja_env, output)
+    click.echo(f'Compiled {compiled} templates to {output}.')
+
+
+@cli.command()
+@click.argument('sites_file', type=click.File('r'))
+def warm_time_zones(sites_file):
+    """
+    Adds the time zones of the sites listed in SITES_FILE, one site number per line, to the time zone store.
+    """
+    if not app.config.get('TIME_ZONE_STORE_PATH'):
+        click.echo('TIME_ZONE_STORE_PATH is not configured.')
+        return
+
+    from waterdata.commands.time_zones import warm_time_zone_store
+    site_nos = [line.strip() for line in sites_file if line.strip()]
+    looked_up, failed, failed_sites = warm_time_zone_store(app.config, site_nos)
+    click.echo(f'Looked up {looked_up} locations, {failed} failed. {failed_sites} sites could not be retrieved.')
+
+
+@cli.command()
+@click.argument('site_nos', nargs=-1)
+@click.option('--sites-file', type=click.File('r'), default=None, help='File of site numbers, one per line.')
+@click.option('--state', 'state_cd', default=None, help='Also warm the sites in this state.')
+@click.option('--huc', 'huc_cd', default=None, help='Also warm the sites in this hydrologic unit.')
+@click.option('--network', 'network_cd', default=None, help='Also warm the sites in this network.')
+@click.option('--agency-cd', default='', help='Agency code the monitoring location pages are requested with.')
+@click.option('--batch-size', type=int, default=100, help='Sites in each site service request.')
+@click.option('--workers', type=int, default=8, help='Maximum number of concurrent requests.')
+@click.option('--rate', type=float, default=20, help='Maximum number of requests started each second.')
+def prewarm(site_nos, sites_file, state_cd, huc_cd, network_cd, **options):
+    """
+    Fills the shared service cache with the site data, period of record, cooperators and time zone of
+    SITE_NOS and of the sites selected by the options.
+    """
+    if app.config.get('SERVICE_CACHE_BACKEND') != 'sqlite':
+        click.echo('SERVICE_CACHE_BACKEND must be sqlite for the workers to share the warmed cache.')
+        return
+
+    from waterdata.commands.prewarm import prewarm_sites, select_site_nos
+    if sites_file is not None:
+        site_nos += tuple(line.strip() for line in sites_file if line.strip())
+    site_nos = select_site_nos(app.config, site_nos, state_cd=state_cd, huc_cd=huc_cd, network_cd=network_cd)
+    if not site_nos:
+        click.echo('No sites selected.')
+        return
+
+    start = time.monotonic()
+
+    def progress(done):
+        click.echo(f'Warmed {done} of {len(site_nos)} sites, {done / (time.monotonic() - start):.1f} sites/s.')
+
+    summary = prewarm_sites(app.config, site_nos, progress=progress, **options)
+    seconds = max(summary['seconds'], 0.001)
+    click.echo(f'Warmed {summary["found"]} of {summary["sites"]} sites with {summary["requests"]} requests in '
+               f'{seconds:.1f} s ({summary["sites"] / seconds:.1f} sites/s, {summary["requests"] / seconds:.1f} '
+               f'requests/s). {summary["failed"]} sites or time zones could not be fetched.')
+
+
+@cli.command()
+@click.argument('output', type=click.Path(file_okay=False))
+def generate_static_pages(output):
+    """
+    Writes the pages which only depend on the lookups, such as the state, county and hydrologic unit pages,
+    to OUTPUT with their gzip and brotli compressed files. Set STATIC_PAGES_SNAPSHOT_DIR to OUTPUT for the
+    application to serve them.
+    """
+    from waterdata.static_pages import get_static_page_urls, write_static_pages
+    paths = get_static_page_urls()
+    start = time.monotonic()
+
+    def progress(written):
+        if written % 500 == 0:
+            rate = written / (time.monotonic() - start)
+            click.echo(f'Wrote {written} of {len(paths) * 2} pages, {rate:.1f} pages/s.')
+
+    written = write_static_pages(output, paths, progress=progress)
+    click.echo(f'Wrote {written} pages to {output} in {time.monotonic() - start:.1f} s.')
+
+
+@cli.command()
+@click.argument('geojson_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('index_file', type=click.Path(dir_okay=False))
+@click.option('--precision', type=int, default=4, help='Decimal places kept for each coordinate.')
+@click.option('--bbox', type=float, nargs=4, default=None,
+              help='Only keep boundaries within min_lon min_lat max_lon max_lat.')
+def index_time_zone_boundaries(geojson_file, index_file, precision, bbox):
+    """
+    Creates INDEX_FILE, for use as the TIME_ZONE_BOUNDARY_FILE, from a GeoJSON file of time zone boundaries.
+    """
+    from waterdata.services.timezone_boundaries import write_boundary_index
+    count = write_boundary_index(geojson_file, index_file, precision=precision, bbox=bbox or None)
+    click.echo(f'Wrote {count} polygons to {index_file}.')
+
 
 if __name__ == '__main__':
     cli()
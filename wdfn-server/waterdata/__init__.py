@@ -43,18 +43,36 @@ try:
 except FileNotFoundError:
     pass
 
-# Read lookup files and save to the app.config
-with open(os.path.join(app.config.get('DATA_DIR'),
-                       app.config.get('NWIS_CODE_LOOKUP_FILENAME')), 'r') as f:
-    app.config['NWIS_CODE_LOOKUP'] = json.loads(f.read())
-
-with open(os.path.join(app.config.get('DATA_DIR'),
-                       app.config.get('COUNTRY_STATE_COUNTY_LOOKUP_FILENAME')), 'r') as f:
-    app.config['COUNTRY_STATE_COUNTY_LOOKUP'] = json.loads(f.read())
-
-with open(os.path.join(app.config.get('DATA_DIR'),
-                       app.config.get('HUC_LOOKUP_FILENAME')), 'r') as f:
-    app.config['HUC_LOOKUP'] = json.loads(f.read())
+# Use the compiled lookup store if there is one and it is up to date with the lookup files, otherwise read
+# the lookup files. Either way the lookups are saved to the app.config
+lookup_store_path = app.config.get('LOOKUP_STORE_PATH')
+lookup_store = None  # pylint: disable=C0103
+if lookup_store_path and os.path.exists(lookup_store_path):
+    from .lookups import LookupStore, get_changed_lookup_files  # pylint: disable=C0413
+    lookup_store = LookupStore(lookup_store_path)  # pylint: disable=C0103
+    changed_lookup_files = get_changed_lookup_files(lookup_store, app.config)
+    if changed_lookup_files:
+        app.logger.warning(f'Not using the lookup store {lookup_store_path} because {", ".join(changed_lookup_files)} '
+                           'changed after it was compiled. Run the compile-lookups command to update it.')
+        lookup_store = None  # pylint: disable=C0103
+
+if lookup_store is not None:
+    app.config['NWIS_CODE_LOOKUP'] = lookup_store.lookup('NWIS_CODE_LOOKUP')
+    app.config['COUNTRY_STATE_COUNTY_LOOKUP'] = lookup_store.lookup('COUNTRY_STATE_COUNTY_LOOKUP')
+    app.config['HUC_LOOKUP'] = lookup_store.lookup('HUC_LOOKUP')
+
+else:
+    with open(os.path.join(app.config.get('DATA_DIR'),
+                           app.config.get('NWIS_CODE_LOOKUP_FILENAME')), 'r') as f:
+        app.config['NWIS_CODE_LOOKUP'] = json.loads(f.read())
+
+    with open(os.path.join(app.config.get('DATA_DIR'),
+                           app.config.get('COUNTRY_STATE_COUNTY_LOOKUP_FILENAME')), 'r') as f:
+        app.config['COUNTRY_STATE_COUNTY_LOOKUP'] = json.loads(f.read())
+
+    with open(os.path.join(app.config.get('DATA_DIR'),
+                           app.config.get('HUC_LOOKUP_FILENAME')), 'r') as f:
+        app.config['HUC_LOOKUP'] = json.loads(f.read())
 
 # Load static assets manifest file, which maps source file names to the
 # corresponding versioned/hashed file name.
@@ -63,6 +81,12 @@ if manifest_path:
     with open(manifest_path, 'r') as f:
         app.config['ASSET_MANIFEST'] = json.loads(f.read())
 
+# Load the templates compiled by the compile-templates management command, if it has been run
+template_cache_dir = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+if template_cache_dir and os.path.isdir(template_cache_dir):
+    from .template_cache import TemplateBytecodeCache  # pylint: disable=C0413
+    app.jinja_env.bytecode_cache = TemplateBytecodeCache(template_cache_dir)
+
 if app.config.get('LOGGING_ENABLED'):
     # pylint: disable=C0103
     loglevel = app.config.get('LOGGING_LEVEL')
@@ -82,3 +106,9 @@ if os.getenv('CONTAINER_RUN', False):
 
 from . import views  # pylint: disable=C0413
 from . import filters  # pylint: disable=C0413
+from . import cache_control  # pylint: disable=C0413
+from . import compression  # pylint: disable=C0413
+
+if app.config.get('STATIC_PAGES_PRERENDER'):
+    from .static_pages import prerender_static_pages  # pylint: disable=C0413
+    prerender_static_pages()
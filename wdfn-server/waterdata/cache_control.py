@@ -0,0 +1,80 @@
+"""
+Cache-Control, Surrogate-Control and Surrogate-Key headers which let browsers and the CDN in front of the
+application cache pages.
+
+"""
+from flask import g, request
+
+from . import app
+
+
+# View arguments which identify the data shown on a page and the prefix of their surrogate keys
+SURROGATE_KEY_ARGS = (('site_no', 'site'), ('huc_cd', 'huc'), ('state_cd', 'state'), ('network_cd', 'network'))
+
+
+def get_surrogate_keys(endpoint, view_args):
+    """
+    Return the keys which the CDN can use to purge the page of a view. Every page is tagged with its
+    endpoint and with the site, hydrologic unit, state, county and network it shows.
+
+    :param str endpoint:
+    :param dict view_args: arguments of the view from the URL
+    :rtype: list of str
+    """
+    keys = [endpoint.replace('_', '-')]
+    for arg, prefix in SURROGATE_KEY_ARGS:
+        if view_args.get(arg):
+            keys.append(f'{prefix}-{view_args[arg]}')
+    if view_args.get('state_cd') and view_args.get('county_cd'):
+        keys.append(f'county-{view_args["state_cd"]}{view_args["county_cd"]}')
+    return keys
+
+
+def set_cache_headers(response, policy, surrogate_keys, degraded=False):
+    """
+    Set the caching headers of response according to policy and its status. Successful and not modified
+    responses are cached for the lifetimes in policy, not found responses for at most
+    CACHE_NOT_FOUND_MAX_AGE seconds and all others are not cached. Responses which set a cookie are only
+    cached by the browser.
+
+    :param flask.Response response:
+    :param dict policy: max_age for browsers and surrogate_max_age for the CDN, in seconds
+    :param list surrogate_keys:
+    :param bool degraded: the response is missing data which could not be retrieved, so it is not cached
+    """
+    if degraded:
+        response.cache_control.no_store = True
+        response.headers['Surrogate-Control'] = 'no-store'
+        return
+    if response.status_code in (200, 304):
+        max_age = policy['max_age']
+        surrogate_max_age = policy['surrogate_max_age']
+    elif response.status_code == 404:
+        max_age = min(policy['max_age'], app.config['CACHE_NOT_FOUND_MAX_AGE'])
+        surrogate_max_age = min(policy['surrogate_max_age'], app.config['CACHE_NOT_FOUND_MAX_AGE'])
+    else:
+        response.cache_control.no_store = True
+        response.headers['Surrogate-Control'] = 'no-store'
+        return
+
+    if 'Set-Cookie' in response.headers:
+        response.cache_control.private = True
+        response.headers['Surrogate-Control'] = 'no-store'
+    else:
+        response.cache_control.public = True
+        response.headers['Surrogate-Control'] = f'max-age={surrogate_max_age}'
+    response.cache_control.max_age = max_age
+    response.headers['Surrogate-Key'] = ' '.join(surrogate_keys)
+
+
+@app.after_request
+def add_cache_headers(response):
+    """
+    Add the caching headers of the CACHE_POLICIES policy of the view, if it has one. Pages which a view
+    kept out of the page cache with skip_page_cache are not cached by browsers or the CDN either.
+    """
+    policy = app.config['CACHE_POLICIES'].get(request.endpoint)
+    if policy is not None and request.method in ('GET', 'HEAD'):
+        set_cache_headers(response, policy, get_surrogate_keys(request.endpoint, request.view_args or {}),
+                          degraded=g.get('skip_page_cache', False))
+    return response
@@ -0,0 +1,3 @@
+"""
+Functions backing the management commands in manage.py
+"""
@@ -0,0 +1,141 @@
+"""
+Pre-warm the service caches with the data shown on the monitoring location pages of a set of sites, so that
+the pages are fast from the first request of a traffic spike.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from ..services.cache import get_service_cache
+from ..services.nwissite import SiteService
+from ..services.ogc import MonitoringLocationNetworkService
+from ..services.sifta import SiftaService
+from ..services.timezone import TimeZoneService, TimeZoneStore
+
+
+class RateLimiter:
+    """
+    Spaces out calls from any number of threads so that at most rate of them start each second
+    """
+    # pylint: disable=R0903
+
+    def __init__(self, rate):
+        """
+        :param float rate: calls per second, or None for no limit
+        """
+        self.interval = 1 / rate if rate else 0
+        self._next_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Block until the next call may start.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def select_site_nos(config, site_nos=(), state_cd=None, huc_cd=None, network_cd=None):
+    """
+    Return the site numbers given and those of the sites in a state, hydrologic unit or network, without
+    duplicates.
+
+    :param dict config: application configuration
+    :param site_nos: site numbers
+    :param str state_cd: state code or None
+    :param str huc_cd: hydrologic unit code or None
+    :param str network_cd: network identifier or None
+    :rtype: list
+    """
+    selected = list(site_nos)
+    site_service = SiteService(config['SITE_DATA_ENDPOINT'])
+    for params in ({'stateCd': state_cd}, {'huc': huc_cd}):
+        if not any(params.values()):
+            continue
+        status, reason, rows = site_service.get_rows(params)
+        if status != 200:
+            raise RuntimeError(f'Unable to retrieve the sites for {params}: {status} {reason}')
+        selected.extend(row.site_no for row in rows)
+    if network_cd:
+        network_site_nos = MonitoringLocationNetworkService(
+            config['MONITORING_LOCATIONS_OBSERVATIONS_ENDPOINT']).get_network_site_nos(network_cd)
+        if network_site_nos is None:
+            raise RuntimeError(f'Unable to retrieve the sites in network {network_cd}')
+        selected.extend(network_site_nos)
+    return list(dict.fromkeys(selected))
+
+
+def prewarm_sites(config, site_nos, agency_cd='', batch_size=100, workers=8, rate=None, progress=None):
+    """
+    Fill the service caches with the site data, period of record, cooperators and time zone of each site.
+    Site data and periods of record are fetched batch_size sites per request, and up to workers requests are
+    made at a time. Time zones are also saved to the time zone store if there is one.
+
+    :param dict config: application configuration
+    :param list site_nos: site numbers
+    :param str agency_cd: agency code which the monitoring location pages are requested with
+    :param int batch_size: number of sites in each site service request
+    :param int workers: maximum number of concurrent requests
+    :param float rate: maximum number of requests started each second, or None for no limit
+    :param callable progress: called after each group of batches with the number of sites done so far
+    :return: the number of sites, the number of them which were found, the number of requests made, the
+        number of sites or time zones which could not be fetched and the elapsed seconds
+    :rtype: dict
+    """
+    site_service = SiteService(config['SITE_DATA_ENDPOINT'], cache=get_service_cache('site'))
+    sifta_service = SiftaService(config['COOPERATOR_SERVICE_ENDPOINT'], cache=get_service_cache('cooperators'))
+    time_zone_service = None
+    if config['TIME_ZONE_ENGINE'] == 'weather_service':
+        store = TimeZoneStore(config['TIME_ZONE_STORE_PATH'], precision=config['TIME_ZONE_STORE_PRECISION']) \
+            if config['TIME_ZONE_STORE_PATH'] else None
+        time_zone_service = TimeZoneService(config['WEATHER_SERVICE_ENDPOINT'], cache=get_service_cache('time_zone'),
+                                            store=store)
+
+    limiter = RateLimiter(rate)
+    summary = {'sites': len(site_nos), 'found': 0, 'requests': 0, 'failed': 0, 'seconds': 0.0}
+    summary_lock = threading.Lock()
+
+    def count(key, value=1):
+        with summary_lock:
+            summary[key] += value
+
+    def prefetch(batch):
+        # One request for the site data and one for the periods of record
+        limiter.wait()
+        limiter.wait()
+        count('requests', 2)
+        return site_service.prefetch(batch, agency_cd)
+
+    def call(func, *args):
+        limiter.wait()
+        count('requests')
+        return func(*args)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        group_size = batch_size * workers
+        for group_start in range(0, len(site_nos), group_size):
+            group = site_nos[group_start:group_start + group_size]
+            batches = [group[index:index + batch_size] for index in range(0, len(group), batch_size)]
+            site_data = [site for rows, _ in executor.map(prefetch, batches) for site in rows]
+
+            found = {site['site_no'] for site in site_data}
+            count('found', len(found))
+            count('failed', len(set(group) - found))
+            cooperators = [executor.submit(call, sifta_service.get_cooperators, site_no) for site_no in found]
+            locations = {(site['dec_lat_va'], site['dec_long_va']) for site in site_data
+                         if site.get('dec_lat_va') and site.get('dec_long_va')}
+            time_zones = [executor.submit(call, time_zone_service.get_iana_time_zone, latitude, longitude)
+                          for latitude, longitude in locations] if time_zone_service is not None else []
+            for future in cooperators:
+                future.result()
+            count('failed', sum(1 for future in time_zones if not future.result()))
+
+            if progress is not None:
+                progress(group_start + len(group))
+    summary['seconds'] = time.monotonic() - start
+    return summary
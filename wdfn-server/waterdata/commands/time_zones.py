@@ -0,0 +1,54 @@
+"""
+Pre-warm the persistent time zone store
+"""
+from .. import app
+from ..services.nwissite import SiteService
+from ..services.timezone import TimeZoneService, TimeZoneStore
+
+# Number of sites requested from the NWIS site service at a time
+SITES_PER_REQUEST = 100
+
+
+def get_site_locations(site_service, site_nos, failed_site_nos=None):
+    """
+    Yield the latitude and longitude of each site. Sites which the site service does not know are skipped.
+    The sites of a request which failed are skipped too and added to failed_site_nos, so that one failed
+    request does not stop the others.
+
+    :param SiteService site_service:
+    :param list site_nos: site numbers
+    :param list failed_site_nos: optional list to which the sites which could not be retrieved are added
+    :return: iterator of (latitude, longitude)
+    """
+    for start in range(0, len(site_nos), SITES_PER_REQUEST):
+        chunk = site_nos[start:start + SITES_PER_REQUEST]
+        status, reason, sites = site_service.get({'sites': ','.join(chunk)})
+        # The site service responds with a 404 when none of the sites exist
+        if status == 404:
+            continue
+        if status != 200:
+            app.logger.warning(f'Unable to retrieve site data for {len(chunk)} sites: {status} {reason}')
+            if failed_site_nos is not None:
+                failed_site_nos.extend(chunk)
+            continue
+        for site in sites:
+            if site.get('dec_lat_va') and site.get('dec_long_va'):
+                yield site['dec_lat_va'], site['dec_long_va']
+
+
+def warm_time_zone_store(config, site_nos):
+    """
+    Look up the time zone of each site in site_nos which is not already in the time zone store.
+
+    :param dict config: application configuration
+    :param list site_nos: site numbers
+    :return: the number of locations that were looked up, the number that failed and the number of sites
+        whose locations could not be retrieved
+    :rtype: tuple
+    """
+    store = TimeZoneStore(config['TIME_ZONE_STORE_PATH'], precision=config['TIME_ZONE_STORE_PRECISION'])
+    time_zone_service = TimeZoneService(config['WEATHER_SERVICE_ENDPOINT'], store=store)
+    site_service = SiteService(config['SITE_DATA_ENDPOINT'])
+    failed_site_nos = []
+    looked_up, failed = time_zone_service.warm(get_site_locations(site_service, site_nos, failed_site_nos))
+    return looked_up, failed, len(failed_site_nos)
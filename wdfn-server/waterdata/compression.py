@@ -0,0 +1,104 @@
+"""
+Compression of response bodies with gzip or, if the brotli package is installed, brotli. The encoding is
+negotiated from the request's Accept-Encoding header.
+
+Responses of COMPRESSION_MIMETYPES of at least COMPRESSION_MIN_SIZE bytes are compressed as they are
+sent. Set COMPRESSION_MIN_SIZE to None to leave compression to a proxy.
+"""
+import gzip
+
+from flask import request
+
+from . import app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # pylint: disable=C0103
+
+
+def get_supported_encodings():
+    """
+    :return: the content codings which responses can be compressed with, most preferred first
+    :rtype: tuple
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Return the supported encoding with the highest quality in accept_encodings. Ties go to the encoding
+    which compresses better.
+
+    :param werkzeug.datastructures.Accept accept_encodings:
+    :return: 'br', 'gzip' or None if the response should not be compressed
+    :rtype: str
+    """
+    best_encoding = None
+    best_quality = 0
+    for encoding in get_supported_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best_encoding = encoding
+            best_quality = quality
+    return best_encoding
+
+
+def compress(body, encoding, level=None):
+    """
+    Compress body at level or by default at the COMPRESSION_GZIP_LEVEL or COMPRESSION_BROTLI_QUALITY level.
+
+    :param bytes body:
+    :param str encoding: 'br' or 'gzip'
+    :param int level: compression level
+    :rtype: bytes
+    """
+    if encoding == 'br':
+        quality = level if level is not None else app.config['COMPRESSION_BROTLI_QUALITY']
+        return brotli.compress(body, quality=quality)
+    level = level if level is not None else app.config['COMPRESSION_GZIP_LEVEL']
+    # The modification time is fixed so the same body always compresses to the same bytes
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compress_response(response, encoding):
+    """
+    Replace the body of response with its compressed body. Streamed, already encoded and bodiless responses
+    are left alone. A strong ETag is made weak, because it identifies the uncompressed body. The ETag of a
+    not modified response is made weak too, so that it matches the ETag of the compressed page it stands for.
+
+    :param flask.Response response:
+    :param str encoding: 'br', 'gzip' or None to only mark the response as varying by Accept-Encoding
+    :rtype: flask.Response
+    """
+    response.vary.add('Accept-Encoding')
+    if encoding is None or response.is_streamed or 'Content-Encoding' in response.headers \
+            or response.status_code in (204, 304) or response.status_code < 200:
+        if encoding is not None and response.status_code == 304:
+            _weaken_etag(response)
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def _weaken_etag(response):
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+@app.after_request
+def compress_dynamic_response(response):
+    """
+    Compress the response if it is large enough and of a compressible type.
+    """
+    min_size = app.config['COMPRESSION_MIN_SIZE']
+    if min_size is None or response.mimetype not in app.config['COMPRESSION_MIMETYPES']:
+        return response
+    if response.is_streamed or response.calculate_content_length() < min_size:
+        response.vary.add('Accept-Encoding')
+        return response
+    return compress_response(response, choose_encoding(request.accept_encodings))
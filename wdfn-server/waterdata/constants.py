@@ -1,6 +1,7 @@
 """
 Constants
 """
+from types import MappingProxyType
 
 STATION_FIELDS_D = {
     'agency_cd': {
@@ -263,3 +264,6 @@ US_STATES = [
     {'name': 'Wisconsin', 'abbreviation': 'WI'},
     {'name': 'Wyoming', 'abbreviation': 'WY'}
 ]
+
+# State abbreviations keyed by state name
+US_STATE_ABBREVIATIONS = MappingProxyType({state['name']: state['abbreviation'] for state in US_STATES})
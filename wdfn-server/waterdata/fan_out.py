@@ -0,0 +1,104 @@
+"""
+Run independent upstream service calls concurrently.
+
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import time
+
+from . import app
+from .workers import is_cooperative, post_fork
+
+
+class FanOut:
+    """
+    Submits named calls to a shared thread pool and collects their results. Each call has its own timeout
+    and a fallback value which is returned if the call times out or raises an exception, so a slow or
+    failing dependency degrades a page rather than failing it. The names of the calls whose fallbacks were
+    returned are kept in fallbacks.
+    """
+
+    def __init__(self, executor, default_timeout=None):
+        """
+        Constructor method.
+
+        :param concurrent.futures.Executor executor: executor used to run the calls
+        :param float default_timeout: seconds to wait for a call if no timeout is given when it is submitted
+        """
+        self.executor = executor
+        self.default_timeout = default_timeout
+        self.fallbacks = set()
+        self._calls = {}
+
+    def submit(self, name, func, *args, fallback=None, timeout=None, **kwargs):
+        """
+        Start running func(*args, **kwargs) in the executor.
+
+        :param str name: name used to retrieve the result
+        :param callable func:
+        :param fallback: value returned by result if the call fails or times out
+        :param float timeout: seconds to wait for this call, measured from submission
+        """
+        call_timeout = timeout if timeout is not None else self.default_timeout
+        deadline = time.monotonic() + call_timeout if call_timeout is not None else None
+        self._calls[name] = (self.executor.submit(func, *args, **kwargs), fallback, deadline)
+
+    def result(self, name):
+        """
+        Wait for and return the result of the call submitted as name.
+
+        :param str name:
+        :return: the value returned by the call or its fallback
+        """
+        future, fallback, deadline = self._calls[name]
+        remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            app.logger.warning(f'Timed out waiting for {name}, using fallback')
+        except Exception as err:  # pylint: disable=broad-except
+            app.logger.error(f'{name} failed, using fallback: {err!r}')
+        self.fallbacks.add(name)
+        return fallback
+
+    def results(self):
+        """
+        Wait for all submitted calls.
+
+        :return: results (or fallbacks) keyed by call name
+        :rtype: dict
+        """
+        return {name: self.result(name) for name in self._calls}
+
+
+_executor = None
+
+
+def get_executor():
+    """
+    Returns the process wide executor used for upstream fan-out, creating it on first use. In a gevent
+    worker its threads are greenlets, so it can be much larger.
+    :rtype: concurrent.futures.ThreadPoolExecutor
+    """
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        max_workers = app.config['FAN_OUT_MAX_GREENLETS' if is_cooperative() else 'FAN_OUT_MAX_WORKERS']
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fan-out')
+    return _executor
+
+
+@post_fork
+def _reset_executor():
+    """
+    Threads are not copied into a forked process so a worker must not use an executor created before
+    it was forked.
+    """
+    global _executor  # pylint: disable=global-statement
+    _executor = None
+
+
+def create_fan_out():
+    """
+    Returns a FanOut which uses the shared executor and the configured default timeout.
+    :rtype: FanOut
+    """
+    return FanOut(get_executor(), default_timeout=app.config['FAN_OUT_TIMEOUT'])
@@ -0,0 +1,143 @@
+"""
+Factory for the HTTP sessions used to call upstream services.
+
+Sessions keep connections to each host alive in a pool, apply connect and read timeouts to every request
+and retry idempotent requests which fail to connect or get a 502, 503 or 504 response, with exponential
+backoff. The pool size of a host can be set in HTTP_CLIENT_HOST_POOL_MAXSIZE. In a gevent worker, which
+has many requests in flight at once, pools are at least HTTP_CLIENT_COOPERATIVE_POOL_MAXSIZE.
+"""
+import socket
+import weakref
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+from . import app
+from .workers import is_cooperative, post_fork
+
+
+# Detect connections which were dropped while idle in the pool
+KEEP_ALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with TCP keep-alive and a default timeout for requests which do not give one
+    """
+
+    def __init__(self, timeout=None, **kwargs):
+        """
+        :param timeout: default timeout in seconds, or a tuple of the connect and read timeouts
+        :param kwargs: HTTPAdapter arguments
+        """
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):  # pylint: disable=W0221
+        kwargs.setdefault('socket_options', KEEP_ALIVE_SOCKET_OPTIONS)
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):  # pylint: disable=W0221
+        return super().send(request, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+    @property
+    def pool_stats(self):
+        """
+        :return: connection counts of the pool of each host this adapter has connected to, keyed by
+            scheme, host and port
+        :rtype: dict
+        """
+        pools = self.poolmanager.pools
+        stats = {}
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            stats[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                'connections': pool.num_connections,
+                'requests': pool.num_requests
+            }
+        return stats
+
+
+_sessions = weakref.WeakSet()
+
+
+def create_session(config=None):
+    """
+    Create a session configured by the HTTP_CLIENT settings.
+
+    :param dict config: application configuration, by default app.config
+    :rtype: requests.Session
+    """
+    config = config if config is not None else app.config
+    # Read timeouts and other errors after the request was sent are not retried, so that a slow service
+    # holds a worker for at most one read timeout
+    retries = Retry(
+        total=config['HTTP_CLIENT_RETRIES'],
+        read=False,
+        other=0,
+        backoff_factor=config['HTTP_CLIENT_RETRY_BACKOFF'],
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False
+    )
+    timeout = (config['HTTP_CLIENT_CONNECT_TIMEOUT'], config['HTTP_CLIENT_READ_TIMEOUT'])
+    min_pool_maxsize = config['HTTP_CLIENT_COOPERATIVE_POOL_MAXSIZE'] if is_cooperative() else 1
+
+    def create_adapter(pool_maxsize):
+        return PooledHTTPAdapter(timeout=timeout, max_retries=retries, pool_maxsize=max(pool_maxsize, min_pool_maxsize),
+                                 pool_connections=config['HTTP_CLIENT_POOL_CONNECTIONS'])
+
+    session = Session()
+    session.mount('http://', create_adapter(config['HTTP_CLIENT_POOL_MAXSIZE']))
+    session.mount('https://', create_adapter(config['HTTP_CLIENT_POOL_MAXSIZE']))
+    for host, pool_maxsize in config['HTTP_CLIENT_HOST_POOL_MAXSIZE'].items():
+        session.mount(f'http://{host}/', create_adapter(pool_maxsize))
+        session.mount(f'https://{host}/', create_adapter(pool_maxsize))
+    _sessions.add(session)
+    return session
+
+
+def get_http_client_stats():
+    """
+    :return: for each upstream host, the number of connections opened, requests sent and requests which
+        reused a kept alive connection, summed over the sessions of this process
+    :rtype: dict
+    """
+    stats = {}
+    for session in list(_sessions):
+        for adapter in set(session.adapters.values()):
+            if not isinstance(adapter, PooledHTTPAdapter):
+                continue
+            for host, pool_stats in adapter.pool_stats.items():
+                host_stats = stats.setdefault(host, {'connections': 0, 'requests': 0, 'reused': 0})
+                host_stats['connections'] += pool_stats['connections']
+                host_stats['requests'] += pool_stats['requests']
+                host_stats['reused'] += max(pool_stats['requests'] - pool_stats['connections'], 0)
+    return stats
+
+
+_shared_session = None
+
+
+def get_shared_session():
+    """
+    Return the session shared by callers which do not have their own, creating it on first use.
+    :rtype: requests.Session
+    """
+    global _shared_session  # pylint: disable=global-statement
+    if _shared_session is None:
+        _shared_session = create_session()
+    return _shared_session
+
+
+@post_fork
+def _reset_shared_session():
+    """
+    A worker must not use connections opened by the process it was forked from.
+    """
+    global _shared_session  # pylint: disable=global-statement
+    _shared_session = None
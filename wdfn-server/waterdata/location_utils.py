@@ -3,13 +3,17 @@ Utility functions and classes for working with
 USGS water services.
 
 """
+from collections.abc import Mapping
+import copy
 from datetime import datetime
+from functools import lru_cache
 import itertools
+from types import MappingProxyType
 
 from flask import url_for
 import pendulum
 
-from .constants import US_STATES
+from .constants import US_STATE_ABBREVIATIONS
 
 
 def get_state_abbreviation(state_full_name):
@@ -20,35 +24,77 @@ def get_state_abbreviation(state_full_name):
     :return: state two letter abbreviation
     :rtype: str
     """
-    state = filter(lambda record: record['name'] == state_full_name, US_STATES)
-    try:
-        state_abbrev = next(state).get('abbreviation')
-    except StopIteration:
-        state_abbrev = None
-    return state_abbrev
+    return US_STATE_ABBREVIATIONS.get(state_full_name)
 
 
-def get_disambiguated_values(location, code_lookups, country_state_county_lookups, huc_lookups):
+def _get_name(lookup):
+    return lookup.get('name') if isinstance(lookup, Mapping) else None
+
+
+class LookupIndexes:
     """
-    Convert values for keys that contains codes to human readable names using the lookups
-    :param dict location:
-    :param dict code_lookups:
-    :param dict country_state_county_lookups:
-    :rtype: dict
+    Flat, read-only indexes over the NWIS code, country/state/county and HUC lookups. Build these once
+    when the lookups are loaded rather than for each location, or use the indexes of the lookup store.
     """
+    def __init__(self, code_lookups, country_state_county_lookups, huc_lookups):
+        """
+        :param dict code_lookups:
+        :param dict country_state_county_lookups:
+        :param dict huc_lookups:
+        """
+        state_names = {}
+        county_names = {}
+        for country_cd, country in country_state_county_lookups.items():
+            for state_cd, state in country.get('state_cd', {}).items():
+                state_names[(country_cd, state_cd)] = _get_name(state)
+                if isinstance(state, Mapping):
+                    for county_cd, county in state.get('county_cd', {}).items():
+                        county_names[(country_cd, state_cd, county_cd)] = _get_name(county)
+
+        self.code_lookups = code_lookups
+        self.state_names = MappingProxyType(state_names)
+        self.county_names = MappingProxyType(county_names)
+        self.parameter_groups = MappingProxyType({
+            parm_cd: parameter['group'] for parm_cd, parameter in code_lookups.get('parm_cd', {}).items()
+            if 'group' in parameter
+        })
+        self.hucs = huc_lookups.get('hucs', {})
+
+    @classmethod
+    def from_store(cls, lookup_store):
+        """
+        Return indexes which query the indexes compiled into lookup_store rather than copying the lookups,
+        so that every worker shares the store's memory-mapped pages.
 
-    def get_state_name(country_code, state_code):
+        :param LookupStore lookup_store:
+        :rtype: LookupIndexes
         """
-        Return the name of the state with country_code and state_code
-        :param str country_code:
-        :param str state_code:
-        :rtype: str
+        indexes = cls.__new__(cls)
+        indexes.code_lookups = lookup_store.lookup('NWIS_CODE_LOOKUP')
+        indexes.state_names = lookup_store.index('state_name')
+        indexes.county_names = lookup_store.index('county_name')
+        indexes.parameter_groups = lookup_store.index('parameter_group')
+        indexes.hucs = lookup_store.lookup('HUC_LOOKUP')['hucs']
+        return indexes
+
+    def without_political_units(self):
         """
-        country_lookup = country_state_county_lookups.get(country_code, {})
-        state_lookup = country_lookup.get('state_cd', {})
+        :return: indexes which share the code and HUC indexes but have no country, state or county names
+        :rtype: LookupIndexes
+        """
+        indexes = copy.copy(self)
+        indexes.state_names = indexes.county_names = MappingProxyType({})
+        return indexes
 
-        return state_lookup.get(state_code, {}).get('name')
 
+def get_disambiguated_values(location, lookup_indexes):
+    """
+    Convert values for keys that contains codes to human readable names using the lookups
+    :param dict location:
+    :param LookupIndexes lookup_indexes:
+    :rtype: dict
+    """
+    code_lookups = lookup_indexes.code_lookups
     transformed_location = {}
 
     country_code = location.get('country_cd')
@@ -58,7 +104,7 @@ def get_disambiguated_values(location, code_lookups, country_state_county_lookup
 
     for (key, value) in location.items():
         if key == 'state_cd' and country_code and state_code:
-            state_name = get_state_name(country_code, state_code)
+            state_name = lookup_indexes.state_names.get((country_code, state_code))
             transformed_value = {
                 'name': state_name or state_code,
                 'abbreviation': get_state_abbreviation(state_name),
@@ -66,7 +112,7 @@ def get_disambiguated_values(location, code_lookups, country_state_county_lookup
             }
 
         elif key == 'district_cd' and country_code and district_code:
-            state_name = get_state_name(country_code, district_code)
+            state_name = lookup_indexes.state_names.get((country_code, district_code))
             transformed_value = {
                 'name': state_name or district_code,
                 'abbreviation': get_state_abbreviation(state_name),
@@ -74,11 +120,7 @@ def get_disambiguated_values(location, code_lookups, country_state_county_lookup
             }
 
         elif key == 'county_cd' and country_code and state_code and country_code:
-            country_lookup = country_state_county_lookups.get(country_code, {})
-            state_lookup = country_lookup.get('state_cd', {}).get(state_code, {})
-            county_lookup = state_lookup.get('county_cd', {})
-
-            county_name = county_lookup.get(county_code, {}).get('name')
+            county_name = lookup_indexes.county_names.get((country_code, state_code, county_code))
             transformed_value = {
                 'name': county_name or county_code,
                 'code': county_code if county_name != county_code else None
@@ -90,16 +132,14 @@ def get_disambiguated_values(location, code_lookups, country_state_county_lookup
                 # if a value can't be found for a parameter group code (usually because there isn't a parameter group),
                 # try looking it up based on the value of the parameter code
                 if value_dict is None:
-                    parm_code = location['parm_cd']
-                    parameter_metadata = code_lookups.get('parm_cd').get(parm_code) or {}
-                    value_dict = {'name': parameter_metadata.get('group', value)}
+                    value_dict = {'name': lookup_indexes.parameter_groups.get(location['parm_cd'], value)}
             else:
                 value_dict = code_lookups.get(key).get(value) or {'name': value}
             transformed_value = dict(code=value, **value_dict)
 
         elif key == 'huc_cd':
             transformed_value = {
-                'name': huc_lookups['hucs'].get(value, {}).get('huc_nm'),
+                'name': lookup_indexes.hucs.get(value, {}).get('huc_nm'),
                 'code': value,
                 'url': url_for('hydrological_unit', huc_cd=value)
             }
@@ -156,61 +196,32 @@ def build_linked_data(location_number, location_name, agency_code, latitude, lon
     return linked_data
 
 
-def _collapse_series_by_column(grouped_series, sort_data_col):
+def _add_series(groups, group_key, code, series):
     """
-    For each grouped series, take each of its timeseries and
-    organize them by a data column/key name. Group by the specified
-    column/key name and extract metadata from them. This intended
-    to help with cases where there are multiple series for a RDB
-    column/key (e.g. temperature measured at slightly different depths
-    for parameter code 00010 or if a location gets site visits for
-    10 years, gets shut down, but is started back up and site visits
-    resume).
-
-    :param itertools.groupby grouped_series: dataseries grouped by some value (e.g. parameter group, data type, etc.)
-    :param str sort_data_col: value of a key in the time series data
-    :return: groupings with one entry for each unique value within a data column/key
-    :rtype: dict
+    Add series to the metadata of the series with the same code in the group with group_key. Each series
+    is expected to have begin_date, end_date, data_type_cd and parm_cd.
 
+    :param dict groups: metadata keyed by code within dicts keyed by group
+    :param str group_key: group of the series, for example its parameter group name
+    :param str code: code used to combine series within a group, for example the parameter code
+    :param dict series: disambiguated data series
     """
-    def key_sort(item):
-        """
-        sort by some code
-
-        :param item:
-        :return:
-
-        """
-        return item[sort_data_col]['code']
-
-    rolled_up_series = {}
-    # for each parameter group grouping...
-    for key, grp in grouped_series:
-        series_by_pcode = itertools.groupby(sorted(grp, key=key_sort), key=key_sort)
-        # for each grouping within a key grouping...
-        grp_pcode_series = []
-        for key_pc, pc_grp in series_by_pcode:
-            series_by_pc = list(pc_grp)
-            # determine the start and end dates of the group
-            start_dates = [
-                pendulum.parse(series['begin_date']['code']) for series in series_by_pc
-            ]
-            end_dates = [
-                pendulum.parse(series['end_date']['code']) for series in series_by_pc
-            ]
-            # collect data types
-            data_types = [series['data_type_cd']['name'] for series in series_by_pc]
-
-            pc_metadata = {
-                'start_date': min(start_dates),
-                'end_date': max(end_dates),
-                'data_types': data_types,
-                'parameter_code': key_pc,
-                'parameter_name': series_by_pc[0]['parm_cd']['name']
-            }
-            grp_pcode_series.append(pc_metadata)
-        rolled_up_series[key] = grp_pcode_series
-    return rolled_up_series
+    start_date = _parse_date(series['begin_date']['code'])
+    end_date = _parse_date(series['end_date']['code'])
+    group = groups.setdefault(group_key, {})
+    metadata = group.get(code)
+    if metadata is None:
+        group[code] = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'data_types': [series['data_type_cd']['name']],
+            'parameter_code': code,
+            'parameter_name': series['parm_cd']['name']
+        }
+    else:
+        metadata['start_date'] = min(metadata['start_date'], start_date)
+        metadata['end_date'] = max(metadata['end_date'], end_date)
+        metadata['data_types'].append(series['data_type_cd']['name'])
 
 
 def _extract_group_summary_data(dataseries, name=None):
@@ -256,91 +267,92 @@ def rollup_dataseries(dataseries):
     :rtype: list
 
     """
-    # handle annual reports, peak value measurements, site visits, and active ground water sites
-    # basically everything that doesn't have a parameter code and parameter group separate from the
-    # data types that do.
-    display_series = list(itertools.filterfalse(
-        lambda x: x['parm_cd']['code'] == '' and x['parm_grp_cd']['code'] == '',
-        dataseries
-    ))
-    other_series = [s for s in dataseries if s not in display_series]
-
-    # handle series with parameter groups
-    def parm_grp_sort(item):
-        """
-        parameter group name sort function
-
-        :param item:
-        :return:
-
-        """
-        return item['parm_grp_cd']['name']
+    # Series without a parameter code and parameter group, such as annual reports, peak value measurements,
+    # site visits and active ground water sites, are rolled up by data type. The others are rolled up by
+    # parameter group and then parameter code. Each group and each code is output in sorted order with the
+    # series in the order they were given.
+    by_parameter_group = {}
+    by_data_type = {}
+    for series in dataseries:
+        if series['parm_cd']['code'] == '' and series['parm_grp_cd']['code'] == '':
+            _add_series(by_data_type, series['data_type_cd']['name'], series['data_type_cd']['code'], series)
+        else:
+            _add_series(by_parameter_group, series['parm_grp_cd']['name'], series['parm_cd']['code'], series)
 
-    pg_sorted = sorted(display_series, key=parm_grp_sort)
-    pg_grouped_series = itertools.groupby(pg_sorted, key=parm_grp_sort)
-    rollup_by_parameter_grp = _collapse_series_by_column(pg_grouped_series, 'parm_cd')
     # remove the `ALL` parameter group
     # it's the amalgamation of the other groups
-    rollup_by_parameter_grp.pop('ALL', None)
-    parameter_groups = [_extract_group_summary_data(v, k) for k, v in rollup_by_parameter_grp.items()]
+    by_parameter_group.pop('ALL', None)
 
-    # handle series that don't have parameter codes and parameter group codes
-    def data_type_sort(item):
-        """
-        data type code name sort function
+    parameter_groups = [
+        _extract_group_summary_data([group[code] for code in sorted(group)], name)
+        for name, group in sorted(by_parameter_group.items())
+    ]
+    data_type_groups = [
+        _extract_group_summary_data([group[code] for code in sorted(group)])
+        for _, group in sorted(by_data_type.items())
+    ]
 
-        :param item:
-        :return:
+    return parameter_groups + data_type_groups
 
-        """
-        return item['data_type_cd']['name']
 
-    dt_sorted = sorted(other_series, key=data_type_sort)
-    dt_grouped_series = itertools.groupby(dt_sorted, key=data_type_sort)
-    rollup_by_dt_code = _collapse_series_by_column(dt_grouped_series, 'data_type_cd')
-    data_type_groups = [_extract_group_summary_data(v) for v in rollup_by_dt_code.values()]
+@lru_cache(maxsize=16384)
+def _parse_iso_date(value):
+    """
+    Parse a YYYY-MM-DD date. The same dates recur across the series of a site and across sites so each
+    is only parsed once.
+    """
+    return datetime.strptime(value, '%Y-%m-%d')
 
-    return parameter_groups + data_type_groups
 
-def get_period_of_record_by_parm_cd(site_records, data_type_cd='uv'):
+@lru_cache(maxsize=16384)
+def _parse_date(value):
     """
-    Return the merged period of record for each unique parameter code with data_type_cd in site_records
-
-    :param site_records: list of period of records (dict), typically for a single site
-    :param data_type_cd: string - only site_records items that match data_type_cd will be considered by this function
-    :return: dict - keys are the parmCds and the value for each will be a dict with begin_date and end_date keys.
+    Parse a date with pendulum, parsing each distinct value once.
     """
+    return pendulum.parse(value)
 
-    date_format = '%Y-%m-%d'
-    data_type_records_iter = filter(lambda record: record['data_type_cd'] == data_type_cd, site_records)
-    mapped_records_iter = map(lambda record: {
-        'parm_cd': record['parm_cd'],
-        'begin_date': record['begin_date'],
-        'end_date': record['end_date']
-    }, data_type_records_iter)
-
-    records_by_parm_cd = {}
-    for record in mapped_records_iter:
-        this_parm_cd = record['parm_cd']
-
-        if this_parm_cd in records_by_parm_cd:
-            record_begin_datetime = datetime.strptime(record['begin_date'], date_format)
-            current_begin_datetime = datetime.strptime(records_by_parm_cd[this_parm_cd]['begin_date'], date_format)
-            if record_begin_datetime < current_begin_datetime:
-                records_by_parm_cd[this_parm_cd]['begin_date'] = record['begin_date']
-
-            record_end_datetime = datetime.strptime(record['end_date'], date_format)
-            current_end_datetime = datetime.strptime(records_by_parm_cd[this_parm_cd]['end_date'], date_format)
-            if record_end_datetime > current_end_datetime:
-                records_by_parm_cd[this_parm_cd]['end_date'] = record['end_date']
 
-        else:
-            records_by_parm_cd[this_parm_cd] = {
+def get_periods_of_record(site_records, data_type_cds=None):
+    """
+    Return the merged period of record for each data type and parameter code in site_records, reading
+    site_records once.
+
+    :param site_records: list of period of records (dict), typically for a single site
+    :param data_type_cds: collection of the data types to include or None to include all of them
+    :return: dict - keys are the data type codes and the value for each is a dict like the one returned by
+        get_period_of_record_by_parm_cd
+    """
+    periods_of_record = {}
+    for record in site_records:
+        data_type_cd = record['data_type_cd']
+        if data_type_cds is not None and data_type_cd not in data_type_cds:
+            continue
+
+        records_by_parm_cd = periods_of_record.setdefault(data_type_cd, {})
+        period = records_by_parm_cd.get(record['parm_cd'])
+        if period is None:
+            records_by_parm_cd[record['parm_cd']] = {
                 'begin_date': record['begin_date'],
                 'end_date': record['end_date']
             }
+        else:
+            if _parse_iso_date(record['begin_date']) < _parse_iso_date(period['begin_date']):
+                period['begin_date'] = record['begin_date']
+            if _parse_iso_date(record['end_date']) > _parse_iso_date(period['end_date']):
+                period['end_date'] = record['end_date']
+
+    return periods_of_record
+
+
+def get_period_of_record_by_parm_cd(site_records, data_type_cd='uv'):
+    """
+    Return the merged period of record for each unique parameter code with data_type_cd in site_records
 
-    return records_by_parm_cd
+    :param site_records: list of period of records (dict), typically for a single site
+    :param data_type_cd: string - only site_records items that match data_type_cd will be considered by this function
+    :return: dict - keys are the parmCds and the value for each will be a dict with begin_date and end_date keys.
+    """
+    return get_periods_of_record(site_records, (data_type_cd,)).get(data_type_cd, {})
 
 
 def get_default_parameter_code(iv_parameters, gw_parameters):
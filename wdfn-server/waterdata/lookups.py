@@ -0,0 +1,306 @@
+"""
+Compiled, read-only store for the NWIS code, country/state/county and HUC lookups.
+
+The lookup JSON files are compiled into a single SQLite file (see the compile-lookups management command).
+The file is opened read-only and memory-mapped, so every worker process on a host shares the same pages
+through the operating system's page cache instead of holding its own parsed copy of the lookups. Each
+lookup is exposed as a read-only Mapping so that it can be used in place of the parsed JSON.
+
+The store also holds flat indexes of the state, county and parameter group names, which are used to
+disambiguate site data without walking the nested lookups.
+"""
+from collections.abc import Mapping
+from functools import lru_cache
+import json
+import os
+import sqlite3
+
+from .workers import WorkerLocal
+
+# Name of each lookup, the app.config key holding its file name and the number of nested levels which are
+# stored as individual rows. Deeper values are stored as JSON.
+LOOKUPS = [
+    ('NWIS_CODE_LOOKUP', 'NWIS_CODE_LOOKUP_FILENAME', 2),
+    ('COUNTRY_STATE_COUNTY_LOOKUP', 'COUNTRY_STATE_COUNTY_LOOKUP_FILENAME', 3),
+    ('HUC_LOOKUP', 'HUC_LOOKUP_FILENAME', 2)
+]
+
+# Separates the keys in the path of a row's parent
+_PATH_SEPARATOR = '\x1f'
+
+
+def _flatten(value, depth, parent=()):
+    """
+    Yield a (parent path, key, position, JSON value) row for each item in value. Items which are themselves
+    dictionaries and above depth are yielded with a JSON value of None followed by their own items.
+    """
+    for position, (key, child) in enumerate(value.items()):
+        if depth > 1 and isinstance(child, dict):
+            yield parent, key, position, None
+            yield from _flatten(child, depth - 1, parent + (key,))
+        else:
+            yield parent, key, position, json.dumps(child, separators=(',', ':'))
+
+
+def _index_rows(lookups):
+    """
+    Yield an (index, key, value) row for each state and county name and parameter group in lookups.
+    Keys of more than one code are joined with the path separator.
+
+    :param dict lookups: lookup dicts keyed by name
+    """
+    def get_name(value):
+        return value.get('name') if isinstance(value, dict) else None
+
+    for country_cd, country in lookups.get('COUNTRY_STATE_COUNTY_LOOKUP', {}).items():
+        for state_cd, state in country.get('state_cd', {}).items():
+            yield 'state_name', _PATH_SEPARATOR.join((country_cd, state_cd)), get_name(state)
+            if isinstance(state, dict):
+                for county_cd, county in state.get('county_cd', {}).items():
+                    yield 'county_name', _PATH_SEPARATOR.join((country_cd, state_cd, county_cd)), get_name(county)
+    for parm_cd, parameter in lookups.get('NWIS_CODE_LOOKUP', {}).get('parm_cd', {}).items():
+        if 'group' in parameter:
+            yield 'parameter_group', parm_cd, parameter['group']
+
+
+def compile_lookups(lookups, output_path, source_sizes=None):
+    """
+    Write lookups to a new lookup store.
+
+    :param list lookups: list of (name, lookup dict, depth)
+    :param str output_path: path of the SQLite file. An existing file is replaced.
+    :param dict source_sizes: size in bytes of each lookup file the lookups were read from, keyed by file
+        name, so that a store which is older than its files can be detected
+    """
+    temp_path = f'{output_path}.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        with conn:
+            conn.execute('CREATE TABLE lookup_node ('
+                         'lookup TEXT NOT NULL, parent TEXT NOT NULL, key TEXT NOT NULL, position INTEGER NOT NULL, '
+                         'value TEXT, PRIMARY KEY (lookup, parent, key)) WITHOUT ROWID')
+            conn.execute('CREATE INDEX lookup_node_position ON lookup_node (lookup, parent, position)')
+            for name, lookup, depth in lookups:
+                conn.executemany(
+                    'INSERT INTO lookup_node (lookup, parent, key, position, value) VALUES (?, ?, ?, ?, ?)',
+                    ((name, _PATH_SEPARATOR.join(parent), key, position, value)
+                     for parent, key, position, value in _flatten(lookup, depth))
+                )
+            conn.execute('CREATE TABLE lookup_index ('
+                         'name TEXT NOT NULL, key TEXT NOT NULL, value TEXT, PRIMARY KEY (name, key)) WITHOUT ROWID')
+            conn.executemany('INSERT INTO lookup_index (name, key, value) VALUES (?, ?, ?)',
+                             _index_rows({name: lookup for name, lookup, _ in lookups}))
+            conn.execute('CREATE TABLE lookup_source (filename TEXT PRIMARY KEY, size INTEGER NOT NULL)')
+            conn.executemany('INSERT INTO lookup_source (filename, size) VALUES (?, ?)',
+                             (source_sizes or {}).items())
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+    # Replace the file in one step so that running workers never see a partial file
+    os.replace(temp_path, output_path)
+
+
+def compile_lookup_files(config, output_path):
+    """
+    Compile the lookup JSON files named in config into a lookup store.
+
+    :param dict config: application configuration
+    :param str output_path: path of the SQLite file
+    """
+    lookups = []
+    for name, filename_key, depth in LOOKUPS:
+        with open(os.path.join(config['DATA_DIR'], config[filename_key]), 'r') as lookup_file:
+            lookups.append((name, json.load(lookup_file), depth))
+    compile_lookups(lookups, output_path, source_sizes=_get_source_sizes(config))
+
+
+def _get_source_sizes(config):
+    return {
+        config[filename_key]: os.path.getsize(os.path.join(config['DATA_DIR'], config[filename_key]))
+        for _, filename_key, _ in LOOKUPS
+    }
+
+
+def get_changed_lookup_files(store, config):
+    """
+    Return the lookup files named in config which have changed since store was compiled from them, judged
+    by their size. Reading the sizes is cheap enough to do whenever the application is loaded, whereas the
+    modification times of the files are not kept when the application is installed.
+
+    :param LookupStore store:
+    :param dict config: application configuration
+    :return: file names, all of them if the store does not record the files it was compiled from
+    :rtype: list of str
+    """
+    compiled_sizes = store.get_source_sizes()
+    return [filename for filename, size in _get_source_sizes(config).items() if compiled_sizes.get(filename) != size]
+
+
+class LookupStore:
+    """
+    Read-only access to a file written by compile_lookups
+    """
+
+    def __init__(self, path, mmap_size=64 * 1024 * 1024, cache_size=4096):
+        """
+        :param str path: path of the SQLite file
+        :param int mmap_size: maximum number of bytes of the file which SQLite memory-maps
+        :param int cache_size: number of decoded values kept by each process
+        """
+        self.path = path
+        self.mmap_size = mmap_size
+        self._connections = WorkerLocal(self._connect)
+        self._node = lru_cache(maxsize=cache_size)(self._query_node)
+        self._index_value = lru_cache(maxsize=cache_size)(self._query_index_value)
+
+    def _connect(self):
+        conn = sqlite3.connect(f'file:{self.path}?mode=ro&immutable=1', uri=True, check_same_thread=False)
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        return conn
+
+    def _connection(self):
+        # Connections can not be shared across threads or a fork so keep one per thread, or per gevent worker
+        return self._connections.get()
+
+    def _query_node(self, lookup, parent, key):
+        row = self._connection().execute(
+            'SELECT value FROM lookup_node WHERE lookup = ? AND parent = ? AND key = ?', (lookup, parent, key)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        if row[0] is None:
+            return LookupMapping(self, lookup, f'{parent}{_PATH_SEPARATOR}{key}' if parent else key)
+        return json.loads(row[0])
+
+    def _keys(self, lookup, parent):
+        return [row[0] for row in self._connection().execute(
+            'SELECT key FROM lookup_node WHERE lookup = ? AND parent = ? ORDER BY position', (lookup, parent)
+        )]
+
+    def _count(self, lookup, parent):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM lookup_node WHERE lookup = ? AND parent = ?', (lookup, parent)
+        ).fetchone()[0]
+
+    def _query_index_value(self, name, key):
+        row = self._connection().execute(
+            'SELECT value FROM lookup_index WHERE name = ? AND key = ?', (name, key)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def _index_keys(self, name):
+        return [row[0] for row in self._connection().execute(
+            'SELECT key FROM lookup_index WHERE name = ? ORDER BY key', (name,)
+        )]
+
+    def get_source_sizes(self):
+        """
+        :return: the size of each lookup file the store was compiled from, keyed by file name. Empty for
+            stores compiled by older versions.
+        :rtype: dict
+        """
+        try:
+            return dict(self._connection().execute('SELECT filename, size FROM lookup_source'))
+        except sqlite3.OperationalError:
+            return {}
+
+    def has_indexes(self):
+        """
+        :return: True if the store has the indexes, which stores compiled by older versions do not
+        :rtype: bool
+        """
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'lookup_index'"
+        ).fetchone()[0] > 0
+
+    def index(self, name):
+        """
+        :param str name: 'state_name' or 'county_name', keyed by tuples of the country, state and county
+            codes, or 'parameter_group', keyed by parameter code
+        :rtype: LookupIndexMapping
+        """
+        return LookupIndexMapping(self, name)
+
+    def lookup(self, name):
+        """
+        :param str name: name of a lookup, for example NWIS_CODE_LOOKUP
+        :rtype: LookupMapping
+        """
+        return LookupMapping(self, name, '')
+
+
+class LookupMapping(Mapping):
+    """
+    Read-only mapping backed by a LookupStore. Nested levels are also LookupMappings and values below
+    the compiled depth are decoded from JSON. Keys are iterated in the order of the original lookup.
+    """
+    __slots__ = ('_store', '_lookup', '_parent')
+
+    def __init__(self, store, lookup, parent):
+        self._store = store
+        self._lookup = lookup
+        self._parent = parent
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        # pylint: disable=W0212
+        return self._store._node(self._lookup, self._parent, key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self._store._keys(self._lookup, self._parent))  # pylint: disable=W0212
+
+    def __len__(self):
+        return self._store._count(self._lookup, self._parent)  # pylint: disable=W0212
+
+    def __repr__(self):
+        return f'<LookupMapping {self._lookup} {self._parent!r}>'
+
+
+class LookupIndexMapping(Mapping):
+    """
+    Read-only mapping backed by one of the indexes of a LookupStore. Keys may be tuples of codes.
+    """
+    __slots__ = ('_store', '_name')
+
+    def __init__(self, store, name):
+        self._store = store
+        self._name = name
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            key = _PATH_SEPARATOR.join(key)
+        if not isinstance(key, str):
+            raise KeyError(key)
+        return self._store._index_value(self._name, key)  # pylint: disable=W0212
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        # pylint: disable=W0212
+        return (tuple(key.split(_PATH_SEPARATOR)) if _PATH_SEPARATOR in key else key
+                for key in self._store._index_keys(self._name))
+
+    def __len__(self):
+        return self._store._connection().execute(  # pylint: disable=W0212
+            'SELECT COUNT(*) FROM lookup_index WHERE name = ?', (self._name,)
+        ).fetchone()[0]
+
+    def __repr__(self):
+        return f'<LookupIndexMapping {self._name}>'
@@ -0,0 +1,106 @@
+"""
+Cache rendered pages in each worker and answer conditional requests for them.
+
+"""
+from collections import namedtuple
+from functools import wraps
+import hashlib
+import time
+
+from flask import g, make_response, request
+
+from . import app
+from .services.cache import get_memory_cache
+
+
+CachedPage = namedtuple('CachedPage', ['body', 'status', 'headers', 'etag', 'last_modified'])
+
+# Request headers, other than the URL, which can change how a page is rendered, and the function returning
+# the part of the page key which is derived from each
+PAGE_VARIANTS = {
+    'Accept': lambda: 'ld+json' if request.headers.get('Accept', '').lower() == 'application/ld+json' else 'html',
+    'Cookie': lambda: 'no-banner' if request.cookies.get('no-show-banner-message') else 'banner',
+    'User-Agent': lambda: 'msie' if request.user_agent.browser == 'msie' else 'other'
+}
+
+
+def get_page_cache():
+    """
+    Returns the rendered page cache or None if PAGE_CACHE_MAX_ENTRIES is 0
+    :rtype: ServiceCache
+    """
+    if not app.config['PAGE_CACHE_MAX_ENTRIES']:
+        return None
+    return get_memory_cache(
+        'page',
+        app.config['PAGE_CACHE_TTL'],
+        max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'],
+        max_bytes=app.config['PAGE_CACHE_MAX_BYTES']
+    )
+
+
+def get_page_key(vary=()):
+    """
+    Returns the cache key of the page for the current request. Besides the URL, pages may differ in
+    whether JSON-LD was requested, whether the banner messages have been hidden with a cookie and whether
+    the page is rendered for Internet Explorer.
+    :param tuple vary: the request headers of PAGE_VARIANTS which the page depends on
+    :rtype: str
+    """
+    return ':'.join([PAGE_VARIANTS[header]() for header in vary] + [request.full_path])
+
+
+def skip_page_cache():
+    """
+    Do not cache the page for the current request, for instance because some of its data could not be
+    retrieved. The response still gets an ETag, but browsers and the CDN are told not to store it.
+    """
+    g.skip_page_cache = True
+
+
+def _page_response(page, vary):
+    response = app.response_class(page.body, status=page.status, headers=page.headers)
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    if vary:
+        response.vary.update(vary)
+    return response
+
+
+def cached_page(vary=()):
+    """
+    Decorator which caches the pages returned by a view in the page cache and gives them strong ETags.
+    Requests with a matching If-None-Match or If-Modified-Since header get a 304 response, so a cached
+    page is neither fetched nor rendered again. Only complete pages with a 200 status are cached.
+
+    :param tuple vary: the request headers of PAGE_VARIANTS which the page depends on. Pages are cached
+        separately for each variant and the response varies by these headers only.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            page_cache = get_page_cache()
+            key = get_page_key(vary)
+            page = page_cache.get(key) if page_cache is not None else None
+            if page is None:
+                response = make_response(func(*args, **kwargs))
+                if response.is_streamed:
+                    return response
+                body = response.get_data()
+                page = CachedPage(
+                    body=body,
+                    status=response.status_code,
+                    headers=[(name, value) for name, value in response.headers
+                             if name.lower() not in ('set-cookie', 'content-length')],
+                    etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+                    last_modified=time.time()
+                )
+                if page_cache is not None and page.status == 200 and not g.get('skip_page_cache'):
+                    page_cache.set(key, page)
+
+            response = _page_response(page, vary)
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
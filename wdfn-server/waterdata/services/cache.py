@@ -0,0 +1,493 @@
+"""
+Response cache used by the service classes. Values are pickled so that they can be sized and
+shared between processes. Two backends are available:
+
+- MemoryCacheBackend keeps entries in the process
+- SqliteCacheBackend keeps entries in a SQLite file which can be shared by all gunicorn workers on a host
+
+Both backends evict the least recently used entries when either the entry count or the total size
+of the pickled values goes over its limit.
+
+Expired entries can still be used for a while so that pages keep working when a service is slow or
+down. See cached_call.
+"""
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import pickle
+import sqlite3
+import threading
+import time
+
+from .. import app
+from ..workers import WorkerLocal, post_fork
+from .single_flight import FileLockStore
+
+
+CacheEntry = namedtuple('CacheEntry', ['value', 'expires_at'])
+
+
+class MemoryCacheBackend:
+    """
+    In process LRU store
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        """
+        :param int max_entries: maximum number of entries to keep or None for no limit
+        :param int max_bytes: maximum total size of the stored values or None for no limit
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :param str key:
+        :return: stored data and expiration time or None if key is not in the store
+        :rtype: tuple of (bytes, float) or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, data, expires_at):
+        """
+        :param str key:
+        :param bytes data:
+        :param float expires_at: epoch time in seconds
+        """
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (data, expires_at)
+            self._size += len(data)
+            while self._entries and self._over_limit():
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        :param str key:
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def _over_limit(self):
+        return (self.max_entries is not None and len(self._entries) > self.max_entries) or \
+            (self.max_bytes is not None and self._size > self.max_bytes)
+
+    @property
+    def size(self):
+        """Total size in bytes of the stored data"""
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteCacheBackend:
+    """
+    LRU store kept in a SQLite database file. Every process (and thread, except in gevent workers) opens its
+    own connection to the file so one file can be shared by all of the workers on a host.
+    """
+
+    def __init__(self, path, max_entries=None, max_bytes=None):
+        """
+        :param str path: path of the database file. It is created if it does not exist.
+        :param int max_entries: maximum number of entries to keep or None for no limit
+        :param int max_bytes: maximum total size of the stored values or None for no limit
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._connections = WorkerLocal(self._connect)
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_entry ('
+                         'key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, '
+                         'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_entry_accessed_at ON cache_entry (accessed_at)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connection(self):
+        # Connections can not be shared across threads or a fork so keep one per thread, or per gevent worker
+        return self._connections.get()
+
+    def get(self, key):
+        """
+        :param str key:
+        :return: stored data and expiration time or None if key is not in the store
+        :rtype: tuple of (bytes, float) or None
+        """
+        conn = self._connection()
+        row = conn.execute('SELECT data, expires_at FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            conn.execute('UPDATE cache_entry SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            return bytes(row[0]), row[1]
+        return None
+
+    def set(self, key, data, expires_at):
+        """
+        :param str key:
+        :param bytes data:
+        :param float expires_at: epoch time in seconds
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT OR REPLACE INTO cache_entry (key, data, size, expires_at, accessed_at) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, data, len(data), expires_at, time.time()))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        count, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry').fetchone()
+        excess_entries = count - self.max_entries if self.max_entries is not None else 0
+        excess_bytes = size - self.max_bytes if self.max_bytes is not None else 0
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+        evict_keys = []
+        for key, entry_size in conn.execute('SELECT key, size FROM cache_entry ORDER BY accessed_at'):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            evict_keys.append((key,))
+            excess_entries -= 1
+            excess_bytes -= entry_size
+        conn.executemany('DELETE FROM cache_entry WHERE key = ?', evict_keys)
+        self.evictions += len(evict_keys)
+
+    def delete(self, key):
+        """
+        :param str key:
+        """
+        self._connection().execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+
+    def clear(self):
+        """Remove all entries"""
+        self._connection().execute('DELETE FROM cache_entry')
+
+    @property
+    def size(self):
+        """Total size in bytes of the stored data"""
+        return self._connection().execute('SELECT COALESCE(SUM(size), 0) FROM cache_entry').fetchone()[0]
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+
+
+class ServiceCache:
+    """
+    A view of a backend for one service. Keys are prefixed with the service's namespace and entries
+    expire after the service's time to live. Expired entries are kept in the backend for the longer of
+    the stale windows so that cached_call can still use them.
+    """
+
+    def __init__(self, backend, namespace, ttl, stale_while_revalidate=0, stale_if_error=0, locks=None):
+        """
+        :param backend: MemoryCacheBackend or SqliteCacheBackend
+        :param str namespace: prefix for this service's keys
+        :param float ttl: time to live of entries in seconds
+        :param float stale_while_revalidate: seconds after expiring during which an entry is used while it
+            is refreshed in the background
+        :param float stale_if_error: seconds after expiring during which an entry is used if the service fails
+        :param FileLockStore locks: optional locks shared with the other processes using backend. A process
+            holds the lock for a key while it fetches the missing value, so the others wait and use its value.
+        """
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self.locks = locks
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+
+    @property
+    def _stale_window(self):
+        return max(self.stale_while_revalidate, self.stale_if_error)
+
+    def _read(self, key):
+        entry = self.backend.get(self._key(key))
+        now = time.time()
+        if entry is None or entry[1] < now:
+            return None
+        return entry[0], now - (entry[1] - self._stale_window)
+
+    def get(self, key):
+        """
+        Return the value cached for key.
+        :param str key:
+        :return: the cached value or None if there is no unexpired value
+        """
+        entry = self._read(key)
+        if entry is None or entry[1] > 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(entry[0])
+
+    def get_entry(self, key):
+        """
+        Return the value cached for key and how long ago it expired.
+        :param str key:
+        :return: the cached value and the number of seconds since it expired, which is zero or negative if
+            it has not expired, or None if there is no value or it expired more than the stale windows ago
+        :rtype: tuple or None
+        """
+        entry = self._read(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        data, staleness = entry
+        if staleness > 0:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return pickle.loads(data), staleness
+
+    def set(self, key, value):
+        """
+        Cache value for the service's time to live.
+        :param str key:
+        :param value: any picklable value
+        """
+        self.backend.set(self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                         time.time() + self.ttl + self._stale_window)
+
+    def delete(self, key):
+        """
+        :param str key:
+        """
+        self.backend.delete(self._key(key))
+
+    @property
+    def stats(self):
+        """
+        :return: hit, stale hit and miss counts for this process
+        :rtype: dict
+        """
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses
+        }
+
+
+def cached_call(cache, key, fetch, flights=None):
+    """
+    Return the value cached for key or call fetch to get it. An expired value is returned at once and
+    refreshed in the background within the cache's stale_while_revalidate window. After that and within
+    its stale_if_error window, fetch is called and the expired value is returned if it fails.
+
+    :param ServiceCache cache: may be None in which case fetch is always called
+    :param str key:
+    :param callable fetch: function with no arguments returning a tuple of the value and whether the value
+        should be cached. Failed responses should not be cached.
+    :param SingleFlight flights: optional, so that concurrent calls for key share one call to fetch
+    :return: value
+    """
+    if cache is None:
+        return (flights.do(key, fetch) if flights is not None else fetch())[0]
+    entry = cache.get_entry(key)
+    if entry is not None:
+        value, staleness = entry
+        if staleness <= 0:
+            return value
+        if staleness <= cache.stale_while_revalidate:
+            refresh_in_background(cache, key, fetch)
+            return value
+
+    def fetch_into_cache():
+        return _fetch_into_cache(cache, key, fetch)
+    fresh_value, cacheable = flights.do(key, fetch_into_cache) if flights is not None else fetch_into_cache()
+    if not cacheable and entry is not None:
+        app.logger.warning(f'Using {cache.namespace} response for {key} which expired {entry[1]:.0f} seconds ago')
+        return entry[0]
+    return fresh_value
+
+
+def _fetch_into_cache(cache, key, fetch):
+    if cache.locks is None:
+        value, cacheable = fetch()
+    else:
+        with cache.locks.lock(cache._key(key)):  # pylint: disable=W0212
+            # Another process may have cached the value while this one waited for the lock
+            entry = cache.get_entry(key)
+            if entry is not None and entry[1] <= 0:
+                return entry[0], True
+            value, cacheable = fetch()
+    if cacheable:
+        cache.set(key, value)
+    return value, cacheable
+
+
+_refresh_executor = None
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+@post_fork
+def _reset_refresh_executor():
+    """
+    A worker must not use the executor or refresh state of the process it was forked from.
+    """
+    global _refresh_executor  # pylint: disable=global-statement
+    _refresh_executor = None
+    _refreshing.clear()
+
+
+def _refresh(cache, key, fetch):
+    try:
+        value, cacheable = fetch()
+        if cacheable:
+            cache.set(key, value)
+    except Exception as err:  # pylint: disable=broad-except
+        app.logger.error(f'Refreshing {cache.namespace} response for {key} failed: {err!r}')
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard((cache.namespace, key))
+
+
+def refresh_in_background(cache, key, fetch):
+    """
+    Call fetch in a background thread and cache its value if it succeeds. Nothing is done if key is
+    already being refreshed by this process.
+
+    :param ServiceCache cache:
+    :param str key:
+    :param callable fetch: see cached_call
+    :return: future of the refresh or None if key is already being refreshed
+    :rtype: concurrent.futures.Future
+    """
+    global _refresh_executor  # pylint: disable=global-statement
+    with _refreshing_lock:
+        if (cache.namespace, key) in _refreshing:
+            return None
+        _refreshing.add((cache.namespace, key))
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=app.config['SERVICE_CACHE_REFRESH_WORKERS'],
+                                                   thread_name_prefix='cache-refresh')
+    return _refresh_executor.submit(_refresh, cache, key, fetch)
+
+
+_backend = None
+_backends = {}
+_caches = {}
+
+
+def create_cache_backend(config):
+    """
+    Create the backend described by config.
+    :param dict config: application configuration
+    :return: backend or None if caching is disabled
+    """
+    backend_name = config.get('SERVICE_CACHE_BACKEND')
+    max_entries = config.get('SERVICE_CACHE_MAX_ENTRIES')
+    max_bytes = config.get('SERVICE_CACHE_MAX_BYTES')
+    if backend_name == 'memory':
+        return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+    if backend_name == 'sqlite':
+        return SqliteCacheBackend(config['SERVICE_CACHE_PATH'], max_entries=max_entries, max_bytes=max_bytes)
+    if backend_name:
+        raise ValueError(f'Unknown SERVICE_CACHE_BACKEND {backend_name}')
+    return None
+
+
+_lock_store = None
+
+
+def _get_lock_store():
+    global _lock_store  # pylint: disable=global-statement
+    if _lock_store is None and app.config['SERVICE_CACHE_LOCK_DIR']:
+        _lock_store = FileLockStore(app.config['SERVICE_CACHE_LOCK_DIR'],
+                                    timeout=app.config['SERVICE_CACHE_LOCK_TIMEOUT'])
+    return _lock_store
+
+
+def get_service_cache(namespace):
+    """
+    Return the cache for namespace using the application's configured backend and the namespace's
+    time to live and stale windows from SERVICE_CACHE_TTLS, SERVICE_CACHE_STALE_WHILE_REVALIDATE and
+    SERVICE_CACHE_STALE_IF_ERROR.
+    :param str namespace:
+    :return: ServiceCache or None if caching is disabled
+    """
+    global _backend  # pylint: disable=global-statement
+    if _backend is None:
+        _backend = create_cache_backend(app.config)
+        if _backend is None:
+            return None
+        _backends['service'] = _backend
+    if namespace not in _caches:
+        _caches[namespace] = ServiceCache(
+            _backend,
+            namespace,
+            app.config['SERVICE_CACHE_TTLS'][namespace],
+            stale_while_revalidate=app.config['SERVICE_CACHE_STALE_WHILE_REVALIDATE'].get(namespace, 0),
+            stale_if_error=app.config['SERVICE_CACHE_STALE_IF_ERROR'].get(namespace, 0),
+            locks=_get_lock_store()
+        )
+    return _caches[namespace]
+
+
+def get_memory_cache(namespace, ttl, max_entries=None, max_bytes=None):
+    """
+    Return the cache for namespace with its own in process backend, creating it on first use. Use this
+    rather than get_service_cache for values which should be cached whether or not SERVICE_CACHE_BACKEND
+    is set and which should not count against its limits.
+    :param str namespace:
+    :param float ttl: time to live of entries in seconds
+    :param int max_entries: maximum number of entries to keep or None for no limit
+    :param int max_bytes: maximum total size of the stored values or None for no limit
+    :rtype: ServiceCache
+    """
+    if namespace not in _caches:
+        _backends[namespace] = MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+        _caches[namespace] = ServiceCache(_backends[namespace], namespace, ttl)
+    return _caches[namespace]
+
+
+def get_cache_backend_stats():
+    """
+    :return: entry count, total size in bytes and eviction count of each backend used in this process,
+        keyed by 'service' for the service cache backend and by namespace for memory caches
+    :rtype: dict
+    """
+    return {
+        name: {
+            'entries': len(backend),
+            'bytes': backend.size,
+            'evictions': backend.evictions
+        } for name, backend in _backends.items()
+    }
+
+
+def get_cache_stats():
+    """
+    :return: hit and miss counts for each service cache used in this process
+    :rtype: dict
+    """
+    return {namespace: cache.stats for namespace, cache in _caches.items()}
@@ -1,9 +1,16 @@
 """
 Service to return metadata about available camera images
+
+The list of enabled cameras is kept in a CameraStore, indexed by site number, which reloads it in the
+background every MONITORING_LOCATION_CAMERA_REFRESH_INTERVAL seconds.
 """
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 
 from .. import app
 from ..utils import execute_get_request
+from ..workers import post_fork
 
 ML_CAMERA_ENDPOINT = app.config['MONITORING_LOCATION_CAMERA_ENDPOINT']
 
@@ -40,6 +47,108 @@ def fetch_camera_metadata():
     return result
 
 
+class CameraStore:
+    """
+    Camera details indexed by site number. The cameras are loaded on first use and reloaded in a background
+    thread once they are older than refresh_interval, while lookups keep using the current index. Each load
+    builds a new index which replaces the old one in a single assignment, so a lookup never sees a partly
+    built index. If a load fails or finds no cameras, the last good index is kept and loading is not tried
+    again for retry_interval seconds.
+    """
+
+    def __init__(self, fetch, refresh_interval, retry_interval):
+        """
+        :param callable fetch: function with no arguments returning the getAllEnabledCameras response
+        :param float refresh_interval: seconds between loads
+        :param float retry_interval: seconds to wait after a load which failed or found no cameras
+        """
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.loaded_at = None
+        self._cameras_by_site = None
+        self._next_load = 0.0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._refreshing = False
+
+    def _load(self):
+        try:
+            cameras_by_site = {}
+            for camera in self.fetch().get('data', []):
+                cameras_by_site.setdefault(camera['usgsSiteNumber'], []).append(_get_camera_details(camera))
+        except Exception as err:  # pylint: disable=broad-except
+            app.logger.error(f'Loading the camera metadata failed: {err!r}')
+            cameras_by_site = {}
+
+        if cameras_by_site:
+            self._cameras_by_site = {site_no: tuple(details) for site_no, details in cameras_by_site.items()}
+            self.loaded_at = time.time()
+            self._next_load = time.monotonic() + self.refresh_interval
+        else:
+            app.logger.warning('No camera metadata was loaded, using the cameras from the last load')
+            if self._cameras_by_site is None:
+                self._cameras_by_site = {}
+            self._next_load = time.monotonic() + self.retry_interval
+
+    def _refresh(self):
+        try:
+            self._load()
+        finally:
+            self._refreshing = False
+
+    def refresh_in_background(self):
+        """
+        Reload the cameras in a background thread, unless they are already being reloaded.
+
+        :return: future of the reload or None if one is already running
+        :rtype: concurrent.futures.Future
+        """
+        with self._lock:
+            if self._refreshing:
+                return None
+            self._refreshing = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='camera-refresh')
+        return self._executor.submit(self._refresh)
+
+    def reset(self):
+        """
+        Forget the executor and reload state, which belong to the process the store was created in.
+        """
+        self._executor = None
+        self._refreshing = False
+
+    def get(self, site_no):
+        """
+        :param str site_no:
+        :return: details of the cameras at site_no
+        :rtype: list of dict
+        """
+        if self._cameras_by_site is None:
+            with self._lock:
+                if self._cameras_by_site is None:
+                    self._load()
+        elif time.monotonic() >= self._next_load:
+            self.refresh_in_background()
+        return list(self._cameras_by_site.get(site_no, ()))
+
+
+camera_store = CameraStore(
+    fetch_camera_metadata,
+    app.config['MONITORING_LOCATION_CAMERA_REFRESH_INTERVAL'],
+    app.config['MONITORING_LOCATION_CAMERA_RETRY_INTERVAL']
+)
+
+
+@post_fork
+def _reset_camera_store():
+    """
+    A worker must not use the refresh thread of the process it was forked from.
+    """
+    camera_store.reset()
+
+
 def get_monitoring_location_camera_details(site_no):
     """
     Returns meta data for the camera images available for site_no
@@ -47,9 +156,4 @@ def get_monitoring_location_camera_details(site_no):
     :return list of dictionaries with keys for links to med_video, small_video, and details
     :rtype list
     """
-    if not app.config.get('MONITORING_LOCATION_CAMERA_METADATA', {}):
-        app.config['MONITORING_LOCATION_CAMERA_METADATA'] = fetch_camera_metadata().get('data', [])
-
-    ml_camera_data = list(filter(lambda x: x['usgsSiteNumber'] == site_no,
-                                 app.config['MONITORING_LOCATION_CAMERA_METADATA']))
-    return list(map(_get_camera_details, ml_camera_data))
+    return camera_store.get(site_no)
@@ -3,8 +3,13 @@ Class and functions for calling NWIS services and working with
 the returned data.
 
 """
-from requests import exceptions as request_exceptions, Session
-from ..utils import parse_rdb
+import uuid
+
+from requests import exceptions as request_exceptions
+from ..utils import parse_rdb, parse_rdb_rows, rdb_row_type
+from ..http_client import create_session
+from .cache import cached_call
+from .single_flight import SingleFlight
 
 from .. import app
 
@@ -14,14 +19,17 @@ class SiteService:
     Provides access to the NWIS site service
     """
 
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, cache=None):
         """
         Constructor method.
 
         :param str endpoint: the scheme, host and path to the NWIS site service
+        :param ServiceCache cache: optional cache for successful responses
         """
         self.endpoint = endpoint
-        self.session = Session()
+        self.session = create_session()
+        self.cache = cache
+        self.flights = SingleFlight()
 
     def get(self, params):
         """
@@ -34,6 +42,19 @@ class SiteService:
             - reason - string
             - site_data - list of dictionaries
         """
+        return cached_call(self.cache, self._cache_key(params), lambda: self._fetch(params), flights=self.flights)
+
+    @staticmethod
+    def _cache_key(params):
+        return '&'.join(f'{key}={value}' for key, value in sorted(params.items()))
+
+    def _fetch(self, params):
+        """
+        Request params from the service.
+        :param dict params:
+        :return: the result for get and whether it can be cached
+        :rtype: tuple
+        """
         app.logger.debug(f'Requesting data from {self.endpoint}')
         default_params = {
             'format': 'rdb'
@@ -43,11 +64,110 @@ class SiteService:
             response = self.session.get(self.endpoint, params=default_params)
         except (request_exceptions.Timeout, request_exceptions.ConnectionError) as err:
             app.logger.error(repr(err))
-            return 500, repr(err), None
+            return (500, repr(err), None), False
         if response.status_code == 200:
-            return 200, response.reason, list(parse_rdb(response.iter_lines(decode_unicode=True)))
+            return (200, response.reason, list(parse_rdb(response.iter_lines(decode_unicode=True)))), True
+
+        return (response.status_code, response.reason, []), False
+
+    def get_rows(self, params, sort_column=None, reverse=False, stream=False):
+        """
+        Like get but the rows are named tuples, which take much less memory than dictionaries. The rows are
+        parsed as the response is streamed and cached in a compact form. When sort_column is given, the
+        order of the rows by that column is cached along with them, so that each page of a sorted list
+        does not sort the rows again.
+
+        If stream is True, the rows are neither cached nor sorted but parsed lazily as they are consumed,
+        so memory use does not grow with the size of the response as long as the rows are not kept. The
+        response is closed when the rows have been consumed.
+
+        :param dict params:
+        :param str sort_column: optional column to sort the rows by. Unknown columns are ignored.
+        :param bool reverse: sort in descending order
+        :param bool stream: stream the rows from the service rather than from the cache
+        :returns
+            - status_code - status code returned from the service request
+            - reason - string
+            - rows - iterator of named tuples, empty if the request failed
+        """
+        if stream:
+            return self._stream_rows(params)
+
+        key = f'rows:{self._cache_key(params)}'
+        status, reason, table = cached_call(self.cache, key, lambda: self._fetch_rows(params), flights=self.flights)
+        if status != 200:
+            return status, reason, iter(())
 
-        return response.status_code, response.reason, []
+        headers, values, version = table
+        make_row = rdb_row_type(headers)._make
+        if sort_column not in headers:
+            return 200, reason, map(make_row, values)
+
+        column_index = headers.index(sort_column)
+        order = cached_call(
+            self.cache, f'order:{sort_column}:{version}:{key}',
+            lambda: (sorted(range(len(values)), key=lambda index: values[index][column_index]), True),
+            flights=self.flights
+        )
+        return 200, reason, map(make_row, map(values.__getitem__, reversed(order) if reverse else order))
+
+    def _stream_rows(self, params):
+        """
+        Request params from the service and return the rows as a generator parsing the streamed response.
+        :param dict params:
+        :return: the status, reason and rows
+        :rtype: tuple
+        """
+        app.logger.debug(f'Streaming data from {self.endpoint}')
+        default_params = {
+            'format': 'rdb'
+        }
+        default_params.update(params)
+        try:
+            response = self.session.get(self.endpoint, params=default_params, stream=True)
+        except (request_exceptions.Timeout, request_exceptions.ConnectionError) as err:
+            app.logger.error(repr(err))
+            return 500, repr(err), iter(())
+        if response.status_code != 200:
+            response.close()
+            return response.status_code, response.reason, iter(())
+
+        return 200, response.reason, self._iter_rows(response)
+
+    @staticmethod
+    def _iter_rows(response):
+        try:
+            yield from parse_rdb_rows(response.iter_lines(decode_unicode=True))
+        finally:
+            response.close()
+
+    def _fetch_rows(self, params):
+        """
+        Request params from the service and parse the rows as they are streamed.
+        :param dict params:
+        :return: the status, reason and the column names, row values and a version identifying them, and
+            whether the result can be cached
+        :rtype: tuple
+        """
+        app.logger.debug(f'Streaming data from {self.endpoint}')
+        default_params = {
+            'format': 'rdb'
+        }
+        default_params.update(params)
+        try:
+            response = self.session.get(self.endpoint, params=default_params, stream=True)
+        except (request_exceptions.Timeout, request_exceptions.ConnectionError) as err:
+            app.logger.error(repr(err))
+            return (500, repr(err), None), False
+        with response:
+            if response.status_code != 200:
+                return (response.status_code, response.reason, None), False
+            headers = ()
+            values = []
+            for row in parse_rdb_rows(response.iter_lines(decode_unicode=True)):
+                headers = row._fields
+                values.append(tuple(row))
+        return (200, response.reason, (headers, values, uuid.uuid4().hex)), True
 
     def get_site_data(self, site_no, agency_cd=''):
         """
@@ -60,13 +180,17 @@ class SiteService:
             - reason - string
             - site_metadata - list of dict representing the data returned in the rdb file
         """
+        return self.get(self._site_data_params(site_no, agency_cd))
+
+    @staticmethod
+    def _site_data_params(site_no, agency_cd):
         params = {
             'sites': site_no,
             'siteOutput': 'expanded'
         }
         if agency_cd:
             params['agencyCd'] = agency_cd
-        return self.get(params)
+        return params
 
     def get_period_of_record(self, site_no, agency_cd=''):
         """
@@ -79,6 +203,10 @@ class SiteService:
             - reason - string
             - periodOfRecord - list of dict representing the period of record for the data available at the site
         """
+        return self.get(self._period_of_record_params(site_no, agency_cd))
+
+    @staticmethod
+    def _period_of_record_params(site_no, agency_cd):
         params = {
             'sites': site_no,
             'seriesCatalogOutput': True,
@@ -86,7 +214,107 @@ class SiteService:
         }
         if agency_cd:
             params['agencyCd'] = agency_cd
-        return self.get(params)
+        return params
+
+    def get_sites_data(self, site_nos, agency_cd='', chunk_size=100, executor=None):
+        """
+        Get the metadata for many sites, chunk_size sites per request.
+        Sites which are not found have no rows.
+
+        :param list site_nos: site identifiers
+        :param str agency_cd: identifier for the agency that owns the sites
+        :param int chunk_size: maximum number of sites in a request
+        :param concurrent.futures.Executor executor: optional executor to make the requests concurrently
+        :returns:
+            - site_metadata - dict of each site number and the list of dict representing its rows
+            - failed - list of the site numbers whose request failed
+        """
+        return self._get_batched(self._site_data_params, site_nos, agency_cd, chunk_size, executor)
+
+    def get_sites_period_of_record(self, site_nos, agency_cd='', chunk_size=100, executor=None):
+        """
+        Get the parameters measured at many sites, chunk_size sites per request.
+        Sites which are not found have no rows.
+
+        :param list site_nos: site identifiers
+        :param str agency_cd: identifier for the agency that owns the sites
+        :param int chunk_size: maximum number of sites in a request
+        :param concurrent.futures.Executor executor: optional executor to make the requests concurrently
+        :returns:
+            - periodOfRecord - dict of each site number and the list of dict representing its data series
+            - failed - list of the site numbers whose request failed
+        """
+        return self._get_batched(self._period_of_record_params, site_nos, agency_cd, chunk_size, executor)
+
+    def _get_batched(self, make_params, site_nos, agency_cd, chunk_size, executor=None):
+        """
+        Split site_nos into chunks, get each chunk with a multi-site request and return the rows of each site.
+        A chunk which the service does not find any sites in is not a failure.
+
+        :param callable make_params: returns the parameters for a comma separated list of site numbers and agency_cd
+        :param list site_nos: site identifiers
+        :param str agency_cd: identifier for the agency that owns the sites
+        :param int chunk_size: maximum number of sites in a request
+        :param concurrent.futures.Executor executor: optional executor to make the requests concurrently
+        :returns:
+            - rows_by_site - dict of each site number and its rows, which are empty if it was not found
+            - failed - list of the site numbers whose request failed
+        """
+        chunks = [site_nos[start:start + chunk_size] for start in range(0, len(site_nos), chunk_size)]
+
+        def get_chunk(chunk):
+            return self.get(make_params(','.join(chunk), agency_cd))
+
+        responses = executor.map(get_chunk, chunks) if executor is not None else map(get_chunk, chunks)
+        rows_by_site = {site_no: [] for site_no in site_nos}
+        failed = []
+        for chunk, (status, reason, rows) in zip(chunks, responses):
+            if status == 200:
+                for site_no, site_rows in self._rows_by_site(rows).items():
+                    if site_no in rows_by_site:
+                        rows_by_site[site_no] = site_rows
+            elif status != 404:
+                app.logger.error(f'Unable to retrieve sites {",".join(chunk)}: {status} {reason}')
+                failed.extend(chunk)
+        return rows_by_site, failed
+
+    @staticmethod
+    def _rows_by_site(rows):
+        rows_by_site = {}
+        for row in rows:
+            rows_by_site.setdefault(row.get('site_no'), []).append(row)
+        return rows_by_site
+
+    def prefetch(self, site_nos, agency_cd=''):
+        """
+        Fetch the site data and period of record of several sites with one multi-site request each, and
+        cache the rows of each site as the responses of get_site_data and get_period_of_record for that
+        site. Sites which are not in a response are not cached.
+
+        :param list site_nos: site identifiers
+        :param str agency_cd: identifier for the agency that owns the sites
+        :returns:
+            - site_data - list of dict representing the data returned in the rdb file for all of the sites,
+              empty if the request failed
+            - cached - number of responses which were cached
+        """
+        sites = ','.join(site_nos)
+        site_data = []
+        cached = 0
+        for make_params in (self._site_data_params, self._period_of_record_params):
+            (status, reason, rows), _ = self._fetch(make_params(sites, agency_cd))
+            if status != 200:
+                app.logger.error(f'Unable to prefetch sites {sites}: {status} {reason}')
+                continue
+            if make_params is self._site_data_params:
+                site_data = rows
+            rows_by_site = self._rows_by_site(rows)
+            for site_no in site_nos:
+                if site_no in rows_by_site and self.cache is not None:
+                    self.cache.set(self._cache_key(make_params(site_no, agency_cd)),
+                                   (status, reason, rows_by_site[site_no]))
+                    cached += 1
+        return site_data, cached
 
     def get_huc_sites(self, huc_cd):
         """
@@ -116,3 +344,37 @@ class SiteService:
         return self.get({
             'countyCd': state_county_cd
         })
+
+    def get_huc_site_rows(self, huc_cd, sort_column=None, reverse=False, stream=False):
+        """
+        Get the sites within a hydrologic unit, optionally sorted or streamed. See get_rows.
+
+        :param str huc_cd: hydrologic unit code
+        :param str sort_column: optional column to sort the sites by
+        :param bool reverse: sort in descending order
+        :param bool stream: stream the sites from the service
+        :returns: all sites in the specified HUC
+            - status - status code from response
+            - reason - string
+            - sites - iterator of named tuples representing the sites in huc_cd
+        """
+        return self.get_rows({
+            'huc': huc_cd
+        }, sort_column=sort_column, reverse=reverse, stream=stream)
+
+    def get_county_site_rows(self, state_county_cd, sort_column=None, reverse=False, stream=False):
+        """
+        Get the sites within a county, optionally sorted or streamed. See get_rows.
+
+        :param str state_county_cd: FIPS ID for a statecounty
+        :param str sort_column: optional column to sort the sites by
+        :param bool reverse: sort in descending order
+        :param bool stream: stream the sites from the service
+        :returns: all sites in the specified county
+            - status - status code from response
+            - reason - string
+            - sites - iterator of named tuples representing the sites in state_county_cd
+        """
+        return self.get_rows({
+            'countyCd': state_county_cd
+        }, sort_column=sort_column, reverse=reverse, stream=stream)
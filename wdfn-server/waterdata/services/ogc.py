@@ -1,9 +1,12 @@
 """
 Class and functions for calling the observations OGC endpoint for monitoring location collections
 """
-from requests import exceptions as request_exceptions, Session
+from requests import exceptions as request_exceptions
 
 from .. import app
+from ..http_client import create_session
+from .cache import cached_call
+from .single_flight import SingleFlight
 
 
 class MonitoringLocationNetworkService:
@@ -11,9 +14,11 @@ class MonitoringLocationNetworkService:
     Provide access to the OGC Observations API service for networks of monitoring locations
     """
 
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, cache=None):
         self.endpoint = endpoint
-        self.session = Session()
+        self.session = create_session()
+        self.cache = cache
+        self.flights = SingleFlight()
 
     def get_networks(self, network_cd=''):
         """
@@ -23,18 +28,56 @@ class MonitoringLocationNetworkService:
         :return dictionary representing the OGC Feature collection if network_cd is not blank or
         a dictionary containing a list of collections.
         """
+        return cached_call(self.cache, network_cd, lambda: self._fetch_networks(network_cd), flights=self.flights)
+
+    def _fetch_networks(self, network_cd):
+        """
+        :param network_cd: collections-id
+        :return tuple of the network data and whether it can be cached
+        """
         url = f"{self.endpoint}{network_cd}"
         try:
             response = self.session.get(url, params={'f': 'json'})
         except (request_exceptions.Timeout, request_exceptions.ConnectionError) as err:
             app.logger.error(repr(err))
-            return {}
+            return {}, False
 
         if response.status_code != 200:
-            return {}
+            return {}, False
         try:
             resp_json = response.json()
         except ValueError:
-            return {}
+            return {}, False
         else:
-            return resp_json
+            return resp_json, True
+
+    def get_network_site_nos(self, network_cd):
+        """
+        Fetches the monitoring locations in a network, following the pages of the collection's items.
+        Responses are not cached.
+        :param network_cd: collections-id
+        :return list of the site numbers of the monitoring locations, or None if a request failed
+        """
+        url = f'{self.endpoint}{network_cd}/items'
+        params = {'f': 'json'}
+        site_nos = []
+        while url:
+            try:
+                response = self.session.get(url, params=params)
+            except (request_exceptions.Timeout, request_exceptions.ConnectionError) as err:
+                app.logger.error(repr(err))
+                return None
+            if response.status_code != 200:
+                return None
+            try:
+                resp_json = response.json()
+            except ValueError:
+                return None
+            for feature in resp_json.get('features', []):
+                # Feature ids are the agency code and site number, for example USGS-01646500
+                site_no = str(feature.get('id', '')).partition('-')[2]
+                if site_no:
+                    site_nos.append(site_no)
+            url = next((link['href'] for link in resp_json.get('links', []) if link.get('rel') == 'next'), None)
+            params = None
+        return site_nos
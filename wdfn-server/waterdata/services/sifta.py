@@ -1,18 +1,36 @@
 """
 Helpers to retrieve SIFTA cooperator data.
 """
-from requests import exceptions as request_exceptions, Session
+from requests import exceptions as request_exceptions
 
 from .. import app
+from ..http_client import create_session
+from .cache import cached_call
+from .single_flight import SingleFlight
 
 
 class SiftaService:
     """
     Provide access to a service that returns cooperator data
     """
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, cache=None):
         self.endpoint = endpoint
-        self.session = Session()
+        self.session = create_session()
+        self.cache = cache
+        self.flights = SingleFlight()
+
+    def get(self, site_no):
+        """
+        Gets the cooperator data from the SIFTA service along with the status of the request
+
+        :param site_no: USGS site number
+        :returns
+            - status_code - status code returned from the service request, 500 if it could not be made or its
+              response could not be read
+            - reason - string
+            - cooperators - Array of dict, empty if the request failed
+        """
+        return cached_call(self.cache, site_no, lambda: self._fetch_cooperators(site_no), flights=self.flights)
 
     def get_cooperators(self, site_no):
         """
@@ -21,18 +39,25 @@ class SiftaService:
         :param site_no: USGS site number
         :return Array of dict
         """
+        return self.get(site_no)[2]
+
+    def _fetch_cooperators(self, site_no):
+        """
+        :param site_no: USGS site number
+        :return tuple of the result for get and whether it can be cached
+        """
         url = f'{self.endpoint}{site_no}'
         try:
             response = self.session.get(url)
         except (request_exceptions.Timeout, request_exceptions.ConnectionError) as err:
             app.logger.error(repr(err))
-            return []
+            return (500, repr(err), []), False
 
         if response.status_code != 200:
-            return []
+            return (response.status_code, response.reason, []), False
         try:
             resp_json = response.json()
-        except ValueError:
-            return []
+        except ValueError as err:
+            return (500, repr(err), []), False
         else:
-            return resp_json.get('Customers', [])
+            return (200, response.reason, resp_json.get('Customers', [])), True
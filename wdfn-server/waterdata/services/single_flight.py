@@ -0,0 +1,138 @@
+"""
+Deduplication of identical upstream requests which are made at the same time.
+
+- SingleFlight shares one call between the threads of a worker which make it concurrently
+- FileLockStore provides locks shared by all of the workers on a host, so that only one of them fetches a
+  response which is missing from a shared cache while the others wait for it to be cached
+"""
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import os
+import threading
+import time
+
+
+class _Call:
+    """
+    A call in flight and its outcome
+    """
+    # pylint: disable=R0903
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call at a time for each key. Callers which ask for a key while its call is running
+    wait for that call and get its result, or its exception, instead of making their own. The result is
+    shared, so callers must not modify it.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Call func, or wait for the call for key which is already running.
+
+        :param str key:
+        :param callable func: function with no arguments
+        :return: the value returned by func
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class FileLockStore:
+    """
+    Exclusive locks shared by the processes on a host, kept as files in a directory. Each key has its own
+    lock file, named by a digest of the key, so a slow fetch only holds up the fetches of the same key.
+    The file is removed when the lock is released, so the directory only holds the locks in use.
+    """
+
+    def __init__(self, directory, timeout=10):
+        """
+        :param str directory: directory for the lock files. It is created if it does not exist.
+        :param float timeout: seconds to wait for a lock before going ahead without it
+        """
+        self.directory = directory
+        self.timeout = timeout
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()}.lock')
+
+    def _try_lock(self, path):
+        """
+        Return the open lock file at path if it could be locked, otherwise None. A file which was removed
+        by the previous holder of the lock while this process waited for it is not the lock any more.
+        """
+        lock_file = open(path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        try:
+            current = os.stat(path).st_ino == os.fstat(lock_file.fileno()).st_ino
+        except FileNotFoundError:
+            current = False
+        if not current:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+            return None
+        return lock_file
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Context manager which holds the lock for key. It yields whether the lock was acquired, which is
+        False if the timeout was reached.
+
+        :param str key:
+        """
+        path = self._path(key)
+        deadline = time.monotonic() + self.timeout
+        lock_file = self._try_lock(path)
+        while lock_file is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+            lock_file = self._try_lock(path)
+        try:
+            yield lock_file is not None
+        finally:
+            if lock_file is not None:
+                # Remove the file before unlocking it so that waiting processes see that it is stale
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
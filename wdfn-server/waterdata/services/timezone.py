@@ -1,9 +1,77 @@
 """
 Helpers to retrieve timezone information for a location
 """
-from requests import exceptions as request_exceptions, Session
+import sqlite3
+
+from requests import exceptions as request_exceptions
 
 from .. import app
+from ..http_client import create_session
+from ..workers import WorkerLocal
+from .cache import cached_call
+from .single_flight import SingleFlight
+
+
+class TimeZoneStore:
+    """
+    Persistent store of IANA time zones kept in a SQLite file. Locations are rounded to precision decimal
+    places so nearby locations share an entry.
+    """
+
+    def __init__(self, path, precision=2):
+        """
+        :param str path: path of the database file. It is created if it does not exist.
+        :param int precision: number of decimal places latitude and longitude are rounded to
+        """
+        self.path = path
+        self.precision = precision
+        self._connections = WorkerLocal(self._connect)
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS time_zone ('
+                         'latitude REAL NOT NULL, longitude REAL NOT NULL, time_zone TEXT NOT NULL, '
+                         'PRIMARY KEY (latitude, longitude))')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+
+    def _connection(self):
+        # Connections can not be shared across threads or a fork so keep one per thread, or per gevent worker
+        return self._connections.get()
+
+    def _key(self, latitude, longitude):
+        return round(float(latitude), self.precision), round(float(longitude), self.precision)
+
+    def get(self, latitude, longitude):
+        """
+        :param latitude: str or float
+        :param longitude: str or float
+        :return: IANA time zone or None if the location is not in the store
+        :rtype: str
+        """
+        row = self._connection().execute('SELECT time_zone FROM time_zone WHERE latitude = ? AND longitude = ?',
+                                         self._key(latitude, longitude)).fetchone()
+        return row[0] if row else None
+
+    def set(self, latitude, longitude, time_zone):
+        """
+        :param latitude: str or float
+        :param longitude: str or float
+        :param str time_zone: IANA time zone
+        """
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO time_zone (latitude, longitude, time_zone) VALUES (?, ?, ?)',
+                         (*self._key(latitude, longitude), time_zone))
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM time_zone').fetchone()[0]
+
+
+def _is_blank(latitude, longitude):
+    """
+    :return: True if either coordinate is missing, as it is for some sites
+    :rtype: bool
+    """
+    return any(coordinate is None or not str(coordinate).strip() for coordinate in (latitude, longitude))
 
 
 class TimeZoneService:
@@ -12,9 +80,17 @@ class TimeZoneService:
     lat/lon
     """
 
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, cache=None, store=None):
+        """
+        :param str endpoint: the scheme and host of the weather service
+        :param ServiceCache cache: optional cache for successful responses
+        :param TimeZoneStore store: optional persistent store which is checked before the weather service
+        """
         self.endpoint = endpoint
-        self.session = Session()
+        self.session = create_session()
+        self.cache = cache
+        self.flights = SingleFlight()
+        self.store = store
 
     def get_iana_time_zone(self, latitude, longitude):
         """
@@ -23,14 +99,66 @@ class TimeZoneService:
         :param longitude: str
         :return str
         """
+        use_store = self.store is not None and not _is_blank(latitude, longitude)
+        if use_store:
+            try:
+                time_zone = self.store.get(latitude, longitude)
+            except (ValueError, sqlite3.Error) as err:
+                app.logger.error(f'Unable to read time zone store: {err!r}')
+            else:
+                if time_zone:
+                    return time_zone
+
+        time_zone = cached_call(self.cache, f'{latitude},{longitude}',
+                                lambda: self._fetch_iana_time_zone(latitude, longitude), flights=self.flights)
+        if use_store and time_zone:
+            try:
+                self.store.set(latitude, longitude, time_zone)
+            except (ValueError, sqlite3.Error) as err:
+                app.logger.error(f'Unable to save to time zone store: {err!r}')
+        return time_zone
+
+    def warm(self, locations):
+        """
+        Look up the time zone of each location which is not already in the store so that later
+        requests are answered from the store.
+
+        :param locations: iterable of (latitude, longitude)
+        :return: the number of locations that were looked up and the number that failed
+        :rtype: tuple
+        """
+        looked_up = 0
+        failed = 0
+        for latitude, longitude in locations:
+            if self.store is not None:
+                try:
+                    if self.store.get(latitude, longitude):
+                        continue
+                except (ValueError, sqlite3.Error) as err:
+                    app.logger.warning(f'Unable to look up {latitude},{longitude} in the time zone store: {err!r}')
+                    looked_up += 1
+                    failed += 1
+                    continue
+            looked_up += 1
+            if not self.get_iana_time_zone(latitude, longitude):
+                failed += 1
+        return looked_up, failed
+
+    def _fetch_iana_time_zone(self, latitude, longitude):
+        """
+        :param latitude: str
+        :param longitude: str
+        :return tuple of the time zone and whether it can be cached
+        """
         url = f'{self.endpoint}/points/{latitude},{longitude}'
         try:
             response = self.session.get(url)
         except (request_exceptions.Timeout, request_exceptions.ConnectionError) as err:
             app.logger.error(repr(err))
-            return {}
+            return {}, False
         if response.status_code != 200:
-            return None
+            return None, False
 
         json_data = response.json()
-        return json_data['properties'].get('timeZone', None) if 'properties' in json_data else None
+        time_zone = json_data['properties'].get('timeZone', None) if 'properties' in json_data else None
+        return time_zone, time_zone is not None
@@ -0,0 +1,176 @@
+"""
+Offline time zone lookup using time zone boundary polygons, for example a release of
+https://github.com/evansiroky/timezone-boundary-builder. No network calls are made.
+
+The boundaries can be read directly from GeoJSON or from a compact index file written by
+write_boundary_index (see the index-time-zone-boundaries management command), which loads faster.
+"""
+import gzip
+import json
+import math
+
+
+def _open(path):
+    return gzip.open(path, 'rt') if path.endswith('.gz') else open(path, 'r')
+
+
+def _bbox(ring):
+    lons = [point[0] for point in ring]
+    lats = [point[1] for point in ring]
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def _in_ring(lon, lat, ring):
+    """
+    Ray casting test of whether (lon, lat) is inside ring.
+    """
+    inside = False
+    j = len(ring) - 1
+    for i, (x_i, y_i) in enumerate(ring):
+        x_j, y_j = ring[j]
+        if (y_i > lat) != (y_j > lat) and lon < (x_j - x_i) * (lat - y_i) / (y_j - y_i) + x_i:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _in_polygon(lon, lat, rings):
+    """
+    Returns True if (lon, lat) is inside the first ring of rings and outside the remaining rings (holes).
+    """
+    return _in_ring(lon, lat, rings[0]) and not any(_in_ring(lon, lat, hole) for hole in rings[1:])
+
+
+def read_geojson_polygons(geojson):
+    """
+    Returns the polygons in a GeoJSON feature collection of time zones.
+
+    :param dict geojson: feature collection where each feature has a tzid property
+    :return: list of (tzid, rings)
+    :rtype: list
+    """
+    polygons = []
+    for feature in geojson['features']:
+        tzid = feature['properties']['tzid']
+        geometry = feature['geometry']
+        if geometry['type'] == 'Polygon':
+            polygons.append((tzid, geometry['coordinates']))
+        elif geometry['type'] == 'MultiPolygon':
+            polygons.extend((tzid, rings) for rings in geometry['coordinates'])
+    return polygons
+
+
+class TimeZoneBoundaryResolver:
+    """
+    Finds the IANA time zone containing a location. Polygons are assigned to the cells of a regular
+    longitude/latitude grid that their bounding box overlaps so only the few polygons near a location
+    are tested.
+    """
+
+    def __init__(self, polygons, cell_size=1.0):
+        """
+        :param list polygons: list of (tzid, rings) where rings is a list of [lon, lat] rings, the first being
+            the outer boundary and the rest holes
+        :param float cell_size: size of the grid cells in degrees
+        """
+        self.cell_size = cell_size
+        self._zones = []
+        self._polygons = []
+        self._cells = {}
+        zone_indexes = {}
+        for tzid, rings in polygons:
+            if tzid not in zone_indexes:
+                zone_indexes[tzid] = len(self._zones)
+                self._zones.append(tzid)
+            self._add_polygon(zone_indexes[tzid], [[tuple(point) for point in ring] for ring in rings])
+
+    def _cell(self, lon, lat):
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+
+    def _add_polygon(self, zone_index, rings):
+        bbox = _bbox(rings[0])
+        polygon_index = len(self._polygons)
+        self._polygons.append((zone_index, bbox, rings))
+        min_x, min_y = self._cell(bbox[0], bbox[1])
+        max_x, max_y = self._cell(bbox[2], bbox[3])
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                self._cells.setdefault((cell_x, cell_y), []).append(polygon_index)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load boundaries from a GeoJSON file or an index file written by write_boundary_index. Files ending
+        in .gz are decompressed.
+
+        :param str path:
+        :rtype: TimeZoneBoundaryResolver
+        """
+        with _open(path) as boundary_file:
+            data = json.load(boundary_file)
+        if data.get('type') == 'FeatureCollection':
+            return cls(read_geojson_polygons(data))
+        zones = data['zones']
+        return cls([(zones[zone_index], rings) for zone_index, rings in data['polygons']],
+                   cell_size=data['cell_size'])
+
+    def get_iana_time_zone(self, latitude, longitude):
+        """
+        Returns the iana time zone string or None if the location is not within any boundary.
+        :param latitude: str or float
+        :param longitude: str or float
+        :return str
+        """
+        try:
+            lat = float(latitude)
+            lon = float(longitude)
+        except (TypeError, ValueError):
+            return None
+        for polygon_index in self._cells.get(self._cell(lon, lat), []):
+            zone_index, (min_lon, min_lat, max_lon, max_lat), rings = self._polygons[polygon_index]
+            if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat and _in_polygon(lon, lat, rings):
+                return self._zones[zone_index]
+        return None
+
+    def __len__(self):
+        return len(self._polygons)
+
+
+def write_boundary_index(geojson_path, index_path, precision=4, bbox=None):
+    """
+    Convert a GeoJSON file of time zone boundaries into a smaller index file.
+
+    :param str geojson_path: GeoJSON feature collection where each feature has a tzid property
+    :param str index_path: file to write. It is gzipped if the name ends in .gz
+    :param int precision: number of decimal places kept for each coordinate
+    :param tuple bbox: optional (min_lon, min_lat, max_lon, max_lat). Polygons outside it are dropped.
+    :return: the number of polygons written
+    :rtype: int
+    """
+    with _open(geojson_path) as geojson_file:
+        polygons = read_geojson_polygons(json.load(geojson_file))
+
+    zones = []
+    zone_indexes = {}
+    indexed_polygons = []
+    for tzid, rings in polygons:
+        if bbox:
+            min_lon, min_lat, max_lon, max_lat = _bbox(rings[0])
+            if max_lon < bbox[0] or min_lon > bbox[2] or max_lat < bbox[1] or min_lat > bbox[3]:
+                continue
+        if tzid not in zone_indexes:
+            zone_indexes[tzid] = len(zones)
+            zones.append(tzid)
+        indexed_polygons.append([
+            zone_indexes[tzid],
+            [[[round(lon, precision), round(lat, precision)] for lon, lat, *_ in ring] for ring in rings]
+        ])
+
+    index = {
+        'cell_size': 1.0,
+        'zones': zones,
+        'polygons': indexed_polygons
+    }
+    with (gzip.open(index_path, 'wt') if index_path.endswith('.gz') else open(index_path, 'w')) as index_file:
+        json.dump(index, index_file, separators=(',', ':'))
+    return len(indexed_polygons)
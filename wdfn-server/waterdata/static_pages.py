@@ -0,0 +1,242 @@
+"""
+Pages which are the same for every request, apart from whether the banner messages have been hidden. Each
+variant of a page is rendered once and kept in memory with its compressed bodies, so requests for it neither
+render a template nor compress anything.
+
+Pages can also be written ahead of time to a snapshot directory with write_static_pages, compressed at the
+slower STATIC_PAGES_GZIP_LEVEL and STATIC_PAGES_BROTLI_QUALITY levels. When STATIC_PAGES_SNAPSHOT_DIR is set,
+a page missing from memory is read from the snapshot rather than rendered. Only the application reads the
+snapshot: the banner variant of a page is chosen by cookie, which a static file server can not do.
+"""
+from collections import namedtuple
+from functools import wraps
+import hashlib
+import os
+
+from flask import make_response, request, url_for
+from werkzeug.routing import BuildError
+
+from . import app
+from .compression import choose_encoding, compress, get_supported_encodings
+from .services.cache import get_memory_cache
+
+
+StaticPage = namedtuple('StaticPage', ['bodies', 'status', 'mimetype', 'etag'])
+
+BANNER_COOKIE = 'no-show-banner-message'
+
+# File extension of each encoding in the snapshot directory
+SNAPSHOT_EXTENSIONS = {'gzip': '.gz', 'br': '.br'}
+
+# Endpoint of each view decorated with static_page and the function listing the arguments of its pages
+_static_views = []
+
+
+def get_static_page_cache():
+    """
+    Returns the cache of rendered static pages
+    :rtype: ServiceCache
+    """
+    return get_memory_cache('static_page', app.config['STATIC_PAGES_TTL'],
+                            max_bytes=app.config['STATIC_PAGES_MAX_BYTES'])
+
+
+def _get_page_key(path, no_banner):
+    return f'{"no-banner" if no_banner else "banner"}:{path}'
+
+
+def get_snapshot_path(directory, path, no_banner):
+    """
+    Return the path of the snapshot file of a page.
+
+    :param str directory: snapshot directory
+    :param str path: URL path of the page
+    :param bool no_banner: whether this is the variant with the banner messages hidden
+    :rtype: str
+    """
+    return os.path.join(directory, *path.strip('/').split('/'), 'index-no-banner.html' if no_banner else 'index.html')
+
+
+def create_static_page(body, status=200, mimetype='text/html', compressed_bodies=None, levels=None):
+    """
+    Return the page for body with its body compressed in each supported encoding.
+
+    :param bytes body:
+    :param int status:
+    :param str mimetype:
+    :param dict compressed_bodies: bodies which are already compressed, keyed by encoding
+    :param dict levels: compression level of each encoding, by default the COMPRESSION_GZIP_LEVEL and
+        COMPRESSION_BROTLI_QUALITY levels, which are fast enough to use while a request waits
+    :rtype: StaticPage
+    """
+    compressed_bodies = compressed_bodies or {}
+    levels = levels or {}
+    bodies = {None: body}
+    for encoding in get_supported_encodings():
+        bodies[encoding] = compressed_bodies.get(encoding) or compress(body, encoding, level=levels.get(encoding))
+    return StaticPage(
+        bodies=bodies,
+        status=status,
+        mimetype=mimetype,
+        etag=hashlib.blake2b(body, digest_size=16).hexdigest()
+    )
+
+
+def read_snapshot(directory, path, no_banner):
+    """
+    Read a page from the snapshot directory, with its compressed files if there are any.
+
+    :param str directory: snapshot directory
+    :param str path: URL path of the page
+    :param bool no_banner: whether to read the variant with the banner messages hidden
+    :return: the page or None if it is not in the snapshot
+    :rtype: StaticPage
+    """
+    snapshot_path = get_snapshot_path(directory, path, no_banner)
+    try:
+        with open(snapshot_path, 'rb') as snapshot_file:
+            body = snapshot_file.read()
+    except OSError:
+        return None
+    compressed_bodies = {}
+    for encoding, extension in SNAPSHOT_EXTENSIONS.items():
+        if os.path.exists(snapshot_path + extension):
+            with open(snapshot_path + extension, 'rb') as snapshot_file:
+                compressed_bodies[encoding] = snapshot_file.read()
+    return create_static_page(body, compressed_bodies=compressed_bodies)
+
+
+def _page_response(page):
+    encoding = choose_encoding(request.accept_encodings)
+    response = app.response_class(page.bodies[encoding], status=page.status, mimetype=page.mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept-Encoding', 'Cookie'))
+    response.set_etag(page.etag, weak=encoding is not None)
+    return response.make_conditional(request)
+
+
+def static_page(list_view_args=None):
+    """
+    Decorator for views whose page only depends on the URL and the banner cookie. A page is rendered on the
+    first request for it, unless it was prerendered or is in the snapshot directory, and served from memory
+    after that. Only pages with a 200 status are kept.
+
+    :param callable list_view_args: for a view with URL arguments, function returning the arguments of each
+        of its pages, so that they can be listed by get_static_page_urls
+    """
+    def decorator(func):
+        _static_views.append((func.__name__, list_view_args))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            no_banner = bool(request.cookies.get(BANNER_COOKIE))
+            page_cache = get_static_page_cache()
+            key = _get_page_key(request.path, no_banner)
+            page = page_cache.get(key)
+            if page is None and app.config['STATIC_PAGES_SNAPSHOT_DIR']:
+                page = read_snapshot(app.config['STATIC_PAGES_SNAPSHOT_DIR'], request.path, no_banner)
+                if page is not None:
+                    page_cache.set(key, page)
+            if page is None:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                page = create_static_page(response.get_data(), status=response.status_code,
+                                          mimetype=response.mimetype)
+                page_cache.set(key, page)
+            return _page_response(page)
+
+        return wrapper
+
+    return decorator
+
+
+def get_static_page_urls(with_view_args=True):
+    """
+    :param bool with_view_args: include the pages of views with URL arguments
+    :return: the path of each page of the views decorated with static_page
+    :rtype: list
+    """
+    urls = []
+    with app.test_request_context():
+        for endpoint, list_view_args in _static_views:
+            if list_view_args is not None and not with_view_args:
+                continue
+            for view_args in list_view_args() if list_view_args is not None else [{}]:
+                try:
+                    urls.append(url_for(endpoint, **view_args))
+                except BuildError:
+                    continue
+    return urls
+
+
+def render_static_page(path, no_banner):
+    """
+    Request a static page so that it is rendered and kept in memory.
+
+    :param str path: URL path of the page
+    :param bool no_banner: whether to render the variant with the banner messages hidden
+    :return: the page or None if it could not be rendered
+    :rtype: StaticPage
+    """
+    client = app.test_client()
+    if no_banner:
+        client.set_cookie('localhost', BANNER_COOKIE, 'true')
+    response = client.get(path)
+    if response.status_code != 200:
+        return None
+    return get_static_page_cache().get(_get_page_key(path, no_banner)) or create_static_page(response.get_data())
+
+
+def prerender_static_pages(paths=None):
+    """
+    Render both banner variants of the static pages at paths, so that no request has to render them.
+
+    :param list paths: paths of the pages, by default those of the views without URL arguments
+    :return: the number of pages rendered
+    :rtype: int
+    """
+    rendered = 0
+    for path in paths if paths is not None else get_static_page_urls(with_view_args=False):
+        for no_banner in (False, True):
+            if render_static_page(path, no_banner) is not None:
+                rendered += 1
+    return rendered
+
+
+def write_static_pages(directory, paths=None, progress=None):
+    """
+    Write both banner variants of the static pages at paths, with their bodies compressed at the
+    STATIC_PAGES_GZIP_LEVEL and STATIC_PAGES_BROTLI_QUALITY levels, to directory.
+
+    :param str directory: snapshot directory
+    :param list paths: paths of the pages, by default all of the static pages
+    :param callable progress: called with the number of pages written so far after each page
+    :return: the number of pages written
+    :rtype: int
+    """
+    levels = {'gzip': app.config['STATIC_PAGES_GZIP_LEVEL'], 'br': app.config['STATIC_PAGES_BROTLI_QUALITY']}
+    written = 0
+    for path in paths if paths is not None else get_static_page_urls():
+        for no_banner in (False, True):
+            page = render_static_page(path, no_banner)
+            if page is None:
+                continue
+            page = create_static_page(page.bodies[None], levels=levels)
+            snapshot_path = get_snapshot_path(directory, path, no_banner)
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+            for encoding, body in page.bodies.items():
+                with open(snapshot_path + SNAPSHOT_EXTENSIONS.get(encoding, ''), 'wb') as snapshot_file:
+                    snapshot_file.write(body)
+            written += 1
+            if progress is not None:
+                progress(written)
+    return written
+
+
+def clear_static_pages():
+    """
+    Forget the rendered pages.
+    """
+    get_static_page_cache().backend.clear()
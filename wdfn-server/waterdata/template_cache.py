@@ -0,0 +1,56 @@
+"""
+Jinja bytecode cache of the compiled templates.
+
+Jinja compiles a template to Python code the first time it is loaded, which each worker otherwise does on
+its first request for a page. The compile_templates management command compiles every template ahead of
+time into TEMPLATE_BYTECODE_CACHE_DIR, which is shipped with the application, and the template loader then
+only unmarshals the code. A template whose source has changed since it was compiled, or which was compiled
+by a different Python version, is compiled again as usual.
+"""
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """
+    Bytecode cache whose files are keyed by template name alone, rather than by name and path, so that
+    templates compiled at build time are found wherever the application is installed. Templates which
+    could not be loaded from the cache are written to it if the directory is writable.
+    """
+
+    def __init__(self, directory):
+        """
+        :param str directory: directory of the cache files
+        """
+        super().__init__(directory, pattern='%s.cache')
+
+    def get_cache_key(self, name, filename=None):
+        return super().get_cache_key(name)
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def compile_templates(env, directory):
+    """
+    Compile every template of env into a new bytecode cache in directory.
+
+    :param jinja2.Environment env: template environment
+    :param str directory: directory of the cache files. Existing cache files are removed.
+    :return: the number of templates compiled
+    :rtype: int
+    """
+    os.makedirs(directory, exist_ok=True)
+    bytecode_cache = TemplateBytecodeCache(directory)
+    bytecode_cache.clear()
+    names = env.list_templates()
+    for name in names:
+        source, filename, _ = env.loader.get_source(env, name)
+        bucket = bytecode_cache.get_bucket(env, name, filename, source)
+        bucket.code = env.compile(source, name, filename)
+        bytecode_cache.set_bucket(bucket)
+    return len(names)
@@ -5,6 +5,7 @@ pytest fixtures.
 import pytest
 
 from .. import app as my_app
+from ..page_cache import get_page_cache
 
 
 @pytest.fixture
@@ -14,3 +15,13 @@ def app():
     testing helpers.
     """
     return my_app
+
+
+@pytest.fixture(autouse=True)
+def clear_page_cache():
+    """
+    Pages rendered with the mocked data of one test must not be served in another.
+    """
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        page_cache.backend.clear()
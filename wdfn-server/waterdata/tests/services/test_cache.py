@@ -0,0 +1,295 @@
+"""
+Tests for the service cache module
+"""
+from contextlib import contextmanager
+import os
+import tempfile
+import threading
+from unittest import TestCase, mock
+
+from ...services import cache
+from ...services.cache import MemoryCacheBackend, SqliteCacheBackend, ServiceCache, cached_call, \
+    create_cache_backend, get_cache_backend_stats, get_memory_cache, refresh_in_background
+from ...services.single_flight import FileLockStore, SingleFlight
+
+
+class BackendTests:
+    # pylint: disable=E1101
+
+    def create_backend(self, max_entries=None, max_bytes=None):
+        raise NotImplementedError
+
+    def test_get_missing(self):
+        backend = self.create_backend()
+        self.assertIsNone(backend.get('key'))
+
+    def test_set_and_get(self):
+        backend = self.create_backend()
+        backend.set('key', b'data', 100.0)
+        self.assertEqual(backend.get('key'), (b'data', 100.0))
+        self.assertEqual(len(backend), 1)
+        self.assertEqual(backend.size, 4)
+
+    def test_replace(self):
+        backend = self.create_backend()
+        backend.set('key', b'data', 100.0)
+        backend.set('key', b'other data', 200.0)
+        self.assertEqual(backend.get('key'), (b'other data', 200.0))
+        self.assertEqual(len(backend), 1)
+        self.assertEqual(backend.size, 10)
+
+    def test_delete(self):
+        backend = self.create_backend()
+        backend.set('key', b'data', 100.0)
+        backend.delete('key')
+        self.assertIsNone(backend.get('key'))
+        self.assertEqual(backend.size, 0)
+
+    def test_evict_by_entry_count(self):
+        backend = self.create_backend(max_entries=2)
+        backend.set('one', b'1', 100.0)
+        backend.set('two', b'2', 100.0)
+        backend.get('one')
+        backend.set('three', b'3', 100.0)
+
+        self.assertIsNotNone(backend.get('one'))
+        self.assertIsNone(backend.get('two'))
+        self.assertIsNotNone(backend.get('three'))
+        self.assertEqual(backend.evictions, 1)
+
+    def test_evict_by_bytes(self):
+        backend = self.create_backend(max_bytes=10)
+        backend.set('one', b'12345', 100.0)
+        backend.set('two', b'12345', 100.0)
+        backend.set('three', b'1', 100.0)
+
+        self.assertIsNone(backend.get('one'))
+        self.assertIsNotNone(backend.get('two'))
+        self.assertIsNotNone(backend.get('three'))
+        self.assertEqual(backend.size, 6)
+
+
+class TestMemoryCacheBackend(BackendTests, TestCase):
+
+    def create_backend(self, max_entries=None, max_bytes=None):
+        return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+
+
+class TestSqliteCacheBackend(BackendTests, TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_backend(self, max_entries=None, max_bytes=None):
+        return SqliteCacheBackend(os.path.join(self.temp_dir.name, 'cache.sqlite'),
+                                  max_entries=max_entries, max_bytes=max_bytes)
+
+    def test_shared_between_instances(self):
+        self.create_backend().set('key', b'data', 100.0)
+        self.assertEqual(self.create_backend().get('key'), (b'data', 100.0))
+
+
+class TestServiceCache(TestCase):
+
+    def setUp(self):
+        self.backend = MemoryCacheBackend()
+        self.cache = ServiceCache(self.backend, 'site', 60)
+
+    def test_set_and_get(self):
+        self.cache.set('01630500', [{'site_no': '01630500'}])
+
+        self.assertEqual(self.cache.get('01630500'), [{'site_no': '01630500'}])
+        self.assertIsNotNone(self.backend.get('site:01630500'))
+        self.assertEqual(self.cache.stats, {'hits': 1, 'stale_hits': 0, 'misses': 0})
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get('01630500'))
+        self.assertEqual(self.cache.stats, {'hits': 0, 'stale_hits': 0, 'misses': 1})
+
+    @mock.patch('waterdata.services.cache.time.time')
+    def test_expired(self, time_mock):
+        time_mock.return_value = 1000.0
+        self.cache.set('01630500', ['data'])
+        time_mock.return_value = 1061.0
+
+        self.assertIsNone(self.cache.get('01630500'))
+        self.assertEqual(self.cache.stats, {'hits': 0, 'stale_hits': 0, 'misses': 1})
+
+    @mock.patch('waterdata.services.cache.time.time')
+    def test_stale_entry(self, time_mock):
+        cache = ServiceCache(self.backend, 'site', 60, stale_while_revalidate=10, stale_if_error=100)
+        time_mock.return_value = 1000.0
+        cache.set('01630500', ['data'])
+
+        self.assertEqual(cache.get_entry('01630500'), (['data'], -60.0))
+        time_mock.return_value = 1090.0
+        self.assertEqual(cache.get_entry('01630500'), (['data'], 30.0))
+        self.assertIsNone(cache.get('01630500'))
+        time_mock.return_value = 1161.0
+        self.assertIsNone(cache.get_entry('01630500'))
+        self.assertEqual(cache.stats, {'hits': 1, 'stale_hits': 1, 'misses': 2})
+
+
+class TestCachedCall(TestCase):
+
+    def setUp(self):
+        self.cache = ServiceCache(MemoryCacheBackend(), 'site', 60)
+
+    def test_no_cache(self):
+        fetch = mock.Mock(return_value=('value', True))
+        self.assertEqual(cached_call(None, 'key', fetch), 'value')
+        self.assertEqual(cached_call(None, 'key', fetch), 'value')
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_cacheable(self):
+        fetch = mock.Mock(return_value=('value', True))
+        self.assertEqual(cached_call(self.cache, 'key', fetch), 'value')
+        self.assertEqual(cached_call(self.cache, 'key', fetch), 'value')
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_not_cacheable(self):
+        fetch = mock.Mock(return_value=('error', False))
+        self.assertEqual(cached_call(self.cache, 'key', fetch), 'error')
+        self.assertEqual(cached_call(self.cache, 'key', fetch), 'error')
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_flights(self):
+        flights = mock.Mock(wraps=SingleFlight())
+        fetch = mock.Mock(return_value=('value', True))
+        self.assertEqual(cached_call(None, 'key', fetch, flights=flights), 'value')
+        self.assertEqual(cached_call(self.cache, 'key', fetch, flights=flights), 'value')
+        self.assertEqual(cached_call(self.cache, 'key', fetch, flights=flights), 'value')
+        self.assertEqual(flights.do.call_count, 2)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_locks(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.cache.locks = FileLockStore(temp_dir)
+            fetch = mock.Mock(return_value=('value', True))
+            self.assertEqual(cached_call(self.cache, 'key', fetch), 'value')
+            self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_cached_while_waiting_for_lock(self):
+        @contextmanager
+        def lock(key):  # pylint: disable=W0613
+            # Another process caches the value while this one waits
+            self.cache.set('key', 'other process value')
+            yield True
+        self.cache.locks = mock.Mock(lock=lock)
+        fetch = mock.Mock(return_value=('value', True))
+
+        self.assertEqual(cached_call(self.cache, 'key', fetch), 'other process value')
+        fetch.assert_not_called()
+
+
+@mock.patch('waterdata.services.cache.time.time')
+class TestCachedCallStale(TestCase):
+
+    def setUp(self):
+        self.cache = ServiceCache(MemoryCacheBackend(), 'site', 60, stale_while_revalidate=10, stale_if_error=100)
+
+    @mock.patch('waterdata.services.cache.refresh_in_background')
+    def test_stale_while_revalidate(self, refresh_mock, time_mock):
+        time_mock.return_value = 1000.0
+        self.cache.set('key', 'old')
+        time_mock.return_value = 1065.0
+        fetch = mock.Mock(return_value=('new', True))
+
+        self.assertEqual(cached_call(self.cache, 'key', fetch), 'old')
+        fetch.assert_not_called()
+        refresh_mock.assert_called_once_with(self.cache, 'key', fetch)
+
+    def test_stale_if_error(self, time_mock):
+        time_mock.return_value = 1000.0
+        self.cache.set('key', 'old')
+        time_mock.return_value = 1100.0
+
+        self.assertEqual(cached_call(self.cache, 'key', mock.Mock(return_value=('error', False))), 'old')
+        self.assertEqual(cached_call(self.cache, 'key', mock.Mock(return_value=('new', True))), 'new')
+        self.assertEqual(cached_call(self.cache, 'key', mock.Mock(return_value=('error', False))), 'new')
+
+    def test_too_stale(self, time_mock):
+        time_mock.return_value = 1000.0
+        self.cache.set('key', 'old')
+        time_mock.return_value = 1161.0
+
+        self.assertEqual(cached_call(self.cache, 'key', mock.Mock(return_value=('error', False))), 'error')
+
+
+class TestRefreshInBackground(TestCase):
+
+    def setUp(self):
+        self.cache = ServiceCache(MemoryCacheBackend(), 'site', 60)
+
+    def test_refresh(self):
+        future = refresh_in_background(self.cache, 'key', lambda: ('new', True))
+        future.result(timeout=5)
+
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_failed_refresh(self):
+        self.cache.set('key', 'old')
+        refresh_in_background(self.cache, 'key', lambda: ('error', False)).result(timeout=5)
+        self.assertEqual(self.cache.get('key'), 'old')
+
+        def fail():
+            raise ValueError('Bad')
+        refresh_in_background(self.cache, 'key', fail).result(timeout=5)
+        self.assertEqual(self.cache.get('key'), 'old')
+
+    def test_one_refresh_per_key(self):
+        release = threading.Event()
+
+        def slow_fetch():
+            release.wait(5)
+            return 'new', True
+        future = refresh_in_background(self.cache, 'key', slow_fetch)
+
+        self.assertIsNone(refresh_in_background(self.cache, 'key', slow_fetch))
+        release.set()
+        future.result(timeout=5)
+        self.assertIsNotNone(refresh_in_background(self.cache, 'key', lambda: ('newer', True)))
+
+
+class TestCreateCacheBackend(TestCase):
+
+    def test_disabled(self):
+        self.assertIsNone(create_cache_backend({'SERVICE_CACHE_BACKEND': None}))
+
+    def test_memory(self):
+        backend = create_cache_backend({
+            'SERVICE_CACHE_BACKEND': 'memory',
+            'SERVICE_CACHE_MAX_ENTRIES': 10,
+            'SERVICE_CACHE_MAX_BYTES': 100
+        })
+        self.assertIsInstance(backend, MemoryCacheBackend)
+        self.assertEqual(backend.max_entries, 10)
+        self.assertEqual(backend.max_bytes, 100)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            create_cache_backend({'SERVICE_CACHE_BACKEND': 'redis'})
+
+
+@mock.patch.dict(cache._backends)  # pylint: disable=W0212
+@mock.patch.dict(cache._caches)  # pylint: disable=W0212
+class TestGetMemoryCache(TestCase):
+
+    def test_created_once(self):
+        memory_cache = get_memory_cache('test_memory', 60, max_entries=1)
+        self.assertIs(get_memory_cache('test_memory', 60), memory_cache)
+        self.assertEqual(memory_cache.backend.max_entries, 1)
+        self.assertIsNone(memory_cache.backend.max_bytes)
+
+    def test_backend_stats(self):
+        memory_cache = get_memory_cache('test_memory', 60, max_entries=1)
+        memory_cache.set('key1', 'value')
+        memory_cache.set('key2', 'value')
+
+        stats = get_cache_backend_stats()['test_memory']
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], memory_cache.backend.size)
+        self.assertEqual(stats['evictions'], 1)
@@ -2,9 +2,10 @@
 Tests for camera.py module
 """
 import json
+import time
 from unittest import mock
 
-from ...services.camera import fetch_camera_metadata, get_monitoring_location_camera_details
+from ...services.camera import CameraStore, fetch_camera_metadata, get_monitoring_location_camera_details
 
 MOCK_CAMERA_METADATA = """
 {
@@ -93,10 +94,9 @@ def test_unparseable_json_fetch_camera_metadata():
         assert camera_metadata == {}
 
 
-def test_fetching_and_returning_camera_details(config):
-    if 'MONITORING_LOCATION_CAMERA_METADATA' in config:
-        del config['MONITORING_LOCATION_CAMERA_METADATA']
-    with mock.patch('waterdata.services.camera.execute_get_request') as r_mock:
+def test_fetching_and_returning_camera_details():
+    with mock.patch('waterdata.services.camera.execute_get_request') as r_mock, \
+            mock.patch('waterdata.services.camera.camera_store', CameraStore(fetch_camera_metadata, 3600, 300)):
         response = mock.Mock()
         response.status_code = 200
         response.text = MOCK_CAMERA_METADATA
@@ -114,29 +114,88 @@ def test_fetching_and_returning_camera_details(config):
         assert 'details' in details[0], 'Expected key'
 
 
-def test_no_fetch_existing_camera_details(config):
-    config['MONITORING_LOCATION_CAMERA_METADATA'] = json.loads(MOCK_CAMERA_METADATA).get('data')
-    with mock.patch('waterdata.services.camera.execute_get_request') as r_mock:
-        response = mock.Mock()
-        response.status_code = 200
-        response.text = MOCK_CAMERA_METADATA
-        response.json.return_value = json.loads(MOCK_CAMERA_METADATA)
-        r_mock.return_value = response
+def make_fetch(*responses):
+    return mock.Mock(side_effect=[json.loads(response) if response else {} for response in responses])
 
-        details = get_monitoring_location_camera_details('04226000')
-        assert not r_mock.called, 'Expect to not fetch data'
-        assert len(details) == 1, 'Expected number of cameras'
 
+def test_no_fetch_existing_camera_details():
+    fetch = make_fetch(MOCK_CAMERA_METADATA)
+    store = CameraStore(fetch, 3600, 300)
+
+    assert len(store.get('04226000')) == 1, 'Expected number of cameras'
+    assert len(store.get('04226000')) == 1, 'Expected number of cameras'
+    assert fetch.call_count == 1, 'Expect to fetch data once'
+    assert store.loaded_at is not None
 
-def test_site_no_with_more_than_one_camera(config):
-    config['MONITORING_LOCATION_CAMERA_METADATA'] = json.loads(MOCK_CAMERA_METADATA).get('data')
 
-    details = get_monitoring_location_camera_details('425520078535601')
+def test_site_no_with_more_than_one_camera():
+    store = CameraStore(make_fetch(MOCK_CAMERA_METADATA), 3600, 300)
+
+    details = store.get('425520078535601')
     assert len(details) == 2, 'Expected number of cameras'
+    assert [camera['name'] for camera in details] == ['NY-Buffalo-S1', 'NY-Buffalo-S4']
 
 
-def test_site_no_with_no_cameras(config):
-    config['MONITORING_LOCATION_CAMERA_METADATA'] = json.loads(MOCK_CAMERA_METADATA).get('data')
+def test_site_no_with_no_cameras():
+    store = CameraStore(make_fetch(MOCK_CAMERA_METADATA), 3600, 300)
 
-    details = get_monitoring_location_camera_details('425520078535602')
+    details = store.get('425520078535602')
     assert not details, 'Expected number of cameras'
+
+
+def test_refresh_in_background_adds_new_cameras():
+    metadata = json.loads(MOCK_CAMERA_METADATA)
+    metadata['data'].append(dict(metadata['data'][2], usgsSiteNumber='01646500'))
+    fetch = make_fetch(MOCK_CAMERA_METADATA, json.dumps(metadata))
+    store = CameraStore(fetch, 3600, 300)
+
+    assert not store.get('01646500')
+    store.refresh_in_background().result()
+
+    assert len(store.get('01646500')) == 1, 'Expected the new camera'
+    assert fetch.call_count == 2
+
+
+def test_stale_cameras_are_returned_while_refreshing():
+    fetch = make_fetch(MOCK_CAMERA_METADATA, MOCK_CAMERA_METADATA)
+    store = CameraStore(fetch, 0, 0)
+    store.get('04226000')
+
+    with mock.patch.object(store, 'refresh_in_background') as refresh_mock:
+        details = store.get('04226000')
+
+    refresh_mock.assert_called_once_with()
+    assert len(details) == 1, 'Expected the cameras from the last load'
+
+
+def test_only_one_refresh_at_a_time():
+    store = CameraStore(make_fetch(MOCK_CAMERA_METADATA), 3600, 300)
+    store._refreshing = True  # pylint: disable=protected-access
+
+    assert store.refresh_in_background() is None
+
+
+def test_failed_refresh_keeps_last_good_cameras():
+    fetch = mock.Mock(side_effect=[json.loads(MOCK_CAMERA_METADATA), {}, ValueError('bad camera')])
+    store = CameraStore(fetch, 3600, 300)
+    store.get('04226000')
+
+    store.refresh_in_background().result()
+    assert len(store.get('04226000')) == 1, 'Expected the cameras from the last good load'
+    store.refresh_in_background().result()
+    assert len(store.get('04226000')) == 1, 'Expected the cameras from the last good load'
+
+
+def test_empty_response_is_not_refetched_on_every_request():
+    fetch = make_fetch(None, MOCK_CAMERA_METADATA)
+    store = CameraStore(fetch, 3600, 300)
+
+    assert not store.get('04226000')
+    assert not store.get('04226000')
+    assert fetch.call_count == 1, 'Expect to wait for the retry interval'
+
+    with mock.patch('waterdata.services.camera.time.monotonic', return_value=time.monotonic() + 301):
+        store.get('04226000')
+    store._executor.shutdown(wait=True)  # pylint: disable=protected-access
+    assert fetch.call_count == 2
+    assert len(store.get('04226000')) == 1, 'Expected the cameras from the retry'
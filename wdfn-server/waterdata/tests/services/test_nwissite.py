@@ -2,10 +2,12 @@
 Tests for NWISWeb service calls.
 
 """
-from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
 
 from requests_mock import Mocker
 
+from ...services.cache import MemoryCacheBackend, ServiceCache
 from ...services.nwissite import SiteService
 from ..mock_test_data import SITE_RDB, PARAMETER_RDB
 
@@ -150,3 +152,139 @@ class TestSiteService(TestCase):
             self.assertEqual(status_code, 404)
             self.assertEqual(reason, 'Not found')
             self.assertEqual(len(result), 0)
+
+    def test_cached_get(self):
+        site_service = SiteService(self.endpoint, cache=ServiceCache(MemoryCacheBackend(), 'site', 60))
+        with Mocker(session=site_service.session) as session_mock:
+            session_mock.get(self.endpoint, text=SITE_RDB)
+            site_service.get_site_data('01630500')
+            status_code, _, result = site_service.get_site_data('01630500')
+            self.assertEqual(session_mock.call_count, 1)
+            self.assertEqual(status_code, 200)
+            self.assertEqual(result[0]['site_no'], '01630500')
+
+            site_service.get_site_data('01646500')
+            self.assertEqual(session_mock.call_count, 2)
+
+    @mock.patch('waterdata.services.cache.time.time')
+    def test_stale_if_error(self, time_mock):
+        cache = ServiceCache(MemoryCacheBackend(), 'site', 60, stale_if_error=600)
+        site_service = SiteService(self.endpoint, cache=cache)
+        with Mocker(session=site_service.session) as session_mock:
+            time_mock.return_value = 1000.0
+            session_mock.get(self.endpoint, text=SITE_RDB)
+            site_service.get_site_data('01630500')
+
+            time_mock.return_value = 1100.0
+            session_mock.get(self.endpoint, status_code=503, reason='Service Unavailable')
+            status_code, _, result = site_service.get_site_data('01630500')
+            self.assertEqual(session_mock.call_count, 2)
+            self.assertEqual(status_code, 200)
+            self.assertEqual(result[0]['site_no'], '01630500')
+
+    def test_get_sites_data(self):
+        with Mocker(session=self.site_service.session) as session_mock:
+            session_mock.get(self.endpoint, text=SITE_RDB)
+            sites, failed = self.site_service.get_sites_data(['01630500', '01646500', '05427718'], chunk_size=2,
+                                                             executor=ThreadPoolExecutor(max_workers=2))
+            self.assertEqual(session_mock.call_count, 2)
+            queries = sorted(request.query for request in session_mock.request_history)
+            self.assertIn('sites=01630500%2c01646500', queries[0])
+            self.assertIn('sites=05427718', queries[1])
+            self.assertEqual(list(sites), ['01630500', '01646500', '05427718'])
+            self.assertEqual(sites['01630500'][0]['station_nm'], 'Some Random Site')
+            self.assertEqual(sites['01646500'], [])
+            self.assertEqual(failed, [])
+
+    def test_get_sites_period_of_record(self):
+        with Mocker(session=self.site_service.session) as session_mock:
+            session_mock.get(self.endpoint, text=PARAMETER_RDB)
+            series, failed = self.site_service.get_sites_period_of_record(['01630500'], agency_cd='USGS')
+            self.assertIn('seriescatalogoutput=true', session_mock.request_history[0].query)
+            self.assertIn('agencycd=usgs', session_mock.request_history[0].query)
+            self.assertEqual(len(series['01630500']), 8)
+            self.assertEqual(failed, [])
+
+    def test_get_sites_data_failures(self):
+        with Mocker(session=self.site_service.session) as session_mock:
+            session_mock.get(f'{self.endpoint}?sites=01630500', status_code=404, reason='Not Found')
+            session_mock.get(f'{self.endpoint}?sites=01646500', status_code=503, reason='Service Unavailable')
+            sites, failed = self.site_service.get_sites_data(['01630500', '01646500'], chunk_size=1)
+            self.assertEqual(sites, {'01630500': [], '01646500': []})
+            self.assertEqual(failed, ['01646500'])
+
+    def test_prefetch(self):
+        site_service = SiteService(self.endpoint, cache=ServiceCache(MemoryCacheBackend(), 'site', 60))
+        with Mocker(session=site_service.session) as session_mock:
+            session_mock.get(f'{self.endpoint}?format=rdb&sites=01630500,01646500&siteOutput=expanded',
+                             text=SITE_RDB, complete_qs=True)
+            session_mock.get(f'{self.endpoint}?format=rdb&sites=01630500,01646500&seriesCatalogOutput=True'
+                             '&siteStatus=all', text=PARAMETER_RDB, complete_qs=True)
+            site_data, cached = site_service.prefetch(['01630500', '01646500'])
+            self.assertEqual(session_mock.call_count, 2)
+            self.assertEqual([site['site_no'] for site in site_data], ['01630500'])
+            # 01646500 is not in either response
+            self.assertEqual(cached, 2)
+
+            _, _, site = site_service.get_site_data('01630500')
+            _, _, period_of_record = site_service.get_period_of_record('01630500')
+            self.assertEqual(session_mock.call_count, 2)
+            self.assertEqual(site, site_data)
+            self.assertEqual(len(period_of_record), 8)
+
+    def test_failed_prefetch(self):
+        site_service = SiteService(self.endpoint, cache=ServiceCache(MemoryCacheBackend(), 'site', 60))
+        with Mocker(session=site_service.session) as session_mock:
+            session_mock.get(self.endpoint, status_code=503, reason='Service Unavailable')
+            site_data, cached = site_service.prefetch(['01630500'], agency_cd='USGS')
+            self.assertIn('agencycd=usgs', session_mock.request_history[0].query)
+            self.assertEqual(site_data, [])
+            self.assertEqual(cached, 0)
+
+    def test_successful_get_huc_site_rows(self):
+        with Mocker(session=self.site_service.session) as session_mock:
+            session_mock.get(self.endpoint, text=PARAMETER_RDB, reason='OK')
+            status_code, reason, rows = self.site_service.get_huc_site_rows('07010101')
+            self.assertIn('huc=07010101', session_mock.request_history[0].query)
+            self.assertEqual(status_code, 200)
+            self.assertEqual(reason, 'OK')
+            rows = list(rows)
+            self.assertEqual(len(rows), 8)
+            self.assertEqual(rows[0].site_no, '01630500')
+
+    def test_get_rows_cached_and_sorted(self):
+        site_service = SiteService(self.endpoint, cache=ServiceCache(MemoryCacheBackend(), 'site', 60))
+        with Mocker(session=site_service.session) as session_mock:
+            session_mock.get(self.endpoint, text=PARAMETER_RDB, reason='OK')
+            _, _, rows = site_service.get_huc_site_rows('07010101')
+            unsorted = [row.parm_cd for row in rows]
+            _, _, rows = site_service.get_huc_site_rows('07010101', sort_column='parm_cd')
+            ascending = [row.parm_cd for row in rows]
+            _, _, rows = site_service.get_huc_site_rows('07010101', sort_column='parm_cd', reverse=True)
+            descending = [row.parm_cd for row in rows]
+            _, _, rows = site_service.get_huc_site_rows('07010101', sort_column='not_a_column')
+
+            self.assertEqual(session_mock.call_count, 1)
+            self.assertEqual(ascending, sorted(unsorted))
+            self.assertEqual(descending, list(reversed(ascending)))
+            self.assertEqual([row.parm_cd for row in rows], unsorted)
+
+    def test_stream_rows(self):
+        site_service = SiteService(self.endpoint, cache=ServiceCache(MemoryCacheBackend(), 'site', 60))
+        with Mocker(session=site_service.session) as session_mock:
+            session_mock.get(self.endpoint, text=PARAMETER_RDB, reason='OK')
+            _, _, rows = site_service.get_huc_site_rows('07010101', stream=True)
+            self.assertEqual(next(rows).site_no, '01630500')
+            self.assertEqual(len(list(rows)), 7)
+            site_service.get_huc_site_rows('07010101', stream=True)
+
+            self.assertEqual(session_mock.call_count, 2)
+
+    def test_unsuccessful_get_county_site_rows(self):
+        with Mocker(session=self.site_service.session) as session_mock:
+            session_mock.get(self.endpoint, text=SITE_RDB, reason='Not found', status_code=404)
+            status_code, reason, rows = self.site_service.get_county_site_rows('55003')
+            self.assertIn('countycd=55003', session_mock.request_history[0].query)
+            self.assertEqual(status_code, 404)
+            self.assertEqual(reason, 'Not found')
+            self.assertEqual(list(rows), [])
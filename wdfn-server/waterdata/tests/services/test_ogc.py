@@ -54,3 +54,26 @@ def test_invalid_json():
         assert session_mock.call_count == 1
         assert session_mock.request_history[0].query == 'f=json'
         assert networks == {}, 'Expected empty response'
+
+
+def test_get_network_site_nos():
+    network_service = MonitoringLocationNetworkService(ENDPOINT)
+    next_url = f'{ENDPOINT}RTN/items?f=json&offset=2'
+    with Mocker(session=network_service.session) as session_mock:
+        session_mock.get(next_url, json={'features': [{'id': 'USGS-05427718'}], 'links': []}, complete_qs=True)
+        session_mock.get(f'{ENDPOINT}RTN/items?f=json', complete_qs=True, json={
+            'features': [{'id': 'USGS-01630500'}, {'id': 'USGS-01646500'}],
+            'links': [{'rel': 'self', 'href': f'{ENDPOINT}RTN/items?f=json'}, {'rel': 'next', 'href': next_url}]
+        })
+        site_nos = network_service.get_network_site_nos('RTN')
+
+        assert session_mock.call_count == 2
+        assert site_nos == ['01630500', '01646500', '05427718']
+
+
+def test_get_network_site_nos_bad_status_code():
+    network_service = MonitoringLocationNetworkService(ENDPOINT)
+    with Mocker(session=network_service.session) as session_mock:
+        session_mock.get(f'{ENDPOINT}RTN/items', status_code=500)
+
+        assert network_service.get_network_site_nos('RTN') is None
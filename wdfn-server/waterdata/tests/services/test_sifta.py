@@ -6,6 +6,7 @@ import json
 
 from requests_mock import Mocker
 
+from ...services.cache import MemoryCacheBackend, ServiceCache
 from ...services.sifta import SiftaService
 
 
@@ -35,3 +36,26 @@ def test_sifta_handling_bad_status_code():
 
         assert session_mock.call_count == 1
         assert result == []
+        assert sifta_service.get('12345')[0] == 500
+
+
+def test_sifta_response_cached():
+    sifta_service = SiftaService(ENDPOINT, cache=ServiceCache(MemoryCacheBackend(), 'cooperators', 60))
+    with Mocker(session=sifta_service.session) as session_mock:
+        session_mock.get(f'{ENDPOINT}12345', text=MOCK_RESPONSE)
+        sifta_service.get_cooperators('12345')
+        result = sifta_service.get_cooperators('12345')
+
+        assert session_mock.call_count == 1
+        assert result == MOCK_CUSTOMER_LIST, 'Expected response'
+
+
+def test_sifta_bad_status_code_not_cached():
+    sifta_service = SiftaService(ENDPOINT, cache=ServiceCache(MemoryCacheBackend(), 'cooperators', 60))
+    with Mocker(session=sifta_service.session) as session_mock:
+        session_mock.get(f'{ENDPOINT}12345', status_code=500)
+        sifta_service.get_cooperators('12345')
+        result = sifta_service.get_cooperators('12345')
+
+        assert session_mock.call_count == 2
+        assert result == []
@@ -0,0 +1,122 @@
+"""
+Tests for the single_flight module
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from ...services.single_flight import FileLockStore, SingleFlight
+
+
+class TestSingleFlight(TestCase):
+
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.executor = ThreadPoolExecutor(max_workers=8)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_concurrent_calls_are_shared(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ['data']
+
+        leader = self.executor.submit(self.flights.do, 'key', fetch)
+        started.wait(5)
+        followers = [self.executor.submit(self.flights.do, 'key', fetch) for _ in range(5)]
+        # Wait for the followers to join the flight
+        while self.flights.shared < 5:
+            time.sleep(0.01)
+        release.set()
+
+        results = [leader.result(timeout=5)] + [follower.result(timeout=5) for follower in followers]
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_sequential_calls_are_not_shared(self):
+        self.assertEqual(self.flights.do('key', lambda: 1), 1)
+        self.assertEqual(self.flights.do('key', lambda: 2), 2)
+        self.assertEqual(self.flights.do('other', lambda: 3), 3)
+        self.assertEqual(self.flights.shared, 0)
+
+    def test_error_is_shared(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise ValueError('Bad')
+
+        leader = self.executor.submit(self.flights.do, 'key', fail)
+        started.wait(5)
+        follower = self.executor.submit(self.flights.do, 'key', fail)
+        while self.flights.shared < 1:
+            time.sleep(0.01)
+        release.set()
+
+        with self.assertRaises(ValueError):
+            leader.result(timeout=5)
+        with self.assertRaises(ValueError):
+            follower.result(timeout=5)
+        self.assertEqual(self.flights.do('key', lambda: 'recovered'), 'recovered')
+
+
+class TestFileLockStore(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lock_is_exclusive(self):
+        # Each store opens its own lock files, as another process would
+        first_store = FileLockStore(self.temp_dir.name, timeout=0.1)
+        second_store = FileLockStore(self.temp_dir.name, timeout=0.1)
+        with first_store.lock('site:01630500') as locked:
+            self.assertTrue(locked)
+            with second_store.lock('site:01630500') as second_locked:
+                self.assertFalse(second_locked)
+        with second_store.lock('site:01630500') as locked:
+            self.assertTrue(locked)
+
+    def test_lock_per_key(self):
+        first_store = FileLockStore(self.temp_dir.name, timeout=0.1)
+        second_store = FileLockStore(self.temp_dir.name, timeout=0.1)
+        with first_store.lock('site:01630500') as locked:
+            self.assertTrue(locked)
+            with second_store.lock('site:01646500') as second_locked:
+                self.assertTrue(second_locked)
+                self.assertEqual(len(os.listdir(self.temp_dir.name)), 2)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_waiting_process_gets_lock(self):
+        first_store = FileLockStore(self.temp_dir.name, timeout=5)
+        second_store = FileLockStore(self.temp_dir.name, timeout=5)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with first_store.lock('site:01630500'):
+                holding.set()
+                release.wait()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            holder = executor.submit(hold)
+            holding.wait()
+            threading.Timer(0.05, release.set).start()
+            with second_store.lock('site:01630500') as locked:
+                self.assertTrue(locked)
+                self.assertTrue(release.is_set())
+            holder.result()
@@ -1,9 +1,14 @@
 """
 Tests for timezone module
 """
+import os
+import tempfile
+from unittest import mock
+
+import pytest
 from requests_mock import Mocker
 
-from ...services.timezone import TimeZoneService
+from ...services.timezone import TimeZoneService, TimeZoneStore
 
 MOCK_RESPONSE = """
 {"id": "https://api.weather.gov/points/38.9498,-77.1276",
@@ -79,3 +84,81 @@ def test_bad_weather_service_response():
         result = time_zone_service.get_iana_time_zone('46.0', '-110.0')
         assert session_mock.call_count == 1
         assert result is None
+
+
+@pytest.fixture
+def time_zone_store():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield TimeZoneStore(os.path.join(temp_dir, 'time_zones.sqlite'), precision=2)
+
+
+def test_time_zone_store_rounds_locations(time_zone_store):
+    time_zone_store.set('45.0012', '-100.0049', 'America/Chicago')
+
+    assert time_zone_store.get(45.0, -100.0) == 'America/Chicago'
+    assert time_zone_store.get('45.004', '-99.996') == 'America/Chicago'
+    assert time_zone_store.get('45.01', '-100.0') is None
+
+
+def test_time_zone_store_survives_reopening(time_zone_store):
+    time_zone_store.set('45.0', '-100.0', 'America/Chicago')
+
+    assert TimeZoneStore(time_zone_store.path).get('45.0', '-100.0') == 'America/Chicago'
+
+
+def test_weather_service_response_saved_to_store(time_zone_store):
+    time_zone_service = TimeZoneService(ENDPOINT, store=time_zone_store)
+    with Mocker(session=time_zone_service.session) as session_mock:
+        session_mock.get(f'{ENDPOINT}/points/45.0,-100.0', text=MOCK_RESPONSE)
+        time_zone_service.get_iana_time_zone('45.0', '-100.0')
+        result = time_zone_service.get_iana_time_zone('45.0', '-100.0')
+
+        assert session_mock.call_count == 1
+        assert result == 'America/New_York'
+        assert time_zone_store.get('45.0', '-100.0') == 'America/New_York'
+
+
+def test_bad_weather_service_response_not_saved_to_store(time_zone_store):
+    time_zone_service = TimeZoneService(ENDPOINT, store=time_zone_store)
+    with Mocker(session=time_zone_service.session) as session_mock:
+        session_mock.get(f'{ENDPOINT}/points/46.0,-110.0', status_code=500)
+        result = time_zone_service.get_iana_time_zone('46.0', '-110.0')
+
+        assert result is None
+        assert len(time_zone_store) == 0
+
+
+def test_warm(time_zone_store):
+    time_zone_store.set('45.0', '-100.0', 'America/Chicago')
+    time_zone_service = TimeZoneService(ENDPOINT, store=time_zone_store)
+    with Mocker(session=time_zone_service.session) as session_mock:
+        session_mock.get(f'{ENDPOINT}/points/46.0,-110.0', text=MOCK_RESPONSE)
+        session_mock.get(f'{ENDPOINT}/points/47.0,-120.0', status_code=500)
+        looked_up, failed = time_zone_service.warm([('45.0', '-100.0'), ('46.0', '-110.0'), ('47.0', '-120.0')])
+
+        assert session_mock.call_count == 2
+        assert (looked_up, failed) == (2, 1)
+        assert time_zone_store.get('46.0', '-110.0') == 'America/New_York'
+
+
+def test_warm_malformed_location(time_zone_store):
+    time_zone_service = TimeZoneService(ENDPOINT, store=time_zone_store)
+    with Mocker(session=time_zone_service.session) as session_mock:
+        session_mock.get(f'{ENDPOINT}/points/46.0,-110.0', text=MOCK_RESPONSE)
+        looked_up, failed = time_zone_service.warm([('', '-100.0'), ('north', 'west'), ('46.0', '-110.0')])
+
+        assert session_mock.call_count == 1
+        assert (looked_up, failed) == (3, 2)
+        assert time_zone_store.get('46.0', '-110.0') == 'America/New_York'
+
+
+def test_blank_location_skips_store(time_zone_store):
+    time_zone_service = TimeZoneService(ENDPOINT, store=time_zone_store)
+    with Mocker(session=time_zone_service.session) as session_mock, \
+            mock.patch('waterdata.services.timezone.app.logger') as mock_logger:
+        session_mock.get(f'{ENDPOINT}/points/,', status_code=404)
+        result = time_zone_service.get_iana_time_zone('', '')
+
+        assert result is None
+        mock_logger.error.assert_not_called()
+        assert len(time_zone_store) == 0
@@ -0,0 +1,102 @@
+"""
+Tests for timezone_boundaries module
+"""
+import json
+import os
+import tempfile
+
+import pytest
+
+from ...services.timezone_boundaries import TimeZoneBoundaryResolver, read_geojson_polygons, write_boundary_index
+
+MOCK_BOUNDARIES = {
+    'type': 'FeatureCollection',
+    'features': [{
+        'type': 'Feature',
+        'properties': {'tzid': 'America/Chicago'},
+        'geometry': {
+            'type': 'Polygon',
+            'coordinates': [
+                [[-105.0, 30.0], [-90.0, 30.0], [-90.0, 45.0], [-105.0, 45.0], [-105.0, 30.0]],
+                # hole which belongs to another zone
+                [[-100.0, 35.0], [-95.0, 35.0], [-95.0, 40.0], [-100.0, 40.0], [-100.0, 35.0]]
+            ]
+        }
+    }, {
+        'type': 'Feature',
+        'properties': {'tzid': 'America/Denver'},
+        'geometry': {
+            'type': 'MultiPolygon',
+            'coordinates': [
+                [[[-100.0, 35.0], [-95.0, 35.0], [-95.0, 40.0], [-100.0, 40.0], [-100.0, 35.0]]],
+                [[[-115.0, 30.0], [-105.0, 30.0], [-105.0, 45.0], [-115.0, 45.0], [-115.0, 30.0]]]
+            ]
+        }
+    }, {
+        'type': 'Feature',
+        'properties': {'tzid': 'America/New_York'},
+        'geometry': {
+            'type': 'Polygon',
+            # triangle so that the bounding box is not the same as the polygon
+            'coordinates': [[[-90.0, 30.0], [-70.0, 30.0], [-90.0, 45.0], [-90.0, 30.0]]]
+        }
+    }]
+}
+
+
+@pytest.fixture
+def resolver():
+    return TimeZoneBoundaryResolver(read_geojson_polygons(MOCK_BOUNDARIES))
+
+
+def test_read_geojson_polygons():
+    polygons = read_geojson_polygons(MOCK_BOUNDARIES)
+
+    assert [tzid for tzid, _ in polygons] == ['America/Chicago', 'America/Denver', 'America/Denver',
+                                              'America/New_York']
+
+
+@pytest.mark.parametrize('latitude,longitude,expected', [
+    ('32.5', '-92.0', 'America/Chicago'),
+    ('37.5', '-97.5', 'America/Denver'),
+    ('37.5', '-110.0', 'America/Denver'),
+    ('31.0', '-85.0', 'America/New_York'),
+    ('44.0', '-72.0', None),
+    ('10.0', '-100.0', None),
+    ('', '', None)
+])
+def test_get_iana_time_zone(resolver, latitude, longitude, expected):
+    assert resolver.get_iana_time_zone(latitude, longitude) == expected
+
+
+def test_get_iana_time_zone_with_floats(resolver):
+    assert resolver.get_iana_time_zone(32.5, -92.0) == 'America/Chicago'
+
+
+@pytest.mark.parametrize('file_name', ['boundaries.json', 'boundaries.json.gz'])
+def test_write_boundary_index(file_name):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        geojson_path = os.path.join(temp_dir, 'geojson.json')
+        index_path = os.path.join(temp_dir, file_name)
+        with open(geojson_path, 'w') as geojson_file:
+            json.dump(MOCK_BOUNDARIES, geojson_file)
+
+        assert write_boundary_index(geojson_path, index_path, bbox=(-112.0, 25.0, -95.0, 50.0)) == 3
+        resolver = TimeZoneBoundaryResolver.from_file(index_path)
+
+        assert len(resolver) == 3
+        assert resolver.get_iana_time_zone('32.5', '-92.0') == 'America/Chicago'
+        assert resolver.get_iana_time_zone('37.5', '-97.5') == 'America/Denver'
+        assert resolver.get_iana_time_zone('31.0', '-85.0') is None
+
+
+def test_from_geojson_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        geojson_path = os.path.join(temp_dir, 'geojson.json')
+        with open(geojson_path, 'w') as geojson_file:
+            json.dump(MOCK_BOUNDARIES, geojson_file)
+
+        resolver = TimeZoneBoundaryResolver.from_file(geojson_path)
+
+        assert len(resolver) == 4
+        assert resolver.get_iana_time_zone('31.0', '-85.0') == 'America/New_York'
@@ -0,0 +1,85 @@
+"""
+A local HTTP server which stands in for upstream services in tests and benchmarks. Each route can be
+given a delay so that the latency of real services can be simulated.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+
+class StubRoute:
+    """
+    Canned response for requests whose path starts with a prefix
+    """
+    # pylint: disable=R0903,R0913
+
+    def __init__(self, body='', status=200, delay=0, content_type='text/plain'):
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.status = status
+        self.delay = delay
+        self.content_type = content_type
+        self.call_count = 0
+
+
+class StubServer:
+    """
+    Serves StubRoutes from a background thread. Use as a context manager:
+
+        with StubServer({'/nwis/site': StubRoute(SITE_RDB, delay=0.2)}) as server:
+            service = SiteService(f'{server.url}/nwis/site')
+    """
+
+    def __init__(self, routes):
+        """
+        :param dict routes: StubRoute keyed by path prefix. The longest matching prefix is used.
+        """
+        self.routes = routes
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """Scheme, host and port of the server"""
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def _match(self, path):
+        prefixes = sorted((prefix for prefix in self.routes if path.startswith(prefix)), key=len, reverse=True)
+        return self.routes[prefixes[0]] if prefixes else None
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Responds with the StubRoute matching the request path"""
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):  # pylint: disable=C0103
+                route = stub._match(self.path)  # pylint: disable=W0212
+                if route is None:
+                    route = StubRoute('Not found', status=404)
+                with stub._lock:  # pylint: disable=W0212
+                    route.call_count += 1
+                if route.delay:
+                    time.sleep(route.delay)
+                self.send_response(route.status)
+                self.send_header('Content-Type', route.content_type)
+                self.send_header('Content-Length', str(len(route.body)))
+                self.end_headers()
+                self.wfile.write(route.body)
+
+            def log_message(self, format, *args):  # pylint: disable=W0622
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,145 @@
+"""
+Tests for the cache_control module
+"""
+import json
+import re
+from unittest import mock
+
+import pytest
+import requests_mock
+
+from .. import app
+from ..cache_control import get_surrogate_keys
+from ..utils import parse_rdb
+from .mock_test_data import MOCK_NETWORK_RESPONSE, PARAMETER_RDB, SITE_RDB
+
+
+def assert_cached(response, max_age, surrogate_max_age, surrogate_keys):
+    assert response.cache_control.public
+    assert response.cache_control.max_age == max_age
+    assert response.headers['Surrogate-Control'] == f'max-age={surrogate_max_age}'
+    assert response.headers['Surrogate-Key'].split(' ') == surrogate_keys
+
+
+def assert_not_cached(response):
+    assert response.cache_control.no_store
+    assert response.headers['Surrogate-Control'] == 'no-store'
+    assert 'Surrogate-Key' not in response.headers
+
+
+@pytest.fixture
+def mock_site_service():
+    with requests_mock.mock() as req:
+        req.get(re.compile('{host}.*'.format(host=app.config['SITE_DATA_ENDPOINT'])), text=PARAMETER_RDB)
+        yield
+
+
+@pytest.mark.parametrize('url,endpoint', [
+    ('/', 'home'),
+    ('/provisional-data-statement/', 'provisional_data_statement'),
+    ('/iv-data-availability-statement/', 'iv_data_availability'),
+])
+def test_static_pages(client, url, endpoint):
+    policy = app.config['CACHE_POLICIES'][endpoint]
+    assert_cached(client.get(url), policy['max_age'], policy['surrogate_max_age'], [endpoint.replace('_', '-')])
+
+
+@pytest.mark.parametrize('url,endpoint,surrogate_keys', [
+    ('/hydrological-unit/', 'hydrological_unit', ['hydrological-unit']),
+    ('/hydrological-unit/01/', 'hydrological_unit', ['hydrological-unit', 'huc-01']),
+    ('/hydrological-unit/01/monitoring-locations/', 'hydrological_unit_locations',
+     ['hydrological-unit-locations', 'huc-01']),
+    ('/states/', 'states_counties', ['states-counties']),
+    ('/states/23/', 'states_counties', ['states-counties', 'state-23']),
+    ('/states/23/counties/003/', 'states_counties', ['states-counties', 'state-23', 'county-23003']),
+    ('/states/23/counties/003/monitoring-locations/', 'county_station_locations',
+     ['county-station-locations', 'state-23', 'county-23003']),
+    ('/components/time-series/01646500/', 'time_series_component', ['time-series-component', 'site-01646500'])
+])
+def test_pages(client, mock_site_service, url, endpoint, surrogate_keys):  # pylint: disable=W0621,W0613
+    policy = app.config['CACHE_POLICIES'][endpoint]
+    assert_cached(client.get(url), policy['max_age'], policy['surrogate_max_age'], surrogate_keys)
+
+
+def test_not_found(client):
+    not_found_max_age = app.config['CACHE_NOT_FOUND_MAX_AGE']
+    response = client.get('/states/1/')
+
+    assert response.status_code == 404
+    assert_cached(response, not_found_max_age, not_found_max_age, ['states-counties', 'state-1'])
+
+
+@mock.patch('waterdata.services.ogc.MonitoringLocationNetworkService.get_networks')
+def test_networks(network_mock, client):
+    policy = app.config['CACHE_POLICIES']['networks']
+    network_mock.return_value = json.loads(MOCK_NETWORK_RESPONSE)
+    response = client.get('/networks/RTS/')
+    assert_cached(response, policy['max_age'], policy['surrogate_max_age'], ['networks', 'network-RTS'])
+
+    # A not modified response has the same headers
+    response = client.get('/networks/RTS/', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert_cached(response, policy['max_age'], policy['surrogate_max_age'], ['networks', 'network-RTS'])
+
+    network_mock.return_value = {}
+    assert client.get('/networks/invalid/').cache_control.max_age == app.config['CACHE_NOT_FOUND_MAX_AGE']
+
+
+@mock.patch('waterdata.views.TimeZoneService.get_iana_time_zone', return_value=None)
+@mock.patch('waterdata.views.SiftaService.get', return_value=(200, 'OK', []))
+@mock.patch('waterdata.views.SiteService.get_period_of_record')
+@mock.patch('waterdata.views.SiteService.get_site_data')
+def test_monitoring_location(site_mock, param_mock, _cooperators_mock, _time_zone_mock, client):
+    policy = app.config['CACHE_POLICIES']['monitoring_location']
+    site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+    param_mock.return_value = (200, '', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+    url = '/monitoring-location/01630500/?agency_cd=USGS'
+
+    # The first visit neither sets a cookie nor stops the CDN from caching the page
+    with mock.patch.dict(app.config, {'SET_COOKIE_TO_HIDE_BANNER_NOTICES': True}):
+        response = client.get(url)
+    assert 'Set-Cookie' not in response.headers
+    assert_cached(response, policy['max_age'], policy['surrogate_max_age'], ['monitoring-location', 'site-01630500'])
+    assert 'document.cookie' in response.data.decode('utf-8')
+
+    client.set_cookie('localhost', 'no-show-banner-message', 'no-show')
+    response = client.get(url)
+    assert_cached(response, policy['max_age'], policy['surrogate_max_age'], ['monitoring-location', 'site-01630500'])
+    assert 'document.cookie' not in response.data.decode('utf-8')
+
+    response = client.get(url, headers={'Accept': 'application/ld+json'})
+    assert_cached(response, policy['max_age'], policy['surrogate_max_age'], ['monitoring-location', 'site-01630500'])
+
+
+@mock.patch('waterdata.views.SiteService.get_site_data')
+def test_monitoring_location_error(site_mock, client):
+    site_mock.return_value = (500, '', None)
+    response = client.get('/monitoring-location/01630500/')
+
+    assert response.status_code == 503
+    assert_not_cached(response)
+
+
+@mock.patch('waterdata.views.TimeZoneService.get_iana_time_zone', return_value=None)
+@mock.patch('waterdata.views.SiftaService.get', return_value=(200, 'OK', []))
+@mock.patch('waterdata.views.SiteService.get_period_of_record', return_value=(503, 'Service Unavailable', []))
+@mock.patch('waterdata.views.SiteService.get_site_data')
+def test_monitoring_location_degraded(site_mock, *_):
+    site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+    response = app.test_client().get('/monitoring-location/01630500/')
+
+    assert response.status_code == 200
+    assert_not_cached(response)
+
+
+def test_no_policy(client):
+    response = client.get('/feedback-submitted/success/')
+
+    assert response.cache_control.max_age is None
+    assert 'Surrogate-Control' not in response.headers
+
+
+def test_surrogate_keys():
+    assert get_surrogate_keys('networks', {'network_cd': ''}) == ['networks']
+    assert get_surrogate_keys('monitoring_location', {'site_no': '01630500'}) == \
+        ['monitoring-location', 'site-01630500']
@@ -0,0 +1,117 @@
+"""
+Tests for the compression module
+"""
+import gzip
+from unittest import mock
+
+import pytest
+from werkzeug.http import parse_accept_header
+
+from .. import app
+from ..compression import choose_encoding, compress_response, get_supported_encodings
+
+
+@pytest.mark.parametrize('accept_encoding, brotli_installed, expected', [
+    ('gzip, deflate, br', True, 'br'),
+    ('gzip, deflate, br', False, 'gzip'),
+    ('gzip;q=1.0, br;q=0.5', True, 'gzip'),
+    ('*', True, 'br'),
+    ('deflate', True, None),
+    ('gzip;q=0', False, None),
+    ('', True, None)
+])
+def test_choose_encoding(accept_encoding, brotli_installed, expected):
+    with mock.patch('waterdata.compression.brotli', mock.Mock() if brotli_installed else None):
+        assert choose_encoding(parse_accept_header(accept_encoding)) == expected
+
+
+def test_supported_encodings():
+    with mock.patch('waterdata.compression.brotli', None):
+        assert get_supported_encodings() == ('gzip',)
+
+
+def test_compress_response():
+    body = b'{"parm_grp_summary": []}' * 100
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag('abc')
+    with app.app_context():
+        compress_response(response, 'gzip')
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()) == body
+    assert int(response.headers['Content-Length']) == len(response.get_data())
+    assert response.get_etag() == ('abc', True)
+
+
+def test_compress_response_with_no_encoding():
+    response = app.response_class(b'body', mimetype='application/json')
+    compress_response(response, None)
+
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    assert response.get_data() == b'body'
+
+
+@pytest.mark.parametrize('status', [204, 304])
+def test_compress_response_without_body(status):
+    response = app.response_class(status=status)
+    compress_response(response, 'gzip')
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_not_modified_etag_matches_compressed_response(client):
+    with mock.patch('waterdata.views.monitoring_location_network_service.get_networks', return_value={}):
+        response = client.get('/networks/', headers={'Accept-Encoding': 'gzip'})
+        not_modified = client.get('/networks/', headers={'Accept-Encoding': 'gzip',
+                                                         'If-None-Match': response.headers['ETag']})
+        identity_not_modified = client.get('/networks/', headers={'If-None-Match': response.headers['ETag']})
+
+    assert response.headers['ETag'].startswith('W/')
+    assert not_modified.status_code == 304
+    assert not_modified.headers['ETag'] == response.headers['ETag']
+    assert 'Accept-Encoding' in not_modified.vary
+    assert identity_not_modified.status_code == 304
+    assert identity_not_modified.headers['ETag'] == response.headers['ETag'][2:]
+
+
+def test_compress_encoded_response():
+    response = app.response_class(b'body', headers={'Content-Encoding': 'br'})
+    compress_response(response, 'gzip')
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.get_data() == b'body'
+
+
+def test_dynamic_response_compressed(client):
+    with mock.patch('waterdata.views.monitoring_location_network_service.get_networks', return_value={}):
+        response = client.get('/networks/', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'</html>' in gzip.decompress(response.data)
+
+
+def test_small_response_not_compressed(client):
+    with mock.patch.dict(app.config, {'COMPRESSION_MIN_SIZE': 10 ** 9}), \
+            mock.patch('waterdata.views.monitoring_location_network_service.get_networks', return_value={}):
+        response = client.get('/networks/', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_compression_disabled(client):
+    with mock.patch.dict(app.config, {'COMPRESSION_MIN_SIZE': None}), \
+            mock.patch('waterdata.views.monitoring_location_network_service.get_networks', return_value={}):
+        response = client.get('/networks/', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_other_mimetype_not_compressed(client):
+    with mock.patch.dict(app.config, {'COMPRESSION_MIMETYPES': ['application/json']}), \
+            mock.patch('waterdata.views.monitoring_location_network_service.get_networks', return_value={}):
+        response = client.get('/networks/', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
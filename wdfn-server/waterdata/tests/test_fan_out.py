@@ -0,0 +1,114 @@
+"""
+Tests for the fan_out module
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+from unittest import TestCase, mock
+
+from .. import app
+from ..fan_out import FanOut, get_executor
+from ..services.camera import CameraStore, fetch_camera_metadata
+from ..services.nwissite import SiteService
+from ..services.sifta import SiftaService
+from ..services.timezone import TimeZoneService
+from .mock_test_data import SITE_RDB, PARAMETER_RDB
+from .stub_server import StubRoute, StubServer
+
+
+class TestFanOut(TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=False)
+
+    def test_results(self):
+        fan_out = FanOut(self.executor)
+        fan_out.submit('one', lambda: 1)
+        fan_out.submit('two', lambda x, y=0: x + y, 1, y=1)
+
+        self.assertEqual(fan_out.results(), {'one': 1, 'two': 2})
+
+    def test_calls_run_concurrently(self):
+        fan_out = FanOut(self.executor)
+        start = time.monotonic()
+        for name in ['a', 'b', 'c']:
+            fan_out.submit(name, time.sleep, 0.2)
+        fan_out.results()
+
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_fallback_on_exception(self):
+        def fail():
+            raise ValueError('Bad')
+        fan_out = FanOut(self.executor)
+        fan_out.submit('fails', fail, fallback=[])
+
+        self.assertEqual(fan_out.result('fails'), [])
+        self.assertEqual(fan_out.fallbacks, {'fails'})
+
+    def test_fallback_on_timeout(self):
+        fan_out = FanOut(self.executor, default_timeout=5)
+        fan_out.submit('slow', lambda: time.sleep(1) or 'done', fallback='fallback', timeout=0.1)
+        fan_out.submit('fast', lambda: 'done', fallback='fallback')
+
+        self.assertEqual(fan_out.result('slow'), 'fallback')
+        self.assertEqual(fan_out.result('fast'), 'done')
+        self.assertEqual(fan_out.fallbacks, {'slow'})
+
+
+class TestGetExecutor(TestCase):
+
+    @mock.patch('waterdata.fan_out._executor', None)
+    @mock.patch('waterdata.fan_out.is_cooperative', return_value=False)
+    def test_sync_worker(self, _):
+        self.assertEqual(get_executor()._max_workers, app.config['FAN_OUT_MAX_WORKERS'])  # pylint: disable=W0212
+
+    @mock.patch('waterdata.fan_out._executor', None)
+    @mock.patch('waterdata.fan_out.is_cooperative', return_value=True)
+    def test_gevent_worker(self, _):
+        self.assertEqual(get_executor()._max_workers, app.config['FAN_OUT_MAX_GREENLETS'])  # pylint: disable=W0212
+
+
+class TestMonitoringLocationFanOutLatency(TestCase):
+    """
+    Serves each upstream dependency of the monitoring location page from a local stub server which
+    delays its response. Because the dependencies are fetched concurrently, the page should take about as
+    long as the site data request plus the slowest dependency rather than the sum of all the delays.
+    """
+    DELAY = 0.3
+
+    def setUp(self):
+        self.routes = {
+            '/nwis/site?format=rdb&sites=01630500&siteOutput': StubRoute(SITE_RDB, delay=self.DELAY),
+            '/nwis/site?format=rdb&sites=01630500&seriesCatalogOutput': StubRoute(PARAMETER_RDB, delay=self.DELAY),
+            '/sifta/': StubRoute('{"Customers": []}', delay=self.DELAY, content_type='application/json'),
+            '/weather/points/': StubRoute(json.dumps({'properties': {'timeZone': 'America/New_York'}}),
+                                          delay=self.DELAY, content_type='application/json'),
+            '/cameras/php/getAllEnabledCameras.php': StubRoute('{"data": []}', delay=self.DELAY,
+                                                               content_type='application/json')
+        }
+        self.app_client = app.test_client()
+
+    def test_latency(self):
+        with StubServer(self.routes) as server, \
+                mock.patch('waterdata.views.site_service', SiteService(f'{server.url}/nwis/site')), \
+                mock.patch('waterdata.views.sifta_service', SiftaService(f'{server.url}/sifta/')), \
+                mock.patch('waterdata.views.time_zone_service', TimeZoneService(f'{server.url}/weather')), \
+                mock.patch('waterdata.services.camera.ML_CAMERA_ENDPOINT', f'{server.url}/cameras/'), \
+                mock.patch('waterdata.services.camera.camera_store', CameraStore(fetch_camera_metadata, 3600, 300)), \
+                mock.patch.dict(app.config, {'MONITORING_LOCATION_CAMERA_ENABLED': True}):
+            start = time.monotonic()
+            response = self.app_client.get('/monitoring-location/01630500/')
+            elapsed = time.monotonic() - start
+
+        serial_latency = 5 * self.DELAY
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('America/New_York', response.data.decode('utf-8'))
+        self.assertEqual(self.routes['/sifta/'].call_count, 1)
+        self.assertEqual(self.routes['/cameras/php/getAllEnabledCameras.php'].call_count, 1)
+        # site data first, then everything else at once
+        self.assertLess(elapsed, serial_latency - 2 * self.DELAY)
+
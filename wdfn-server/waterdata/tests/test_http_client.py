@@ -0,0 +1,73 @@
+"""
+Tests for the http_client module
+"""
+from unittest import TestCase, mock
+
+from requests import exceptions as request_exceptions
+
+from .. import app
+from ..http_client import PooledHTTPAdapter, create_session, get_http_client_stats, get_shared_session
+from .stub_server import StubRoute, StubServer
+
+
+class TestCreateSession(TestCase):
+
+    def setUp(self):
+        self.config = dict(app.config, HTTP_CLIENT_RETRY_BACKOFF=0)
+
+    def test_adapters(self):
+        config = dict(self.config, HTTP_CLIENT_POOL_MAXSIZE=5, HTTP_CLIENT_HOST_POOL_MAXSIZE={'nwis.test': 20})
+        session = create_session(config)
+
+        default_adapter = session.get_adapter('https://other.test/path')
+        host_adapter = session.get_adapter('https://nwis.test/nwis/site/')
+        self.assertIsInstance(default_adapter, PooledHTTPAdapter)
+        self.assertEqual(default_adapter._pool_maxsize, 5)  # pylint: disable=W0212
+        self.assertEqual(host_adapter._pool_maxsize, 20)  # pylint: disable=W0212
+        self.assertEqual(host_adapter.timeout, (app.config['HTTP_CLIENT_CONNECT_TIMEOUT'],
+                                                app.config['HTTP_CLIENT_READ_TIMEOUT']))
+
+    def test_connections_are_reused(self):
+        with StubServer({'/': StubRoute('data')}) as server:
+            session = create_session(self.config)
+            for _ in range(3):
+                self.assertEqual(session.get(f'{server.url}/path').text, 'data')
+
+            stats = get_http_client_stats()[server.url]
+        self.assertEqual(stats, {'connections': 1, 'requests': 3, 'reused': 2})
+
+    def test_retries(self):
+        route = StubRoute('unavailable', status=503)
+        with StubServer({'/': route}) as server:
+            response = create_session(dict(self.config, HTTP_CLIENT_RETRIES=2)).get(f'{server.url}/path')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(route.call_count, 3)
+
+    def test_read_timeout_not_retried(self):
+        route = StubRoute('slow', delay=0.3)
+        with StubServer({'/': route}) as server:
+            session = create_session(dict(self.config, HTTP_CLIENT_RETRIES=2, HTTP_CLIENT_READ_TIMEOUT=0.1))
+            with self.assertRaises(request_exceptions.ReadTimeout):
+                session.get(f'{server.url}/path')
+
+        self.assertEqual(route.call_count, 1)
+
+    def test_read_timeout(self):
+        with StubServer({'/': StubRoute('slow', delay=0.5)}) as server:
+            session = create_session(dict(self.config, HTTP_CLIENT_RETRIES=0, HTTP_CLIENT_READ_TIMEOUT=0.1))
+            # Services handle either exception
+            with self.assertRaises((request_exceptions.Timeout, request_exceptions.ConnectionError)):
+                session.get(f'{server.url}/path')
+
+            # A timeout given with the request is used instead
+            self.assertEqual(session.get(f'{server.url}/path', timeout=5).text, 'slow')
+
+
+class TestGetSharedSession(TestCase):
+
+    @mock.patch('waterdata.http_client._shared_session', None)
+    def test_created_once(self):
+        session = get_shared_session()
+        self.assertIs(get_shared_session(), session)
+        self.assertIsInstance(session.get_adapter('https://apps.usgs.gov/'), PooledHTTPAdapter)
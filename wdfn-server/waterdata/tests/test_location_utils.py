@@ -2,14 +2,17 @@
 Unit tests for waterdata.waterservices classes and functions.
 
 """
+import os
+import tempfile
 from unittest import TestCase
 
 from pendulum import datetime
 
 from .. import app
+from ..lookups import LookupStore, compile_lookups
 from ..location_utils import (
-    build_linked_data, get_disambiguated_values, get_state_abbreviation, rollup_dataseries,
-    get_period_of_record_by_parm_cd, get_default_parameter_code
+    build_linked_data, get_disambiguated_values, get_state_abbreviation, LookupIndexes, rollup_dataseries,
+    get_period_of_record_by_parm_cd, get_periods_of_record, get_default_parameter_code
 )
 
 
@@ -119,9 +122,12 @@ class GetDisambiguatedValuesTestCase(TestCase):
             }
         }
 
+        self.lookup_indexes = LookupIndexes(self.test_code_lookups, self.test_country_state_county_lookup, {})
+        self.huc_lookup_indexes = LookupIndexes({}, {}, self.test_huc_lookup)
+
     def test_empty_location(self):
         self.assertEqual(
-            get_disambiguated_values({}, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values({}, self.lookup_indexes),
             {}
         )
 
@@ -135,7 +141,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'site_no': {'name': '12345678', 'code': '12345678'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -151,7 +157,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'nat_aqfr_cd': {'name': 'Basin and Range basin-fill aquifers', 'code': 'N100BSNRGB'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location)
 
     def test_location_with_key_values_not_in_code_lookups(self):
@@ -166,7 +172,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'nat_aqfr_cd': {'code': 'N100BSNRGB', 'name': 'Basin and Range basin-fill aquifers'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -186,7 +192,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'county_cd': {'name': 'Baldwin County', 'code': '002'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -204,7 +210,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'county_cd': {'name': '004', 'code': '004'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location)
 
     def test_state_with_no_counties_in_lookup(self):
@@ -221,7 +227,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'county_cd': {'name': '004', 'code': '004'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -241,10 +247,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'county_cd': {'name': '004', 'code': '004'}
         }
         self.assertEqual(
-            get_disambiguated_values(
-                test_location, self.test_code_lookups,
-                self.test_country_state_county_lookup, {}
-            ),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -262,7 +265,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'county_cd': {'name': '004', 'code': '004'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -278,7 +281,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'county_cd': {'name': '004', 'code': '004'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -294,7 +297,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'county_cd': {'name': '001', 'code': '001'}
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -310,7 +313,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
             'state_cd': {'name': 'Alabama', 'abbreviation': 'AL', 'code': '01'},
         }
         self.assertEqual(
-            get_disambiguated_values(test_location, self.test_code_lookups, self.test_country_state_county_lookup, {}),
+            get_disambiguated_values(test_location, self.lookup_indexes),
             expected_location
         )
 
@@ -323,7 +326,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
                 'huc_cd': {'name': 'New England Region', 'code': '01', 'url': '/hydrological-unit/01/'}
             }
             self.assertEqual(
-                get_disambiguated_values(test_location, {}, {}, self.test_huc_lookup),
+                get_disambiguated_values(test_location, self.huc_lookup_indexes),
                 expected_location
             )
 
@@ -336,7 +339,7 @@ class GetDisambiguatedValuesTestCase(TestCase):
                 'huc_cd': {'name': 'Upper St. John', 'code': '01010001', 'url': '/hydrological-unit/01010001/'}
             }
             self.assertEqual(
-                get_disambiguated_values(test_location, {}, {}, self.test_huc_lookup),
+                get_disambiguated_values(test_location, self.huc_lookup_indexes),
                 expected_location
             )
 
@@ -349,10 +352,76 @@ class GetDisambiguatedValuesTestCase(TestCase):
                 'huc_cd': {'name': None, 'code': '01010002', 'url': '/hydrological-unit/01010002/'}
             }
             self.assertEqual(
-                get_disambiguated_values(test_location, {}, {}, self.test_huc_lookup),
+                get_disambiguated_values(test_location, self.huc_lookup_indexes),
                 expected_location
             )
 
+    def test_parameter_group_from_parameter_code(self):
+        lookup_indexes = LookupIndexes({
+            'parm_cd': {
+                '00010': {'name': 'Temperature, water, degrees Celsius', 'group': 'Physical'},
+                '99999': {'name': 'No group'}
+            },
+            'parm_grp_cd': {'INF': {'name': 'Information'}}
+        }, {}, {})
+
+        self.assertEqual(
+            get_disambiguated_values({'parm_cd': '00010', 'parm_grp_cd': ''}, lookup_indexes)['parm_grp_cd'],
+            {'code': '', 'name': 'Physical'}
+        )
+        self.assertEqual(
+            get_disambiguated_values({'parm_cd': '99999', 'parm_grp_cd': ''}, lookup_indexes)['parm_grp_cd'],
+            {'code': '', 'name': ''}
+        )
+        self.assertEqual(
+            get_disambiguated_values({'parm_cd': '00010', 'parm_grp_cd': 'INF'}, lookup_indexes)['parm_grp_cd'],
+            {'code': 'INF', 'name': 'Information'}
+        )
+
+    def test_without_political_units(self):
+        test_location = {
+            'country_cd': 'US',
+            'state_cd': '01',
+            'county_cd': '001',
+            'agency_cd': 'USGS'
+        }
+        expected_location = {
+            'country_cd': {'name': 'US', 'code': 'US'},
+            'state_cd': {'name': '01', 'abbreviation': None, 'code': '01'},
+            'county_cd': {'name': '001', 'code': '001'},
+            'agency_cd': {'name': 'U.S. Geological Survey', 'code': 'USGS'}
+        }
+        self.assertEqual(
+            get_disambiguated_values(test_location, self.lookup_indexes.without_political_units()),
+            expected_location
+        )
+        self.assertEqual(self.lookup_indexes.state_names[('US', '01')], 'Alabama')
+
+    def test_indexes_from_store(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'lookups.sqlite')
+            compile_lookups([
+                ('NWIS_CODE_LOOKUP', self.test_code_lookups, 2),
+                ('COUNTRY_STATE_COUNTY_LOOKUP', self.test_country_state_county_lookup, 3),
+                ('HUC_LOOKUP', self.test_huc_lookup, 2)
+            ], path)
+            store_indexes = LookupIndexes.from_store(LookupStore(path))
+            dict_indexes = LookupIndexes(self.test_code_lookups, self.test_country_state_county_lookup,
+                                         self.test_huc_lookup)
+
+            for location in [
+                    {'country_cd': 'US', 'state_cd': '01', 'county_cd': '001', 'agency_cd': 'USGS'},
+                    {'country_cd': 'US', 'state_cd': '02', 'county_cd': '003', 'site_tp_cd': 'ST'},
+                    {'country_cd': 'CA', 'state_cd': '01', 'district_cd': '01', 'huc_cd': '01010001'}]:
+                with app.test_request_context():
+                    self.assertEqual(get_disambiguated_values(location, store_indexes),
+                                     get_disambiguated_values(location, dict_indexes))
+            self.assertEqual(store_indexes.state_names[('US', '01')], 'Alabama')
+
+    def test_indexes_are_read_only(self):
+        with self.assertRaises(TypeError):
+            self.lookup_indexes.state_names[('US', '03')] = 'Arizona'
+
 
 class TestBuildLinkedData(TestCase):
 
@@ -533,6 +602,26 @@ class TestRollupDataseries(TestCase):
             {'start_date', 'end_date', 'parameter_name', 'data_types', 'parameter_code'}
         )
 
+    def test_rollup_order(self):
+        result = rollup_dataseries(list(reversed(self.test_data)))
+
+        self.assertEqual([group['name'] for group in result], ['Nutrient', 'Physical', None, None, None])
+        self.assertEqual([parameter['parameter_code'] for parameter in result[1]['parameters']], ['00010', '00060'])
+        self.assertEqual(result[1]['parameters'][0], {
+            'start_date': datetime(1977, 6, 20),
+            'end_date': datetime(2017, 3, 26),
+            'data_types': ['Daily Values', 'Unit Values'],
+            'parameter_code': '00010',
+            'parameter_name': 'Temperature, water, degrees Celsius'
+        })
+        self.assertEqual([group['parameters'][0]['parameter_code'] for group in result[2:]], ['pk', 'sv', 'ad'])
+        self.assertEqual(result[4]['data_types'], 'USGS Annual Water Data Reports Site')
+        self.assertEqual(result[4]['start_date'], datetime(1980, 1, 1))
+        self.assertEqual(result[4]['end_date'], datetime(2016, 1, 1))
+
+    def test_empty_dataseries(self):
+        self.assertEqual(rollup_dataseries([]), [])
+
 
 class TestGetPeriodOfRecordByParmCd(TestCase):
 
@@ -605,6 +694,42 @@ class TestGetPeriodOfRecordByParmCd(TestCase):
             }
         })
 
+    def test_records_are_not_modified(self):
+        get_period_of_record_by_parm_cd(self.test_data)
+
+        self.assertEqual(self.test_data[1]['begin_date'], '2001-01-04')
+        self.assertEqual(self.test_data[1]['end_date'], '2018-03-01')
+
+
+class TestGetPeriodsOfRecord(TestCase):
+
+    def setUp(self):
+        self.test_data = [
+            {'data_type_cd': 'uv', 'parm_cd': '00060', 'begin_date': '2001-01-04', 'end_date': '2018-03-01'},
+            {'data_type_cd': 'uv', 'parm_cd': '00060', 'begin_date': '1999-12-31', 'end_date': '2018-02-01'},
+            {'data_type_cd': 'gw', 'parm_cd': '72019', 'begin_date': '1980-05-01', 'end_date': '2020-01-01'},
+            {'data_type_cd': 'dv', 'parm_cd': '00060', 'begin_date': '1990-01-04', 'end_date': '2018-03-01'}
+        ]
+
+    def test_all_data_types(self):
+        self.assertEqual(get_periods_of_record(self.test_data), {
+            'uv': {'00060': {'begin_date': '1999-12-31', 'end_date': '2018-03-01'}},
+            'gw': {'72019': {'begin_date': '1980-05-01', 'end_date': '2020-01-01'}},
+            'dv': {'00060': {'begin_date': '1990-01-04', 'end_date': '2018-03-01'}}
+        })
+
+    def test_selected_data_types(self):
+        self.assertEqual(get_periods_of_record(self.test_data, ('uv', 'gw', 'wq')), {
+            'uv': {'00060': {'begin_date': '1999-12-31', 'end_date': '2018-03-01'}},
+            'gw': {'72019': {'begin_date': '1980-05-01', 'end_date': '2020-01-01'}}
+        })
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            get_periods_of_record(self.test_data + [
+                {'data_type_cd': 'uv', 'parm_cd': '00060', 'begin_date': '2001-13-04', 'end_date': '2018-03-01'}
+            ])
+
 
 class TestGetDefaultParameterCode(TestCase):
 
@@ -0,0 +1,142 @@
+"""
+Tests for the lookups module
+"""
+import json
+import os
+import tempfile
+
+import pytest
+
+from .. import app
+from ..lookups import LOOKUPS, LookupStore, compile_lookup_files, compile_lookups, get_changed_lookup_files
+
+MOCK_LOOKUP = {
+    'site_tp_cd': {
+        'ST': {'name': 'Stream', 'desc': 'A body of running water'},
+        'LK': {'name': 'Lake'}
+    },
+    'agency_cd': {
+        'USGS': {'name': 'U.S. Geological Survey'}
+    },
+    'version': 3
+}
+
+MOCK_STATES = {
+    'US': {
+        'name': 'United States',
+        'state_cd': {
+            '55': {'name': 'Wisconsin', 'county_cd': {'025': {'name': 'Dane County'}}}
+        }
+    }
+}
+
+
+@pytest.fixture
+def store():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'lookups.sqlite')
+        compile_lookups([('NWIS_CODE_LOOKUP', MOCK_LOOKUP, 2), ('STATES', MOCK_STATES, 3)], path)
+        yield LookupStore(path)
+
+
+def test_lookup_mapping(store):
+    lookup = store.lookup('NWIS_CODE_LOOKUP')
+
+    assert list(lookup) == ['site_tp_cd', 'agency_cd', 'version']
+    assert len(lookup) == 3
+    assert 'agency_cd' in lookup
+    assert 'huc_cd' not in lookup
+    assert lookup['version'] == 3
+    assert lookup.get('huc_cd') is None
+    with pytest.raises(KeyError):
+        lookup['huc_cd']  # pylint: disable=W0104
+
+
+def test_nested_lookup_mapping(store):
+    site_types = store.lookup('NWIS_CODE_LOOKUP')['site_tp_cd']
+
+    assert list(site_types) == ['ST', 'LK']
+    assert site_types['ST'] == {'name': 'Stream', 'desc': 'A body of running water'}
+    assert dict(site_types.items()) == MOCK_LOOKUP['site_tp_cd']
+
+
+def test_lookup_depth(store):
+    states = store.lookup('STATES')
+
+    assert states['US']['name'] == 'United States'
+    assert list(states['US']['state_cd']) == ['55']
+    assert states['US']['state_cd']['55'] == MOCK_STATES['US']['state_cd']['55']
+
+
+def test_unknown_lookup(store):
+    lookup = store.lookup('HUC_LOOKUP')
+
+    assert len(lookup) == 0
+    assert list(lookup) == []
+    assert 'classes' not in lookup
+
+
+def test_lookup_indexes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'lookups.sqlite')
+        compile_lookups([
+            ('NWIS_CODE_LOOKUP', {'parm_cd': {'00060': {'group': 'Physical'}, '99999': {}}}, 2),
+            ('COUNTRY_STATE_COUNTY_LOOKUP', MOCK_STATES, 3)
+        ], path)
+        store = LookupStore(path)
+
+        assert store.has_indexes()
+        assert dict(store.index('state_name')) == {('US', '55'): 'Wisconsin'}
+        assert store.index('county_name')[('US', '55', '025')] == 'Dane County'
+        assert ('US', '55', '027') not in store.index('county_name')
+        assert dict(store.index('parameter_group')) == {'00060': 'Physical'}
+        assert len(store.index('parameter_group')) == 1
+
+
+def test_compile_replaces_existing_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'lookups.sqlite')
+        compile_lookups([('NWIS_CODE_LOOKUP', MOCK_LOOKUP, 2)], path)
+        compile_lookups([('NWIS_CODE_LOOKUP', {'version': 4}, 2)], path)
+
+        assert dict(LookupStore(path).lookup('NWIS_CODE_LOOKUP')) == {'version': 4}
+        assert os.listdir(temp_dir) == ['lookups.sqlite']
+
+
+def test_compile_lookup_files():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'lookups.sqlite')
+        compile_lookup_files(app.config, path)
+        store = LookupStore(path)
+
+        for name, filename_key, _ in LOOKUPS:
+            with open(os.path.join(app.config['DATA_DIR'], app.config[filename_key]), 'r') as lookup_file:
+                expected = json.load(lookup_file)
+            lookup = store.lookup(name)
+            assert list(lookup) == list(expected)
+            for key in list(expected)[:3]:
+                assert json.loads(json.dumps(lookup[key], default=dict)) == expected[key]
+
+
+def test_changed_lookup_files():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for _, filename_key, _ in LOOKUPS:
+            with open(os.path.join(temp_dir, app.config[filename_key]), 'w') as lookup_file:
+                json.dump({}, lookup_file)
+        config = dict(app.config, DATA_DIR=temp_dir)
+        path = os.path.join(temp_dir, 'lookups.sqlite')
+        compile_lookup_files(config, path)
+        assert get_changed_lookup_files(LookupStore(path), config) == []
+
+        with open(os.path.join(temp_dir, app.config['HUC_LOOKUP_FILENAME']), 'w') as lookup_file:
+            json.dump({'hucs': {}}, lookup_file)
+        assert get_changed_lookup_files(LookupStore(path), config) == [app.config['HUC_LOOKUP_FILENAME']]
+
+
+def test_store_without_sources_changed():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'lookups.sqlite')
+        compile_lookups([('NWIS_CODE_LOOKUP', MOCK_LOOKUP, 2)], path)
+
+        assert LookupStore(path).get_source_sizes() == {}
+        assert len(get_changed_lookup_files(LookupStore(path), app.config)) == len(LOOKUPS)
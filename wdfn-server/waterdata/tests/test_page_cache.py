@@ -0,0 +1,188 @@
+"""
+Tests for the page_cache module
+"""
+import json
+from unittest import TestCase, mock
+
+from .. import app
+from .mock_test_data import MOCK_NETWORKS_RESPONSE, SITE_RDB, PARAMETER_RDB
+from ..utils import parse_rdb
+
+MSIE_USER_AGENT = 'Mozilla/5.0 (compatible; MSIE 10.0; Windows NT 6.1; Trident/6.0)'
+
+
+@mock.patch('waterdata.services.ogc.MonitoringLocationNetworkService.get_networks')
+class TestCachedPage(TestCase):
+
+    def setUp(self):
+        self.app_client = app.test_client()
+
+    def test_page_is_cached(self, network_mock):
+        network_mock.return_value = json.loads(MOCK_NETWORKS_RESPONSE)
+        first_response = self.app_client.get('/networks/')
+        second_response = self.app_client.get('/networks/')
+
+        network_mock.assert_called_once()
+        self.assertEqual(second_response.status_code, 200)
+        self.assertEqual(first_response.data, second_response.data)
+        self.assertEqual(first_response.headers['ETag'], second_response.headers['ETag'])
+        self.assertFalse(first_response.headers['ETag'].startswith('W/'))
+
+    def test_not_modified(self, network_mock):
+        network_mock.return_value = json.loads(MOCK_NETWORKS_RESPONSE)
+        etag = self.app_client.get('/networks/').headers['ETag']
+        response = self.app_client.get('/networks/', headers={'If-None-Match': etag})
+
+        network_mock.assert_called_once()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        response = self.app_client.get('/networks/', headers={'If-None-Match': '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_without_cache(self, network_mock):
+        network_mock.return_value = json.loads(MOCK_NETWORKS_RESPONSE)
+        with mock.patch.dict(app.config, {'PAGE_CACHE_MAX_ENTRIES': 0}):
+            etag = self.app_client.get('/networks/').headers['ETag']
+            response = self.app_client.get('/networks/', headers={'If-None-Match': etag})
+
+        self.assertEqual(network_mock.call_count, 2)
+        self.assertEqual(response.status_code, 304)
+
+    def test_variants(self, network_mock):
+        network_mock.return_value = json.loads(MOCK_NETWORKS_RESPONSE)
+        self.app_client.get('/networks/')
+        self.app_client.get('/networks/?page=2')
+        self.app_client.get('/networks/', headers={'User-Agent': MSIE_USER_AGENT})
+        self.app_client.set_cookie('localhost', 'no-show-banner-message', 'no-show')
+        response = self.app_client.get('/networks/')
+
+        self.assertEqual(network_mock.call_count, 4)
+        self.assertEqual(set(response.vary), {'Accept-Encoding', 'Cookie', 'User-Agent'})
+
+    def test_unused_headers_share_page(self, network_mock):
+        network_mock.return_value = json.loads(MOCK_NETWORKS_RESPONSE)
+        self.app_client.get('/networks/')
+        response = self.app_client.get('/networks/', headers={'Accept': 'application/ld+json'})
+
+        network_mock.assert_called_once()
+        self.assertNotIn('Accept', response.vary)
+
+    def test_errors_not_cached(self, network_mock):
+        network_mock.return_value = {}
+        self.app_client.get('/networks/invalid/')
+        response = self.app_client.get('/networks/invalid/')
+
+        self.assertEqual(network_mock.call_count, 2)
+        self.assertEqual(response.status_code, 404)
+
+
+@mock.patch('waterdata.views.TimeZoneService.get_iana_time_zone', return_value=None)
+@mock.patch('waterdata.views.SiftaService.get', return_value=(200, 'OK', []))
+@mock.patch('waterdata.views.SiteService.get_period_of_record')
+@mock.patch('waterdata.views.SiteService.get_site_data')
+class TestCachedMonitoringLocation(TestCase):
+
+    def setUp(self):
+        self.app_client = app.test_client()
+        self.url = '/monitoring-location/01630500/?agency_cd=USGS'
+
+    def test_banner_cookie(self, site_mock, param_mock, *_):
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.return_value = (200, '', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+        with mock.patch.dict(app.config, {'SET_COOKIE_TO_HIDE_BANNER_NOTICES': True}):
+            for _ in range(2):
+                client = app.test_client()
+                response = client.get(self.url)
+                self.assertNotIn('Set-Cookie', response.headers)
+                etag = response.headers['ETag']
+                client.set_cookie('localhost', 'no-show-banner-message', 'no-show')
+                self.assertNotEqual(client.get(self.url).headers['ETag'], etag)
+                response = app.test_client().get(self.url, headers={'If-None-Match': etag})
+                self.assertEqual(response.status_code, 304)
+
+        # Once for the page with the banner messages and once for the page without them
+        self.assertEqual(site_mock.call_count, 2)
+
+    def test_user_agents_share_page(self, site_mock, param_mock, *_):
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.return_value = (200, '', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+        response = self.app_client.get(self.url)
+        msie_response = self.app_client.get(self.url, headers={'User-Agent': MSIE_USER_AGENT})
+
+        site_mock.assert_called_once()
+        self.assertEqual(msie_response.headers['ETag'], response.headers['ETag'])
+        self.assertEqual(set(msie_response.vary), {'Accept', 'Accept-Encoding', 'Cookie'})
+
+    def test_json_ld(self, site_mock, param_mock, *_):
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.return_value = (200, '', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+        with mock.patch.dict(app.config, {'SET_COOKIE_TO_HIDE_BANNER_NOTICES': True}):
+            html_response = self.app_client.get(self.url)
+            json_ld_response = self.app_client.get(self.url, headers={'Accept': 'application/ld+json'})
+
+        self.assertEqual(site_mock.call_count, 2)
+        self.assertEqual(json_ld_response.mimetype, 'application/ld+json')
+        self.assertNotIn('Set-Cookie', json_ld_response.headers)
+        self.assertNotEqual(html_response.headers['ETag'], json_ld_response.headers['ETag'])
+
+    def test_summary_does_not_vary(self, site_mock, param_mock, *_):
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.return_value = (200, '', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+        url = '/api/v1/monitoring-location/01630500/'
+        self.app_client.get(url)
+        self.app_client.set_cookie('localhost', 'no-show-banner-message', 'no-show')
+        response = self.app_client.get(url, headers={'User-Agent': MSIE_USER_AGENT})
+
+        site_mock.assert_called_once()
+        self.assertEqual(set(response.vary), {'Accept-Encoding'})
+
+    def test_degraded_page_not_cached(self, site_mock, param_mock, *_):
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.side_effect = ValueError('Bad')
+        self.app_client.get(self.url)
+        response = self.app_client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(site_mock.call_count, 2)
+
+    def test_failed_upstream_status_not_cached(self, site_mock, param_mock, cooperators_mock, _):
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.return_value = (503, 'Service Unavailable', [])
+        self.app_client.get(self.url)
+        param_mock.return_value = (200, '', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+        cooperators_mock.return_value = (500, 'Internal Server Error', [])
+        self.app_client.get(self.url)
+        self.app_client.get(self.url)
+
+        self.assertEqual(site_mock.call_count, 3)
+
+    def test_site_without_series_cached(self, site_mock, param_mock, cooperators_mock, _):
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.return_value = (404, 'Not Found', [])
+        cooperators_mock.return_value = (404, 'Not Found', [])
+        self.app_client.get(self.url)
+        self.app_client.get(self.url)
+
+        site_mock.assert_called_once()
+
+
+class TestHideBannerNotices(TestCase):
+
+    def setUp(self):
+        self.app_client = app.test_client()
+
+    def test_sets_cookie(self):
+        with mock.patch.dict(app.config, {'SET_COOKIE_TO_HIDE_BANNER_NOTICES': True}):
+            response = self.app_client.get('/hide-banner-notices/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('no-show-banner-message=no-show', response.headers['Set-Cookie'])
+        self.assertTrue(response.cache_control.no_store)
+
+    def test_disabled(self):
+        with mock.patch.dict(app.config, {'SET_COOKIE_TO_HIDE_BANNER_NOTICES': False}):
+            response = self.app_client.get('/hide-banner-notices/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertNotIn('Set-Cookie', response.headers)
@@ -0,0 +1,91 @@
+"""
+Tests for the prewarm command
+"""
+import json
+import time
+from unittest import TestCase, mock
+
+from .. import app
+from ..commands.prewarm import RateLimiter, prewarm_sites, select_site_nos
+from ..services.cache import MemoryCacheBackend, ServiceCache
+from .mock_test_data import SITE_RDB, PARAMETER_RDB
+from .stub_server import StubRoute, StubServer
+
+
+class TestRateLimiter(TestCase):
+
+    def test_wait(self):
+        limiter = RateLimiter(100)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_no_limit(self):
+        limiter = RateLimiter(None)
+        start = time.monotonic()
+        for _ in range(100):
+            limiter.wait()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+
+class TestPrewarmSites(TestCase):
+
+    def setUp(self):
+        self.routes = {
+            '/nwis/site?format=rdb&sites=01630500%2C01646500&siteOutput': StubRoute(SITE_RDB),
+            '/nwis/site?format=rdb&sites=01630500%2C01646500&seriesCatalogOutput': StubRoute(PARAMETER_RDB),
+            '/nwis/site?format=rdb&stateCd=24': StubRoute(PARAMETER_RDB),
+            '/sifta/': StubRoute('{"Customers": [{"Name": "Cooperator"}]}', content_type='application/json'),
+            '/weather/points/': StubRoute(json.dumps({'properties': {'timeZone': 'America/New_York'}}),
+                                          content_type='application/json')
+        }
+        self.caches = {
+            namespace: ServiceCache(MemoryCacheBackend(), namespace, 60)
+            for namespace in ('site', 'cooperators', 'time_zone')
+        }
+
+    def get_config(self, server):
+        return dict(
+            app.config,
+            SITE_DATA_ENDPOINT=f'{server.url}/nwis/site',
+            COOPERATOR_SERVICE_ENDPOINT=f'{server.url}/sifta/',
+            WEATHER_SERVICE_ENDPOINT=f'{server.url}/weather',
+            TIME_ZONE_ENGINE='weather_service',
+            TIME_ZONE_STORE_PATH=None
+        )
+
+    def test_prewarm_sites(self):
+        progress = mock.Mock()
+        with StubServer(self.routes) as server, \
+                mock.patch('waterdata.commands.prewarm.get_service_cache', self.caches.get):
+            summary = prewarm_sites(self.get_config(server), ['01630500', '01646500'], progress=progress)
+
+        self.assertEqual(summary['sites'], 2)
+        self.assertEqual(summary['found'], 1)
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['failed'], 1)
+        progress.assert_called_once_with(2)
+        self.assertEqual(self.caches['site'].get('siteOutput=expanded&sites=01630500')[2][0]['site_no'],
+                         '01630500')
+        self.assertEqual(len(self.caches['site'].get('seriesCatalogOutput=True&siteStatus=all&sites=01630500')[2]),
+                         8)
+        self.assertEqual(self.caches['cooperators'].get('01630500')[2], [{'Name': 'Cooperator'}])
+        self.assertEqual(self.caches['time_zone'].get('200.94977778,-100.12763889'), 'America/New_York')
+
+    def test_prewarm_sites_in_batches(self):
+        with StubServer(self.routes) as server, \
+                mock.patch('waterdata.commands.prewarm.get_service_cache', self.caches.get):
+            summary = prewarm_sites(self.get_config(server), ['01630500', '01646500'], batch_size=1, workers=1)
+
+        # Neither single site batch matches the stub routes
+        self.assertEqual(summary['found'], 0)
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['failed'], 2)
+
+    def test_select_site_nos(self):
+        with StubServer(self.routes) as server:
+            site_nos = select_site_nos(self.get_config(server), ['01646500', '01630500'], state_cd='24')
+
+        self.assertEqual(site_nos, ['01646500', '01630500'])
+        self.assertEqual(self.routes['/nwis/site?format=rdb&stateCd=24'].call_count, 1)
@@ -0,0 +1,161 @@
+"""
+Tests for the static_pages module
+"""
+import gzip
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from flask import render_template
+
+from .. import app
+from ..static_pages import clear_static_pages, get_snapshot_path, get_static_page_urls, prerender_static_pages, \
+    write_static_pages
+
+
+class TestStaticPages(TestCase):
+
+    def setUp(self):
+        clear_static_pages()
+        self.app_client = app.test_client()
+
+    def tearDown(self):
+        clear_static_pages()
+
+    def test_get_static_page_urls(self):
+        self.assertEqual(set(get_static_page_urls(with_view_args=False)),
+                         {'/', '/provisional-data-statement/', '/iv-data-availability-statement/'})
+
+        urls = get_static_page_urls()
+        self.assertIn('/hydrological-unit/', urls)
+        self.assertIn('/hydrological-unit/01010001/', urls)
+        self.assertIn('/states/', urls)
+        self.assertIn('/states/24/', urls)
+        self.assertIn('/states/24/counties/031/', urls)
+        states = app.config['COUNTRY_STATE_COUNTY_LOOKUP']['US']['state_cd']
+        self.assertEqual(len(urls), 3 + 1 + len(app.config['HUC_LOOKUP']['hucs']) + 1 + len(states) +
+                         sum(len(state.get('county_cd', {})) for state in states.values()))
+
+    def test_prerender(self):
+        self.assertEqual(prerender_static_pages(), 6)
+        with mock.patch('waterdata.views.render_template') as render_mock:
+            response = self.app_client.get('/provisional-data-statement/')
+            self.app_client.set_cookie('localhost', 'no-show-banner-message', 'true')
+            no_banner_response = self.app_client.get('/provisional-data-statement/')
+
+        render_mock.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data, no_banner_response.data)
+        self.assertEqual(set(response.vary), {'Accept-Encoding', 'Cookie'})
+
+    def test_rendered_once(self):
+        with mock.patch('waterdata.views.render_template', return_value='<html></html>') as render_mock:
+            self.app_client.get('/')
+            response = self.app_client.get('/')
+
+        self.assertEqual(render_mock.call_count, 1)
+        self.assertEqual(response.data, b'<html></html>')
+
+    def test_compressed(self):
+        prerender_static_pages(['/'])
+        response = self.app_client.get('/')
+        gzip_response = self.app_client.get('/', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(gzip_response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzip_response.data), response.data)
+        self.assertEqual(gzip_response.get_etag(), (response.get_etag()[0], True))
+
+    def test_request_compression_levels(self):
+        with mock.patch('waterdata.static_pages.compress', return_value=b'compressed') as compress_mock:
+            self.app_client.get('/states/24/')
+
+        compress_mock.assert_called()
+        for call in compress_mock.call_args_list:
+            self.assertIsNone(call.kwargs['level'])
+
+    def test_not_modified(self):
+        etag = self.app_client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+        response = self.app_client.get('/', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_hierarchy_pages(self):
+        with mock.patch('waterdata.views.render_template', wraps=render_template) as render_mock:
+            first_response = self.app_client.get('/states/24/counties/031/')
+            response = self.app_client.get('/states/24/counties/031/')
+
+        self.assertEqual(render_mock.call_count, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, first_response.data)
+        self.assertIn(b'Monitoring Locations', response.data)
+
+    def test_query_parameters_ignored(self):
+        for url in ('/states/24/?page=2', '/states/24/?stream=true', '/hydrological-unit/01010001/?page=5'):
+            clear_static_pages()
+            response = self.app_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, self.app_client.get(url.split('?')[0]).data)
+
+    def test_not_found_not_kept(self):
+        with mock.patch('waterdata.views.render_template', wraps=render_template) as render_mock:
+            self.app_client.get('/hydrological-unit/99/')
+            response = self.app_client.get('/hydrological-unit/99/')
+
+        self.assertEqual(render_mock.call_count, 2)
+        self.assertEqual(response.status_code, 404)
+
+
+class TestSnapshots(TestCase):
+
+    def setUp(self):
+        clear_static_pages()
+        self.app_client = app.test_client()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        clear_static_pages()
+        self.temp_dir.cleanup()
+
+    def test_write_static_pages(self):
+        progress = mock.Mock()
+        written = write_static_pages(self.temp_dir.name, ['/states/24/', '/hydrological-unit/99/'], progress=progress)
+
+        self.assertEqual(written, 2)
+        self.assertEqual(progress.call_count, 2)
+        snapshot_path = os.path.join(self.temp_dir.name, 'states', '24', 'index.html')
+        self.assertEqual(get_snapshot_path(self.temp_dir.name, '/states/24/', False), snapshot_path)
+        with open(snapshot_path, 'rb') as snapshot_file:
+            body = snapshot_file.read()
+        with open(f'{snapshot_path}.gz', 'rb') as snapshot_file:
+            self.assertEqual(gzip.decompress(snapshot_file.read()), body)
+        self.assertTrue(os.path.exists(get_snapshot_path(self.temp_dir.name, '/states/24/', True)))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, 'hydrological-unit')))
+
+    def test_snapshot_compression_levels(self):
+        with mock.patch('waterdata.static_pages.compress', return_value=b'compressed') as compress_mock:
+            write_static_pages(self.temp_dir.name, ['/states/24/'])
+
+        self.assertIn(mock.call(mock.ANY, 'gzip', level=app.config['STATIC_PAGES_GZIP_LEVEL']),
+                      compress_mock.call_args_list)
+
+    def test_read_snapshot(self):
+        snapshot_path = get_snapshot_path(self.temp_dir.name, '/states/24/', False)
+        os.makedirs(os.path.dirname(snapshot_path))
+        with open(snapshot_path, 'wb') as snapshot_file:
+            snapshot_file.write(b'<html>Snapshot</html>')
+
+        with mock.patch.dict(app.config, {'STATIC_PAGES_SNAPSHOT_DIR': self.temp_dir.name}), \
+                mock.patch('waterdata.views.render_template') as render_mock:
+            response = self.app_client.get('/states/24/')
+            gzip_response = self.app_client.get('/states/24/', headers={'Accept-Encoding': 'gzip'})
+
+        render_mock.assert_not_called()
+        self.assertEqual(response.data, b'<html>Snapshot</html>')
+        self.assertEqual(gzip.decompress(gzip_response.data), b'<html>Snapshot</html>')
+
+    def test_missing_snapshot(self):
+        with mock.patch.dict(app.config, {'STATIC_PAGES_SNAPSHOT_DIR': self.temp_dir.name}):
+            response = self.app_client.get('/states/24/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'</html>', response.data)
@@ -0,0 +1,68 @@
+"""
+Tests for the template_cache module
+"""
+import os
+import tempfile
+from unittest import mock
+
+from jinja2 import DictLoader, Environment
+import pytest
+
+from .. import app
+from ..template_cache import TemplateBytecodeCache, compile_templates
+
+TEMPLATES = {
+    'base.html': '<h1>{% block title %}{% endblock %}</h1>',
+    'page.html': '{% extends "base.html" %}{% block title %}{{ name | upper }}{% endblock %}'
+}
+
+
+@pytest.fixture
+def cache_dir():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield os.path.join(temp_dir, 'template_cache')
+
+
+def test_compile_templates(cache_dir):
+    assert compile_templates(Environment(loader=DictLoader(TEMPLATES)), cache_dir) == 2
+    assert len(os.listdir(cache_dir)) == 2
+
+    env = Environment(loader=DictLoader(TEMPLATES), bytecode_cache=TemplateBytecodeCache(cache_dir))
+    with mock.patch.object(env, 'compile') as mock_compile:
+        assert env.get_template('page.html').render(name='site') == '<h1>SITE</h1>'
+    mock_compile.assert_not_called()
+
+
+def test_compile_templates_removes_old_files(cache_dir):
+    compile_templates(Environment(loader=DictLoader(TEMPLATES)), cache_dir)
+    compile_templates(Environment(loader=DictLoader({'base.html': TEMPLATES['base.html']})), cache_dir)
+
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_changed_template_is_compiled(cache_dir):
+    compile_templates(Environment(loader=DictLoader(TEMPLATES)), cache_dir)
+
+    changed = dict(TEMPLATES, **{'base.html': '<h2>{% block title %}{% endblock %}</h2>'})
+    env = Environment(loader=DictLoader(changed), bytecode_cache=TemplateBytecodeCache(cache_dir))
+    assert env.get_template('page.html').render(name='site') == '<h2>SITE</h2>'
+
+
+def test_key_ignores_path(cache_dir):
+    bytecode_cache = TemplateBytecodeCache(cache_dir)
+
+    assert bytecode_cache.get_cache_key('page.html', '/build/templates/page.html') == \
+        bytecode_cache.get_cache_key('page.html', '/site-packages/templates/page.html')
+    assert bytecode_cache.get_cache_key('page.html') != bytecode_cache.get_cache_key('base.html')
+
+
+def test_unwritable_cache_dir(cache_dir):
+    env = Environment(loader=DictLoader(TEMPLATES),
+                      bytecode_cache=TemplateBytecodeCache(os.path.join(cache_dir, 'missing')))
+
+    assert env.get_template('page.html').render(name='site') == '<h1>SITE</h1>'
+
+
+def test_compile_application_templates(cache_dir):
+    assert compile_templates(app.jinja_env, cache_dir) == len(app.jinja_env.list_templates())
+    assert 'monitoring_location.html' in app.jinja_env.list_templates()
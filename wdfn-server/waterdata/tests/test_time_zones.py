@@ -0,0 +1,27 @@
+"""
+Tests for the warm-time-zones command
+"""
+from unittest import TestCase, mock
+
+from ..commands import time_zones
+from ..commands.time_zones import get_site_locations
+
+
+class TestGetSiteLocations(TestCase):
+
+    def setUp(self):
+        self.site_service = mock.Mock()
+
+    def test_failed_chunk_skipped(self):
+        self.site_service.get.side_effect = [
+            (503, 'Service Unavailable', []),
+            (404, 'Not Found', []),
+            (200, 'OK', [{'dec_lat_va': '39.0', 'dec_long_va': '-77.0'}, {'dec_lat_va': '', 'dec_long_va': ''}])
+        ]
+        failed_site_nos = []
+        with mock.patch.object(time_zones, 'SITES_PER_REQUEST', 2):
+            locations = list(get_site_locations(self.site_service, ['1', '2', '3', '4', '5'], failed_site_nos))
+
+        self.assertEqual(locations, [('39.0', '-77.0')])
+        self.assertEqual(failed_site_nos, ['1', '2'])
+        self.assertEqual(self.site_service.get.call_count, 3)
@@ -4,14 +4,12 @@ Unit tests for the main WDFN views.
 
 from unittest import TestCase, mock
 
-from flask import Response
-
 import requests as r
 
 from .. import app
 
-from ..utils import construct_url, defined_when, execute_get_request, parse_rdb, set_cookie_for_banner_message,\
-    create_message
+from ..utils import construct_url, defined_when, execute_get_request, fingerprint, paginate, parse_rdb, \
+    parse_rdb_rows, create_message
 
 
 class TestConstructUrl(TestCase):
@@ -61,25 +59,6 @@ class TestCreateMessage(TestCase):
         self.assertIn('Organization or Address: test organization', actual_str)
 
 
-class TestCookieSetting(TestCase):
-
-    def setUp(self):
-        self.app_client = app.test_client()
-        self.response = Response()
-
-    def test_set_cookie_for_banner_message_true(self):
-        app.config['SET_COOKIE_TO_HIDE_BANNER_NOTICES'] = True
-        with app.test_request_context('/'):
-            set_cookie_for_banner_message(self.response)
-            self.assertIn('no-show-banner-message', self.response.headers.getlist('Set-Cookie')[0])
-
-    def test_set_cookie_for_banner_message_false(self):
-        app.config['SET_COOKIE_TO_HIDE_BANNER_NOTICES'] = False
-        with app.test_request_context('/'):
-            set_cookie_for_banner_message(self.response)
-            self.assertEqual([], self.response.headers.getlist('Set-Cookie'))
-
-
 class TestGetWaterServicesData(TestCase):
 
     def setUp(self):
@@ -107,8 +86,9 @@ class TestGetWaterServicesData(TestCase):
                               'NAD83\t 151.20\t .1\tNAVD88\t02070010\n')
         self.test_bad_resp = 'Garbage Text'
 
-    @mock.patch('waterdata.utils.r.get')
-    def test_success(self, r_mock):
+    @mock.patch('waterdata.utils.get_shared_session')
+    def test_success(self, session_mock):
+        r_mock = session_mock.return_value.get
         m_resp = mock.Mock(r.Response)
         m_resp.text = self.test_rdb_text
         m_resp.reason = 'OK'
@@ -123,8 +103,9 @@ class TestGetWaterServicesData(TestCase):
         self.assertEqual(self.test_rdb_text, result.text)
         self.assertEqual('OK', result.reason)
 
-    @mock.patch('waterdata.utils.r.get')
-    def test_bad_request(self, r_mock):
+    @mock.patch('waterdata.utils.get_shared_session')
+    def test_bad_request(self, session_mock):
+        r_mock = session_mock.return_value.get
         m_resp = mock.Mock(spec=r.Response)
         m_resp.status_code = 400
         m_resp.text = self.test_bad_resp
@@ -139,8 +120,9 @@ class TestGetWaterServicesData(TestCase):
         self.assertEqual(self.test_bad_resp, result.text)
         self.assertEqual('Some Reason', result.reason)
 
-    @mock.patch('waterdata.utils.r.get')
-    def test_no_opt_args(self, r_mock):
+    @mock.patch('waterdata.utils.get_shared_session')
+    def test_no_opt_args(self, session_mock):
+        r_mock = session_mock.return_value.get
         m_resp = mock.Mock(spec=r.Response)
         m_resp.status_code = 200
         r_mock.return_value = m_resp
@@ -149,8 +131,9 @@ class TestGetWaterServicesData(TestCase):
         r_mock.assert_called_with('http://blah.usgs.fake', params=None)
         self.assertEqual(result.status_code, 200)
 
-    @mock.patch('waterdata.utils.r.get')
-    def test_service_timeout(self, r_mock):
+    @mock.patch('waterdata.utils.get_shared_session')
+    def test_service_timeout(self, session_mock):
+        r_mock = session_mock.return_value.get
         r_mock.side_effect = r.exceptions.Timeout
         result = execute_get_request(self.test_url,
                                      path='/nwis/site/',
@@ -161,8 +144,9 @@ class TestGetWaterServicesData(TestCase):
         self.assertIsNone(result.content)
         self.assertEqual(result.text, '')
 
-    @mock.patch('waterdata.utils.r.get')
-    def test_connection_error(self, r_mock):
+    @mock.patch('waterdata.utils.get_shared_session')
+    def test_connection_error(self, session_mock):
+        r_mock = session_mock.return_value.get
         r_mock.side_effect = r.exceptions.ConnectionError
         result = execute_get_request(self.test_url,
                                      path='/nwis/site/',
@@ -290,3 +274,103 @@ class TestParseRdb(TestCase):
         result = parse_rdb(iter(self.test_rdb_lines + ['\n', '\n']))
         result_list = list(result)
         self.assertEqual(len(result_list), 2)
+
+
+class TestParseRdbRows(TestCase):
+
+    def setUp(self):
+        self.test_rdb_lines = [
+            '#',
+            '# US Geological Survey',
+            '#',
+            'agency_cd	site_no	station_nm	dec_lat_va	alt_va	count_nu	begin_date',
+            '5s	15s	50s	16n	8n	5n	20d',
+            'USGS	345670	Some Random Site	38.94977778	 151.20	3754	2007-10-01',
+            'USGS	345671	Some Random Site 1	39.5		12',
+            ''
+        ]
+
+    def test_parse(self):
+        result = list(parse_rdb_rows(iter(self.test_rdb_lines)))
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].site_no, '345670')
+        self.assertEqual(result[0].dec_lat_va, '38.94977778')
+        self.assertEqual(result[0]._asdict(), {
+            'agency_cd': 'USGS',
+            'site_no': '345670',
+            'station_nm': 'Some Random Site',
+            'dec_lat_va': '38.94977778',
+            'alt_va': ' 151.20',
+            'count_nu': '3754',
+            'begin_date': '2007-10-01'
+        })
+        # Missing trailing values are blank
+        self.assertEqual(result[1].begin_date, '')
+
+    def test_rows_share_type(self):
+        result = list(parse_rdb_rows(iter(self.test_rdb_lines)))
+        self.assertIs(type(result[0]), type(result[1]))
+
+    def test_typed(self):
+        result = list(parse_rdb_rows(iter(self.test_rdb_lines), typed=True))
+
+        self.assertEqual(result[0].site_no, '345670')
+        self.assertEqual(result[0].dec_lat_va, 38.94977778)
+        self.assertEqual(result[0].alt_va, 151.2)
+        self.assertEqual(result[0].count_nu, 3754)
+        self.assertEqual(result[0].begin_date, '2007-10-01')
+        self.assertIsNone(result[1].alt_va)
+        self.assertEqual(result[1].count_nu, 12)
+
+    def test_same_values_as_parse_rdb(self):
+        rows = parse_rdb_rows(iter(self.test_rdb_lines))
+        dicts = parse_rdb(iter(self.test_rdb_lines))
+
+        self.assertEqual(next(rows)._asdict(), next(dicts))
+
+    def test_lazy(self):
+        lines = iter(self.test_rdb_lines)
+        rows = parse_rdb_rows(lines)
+        next(rows)
+
+        self.assertEqual(next(lines).split('\t')[1], '345671')
+
+    def test_invalid_column_names(self):
+        result = next(parse_rdb_rows(iter(['site_no	2nd	class', '15s	5s	5s', '01630500	b	c'])))
+
+        self.assertEqual(result, ('01630500', 'b', 'c'))
+        self.assertEqual(result.site_no, '01630500')
+
+    def test_no_data(self):
+        with self.assertRaises(Exception):
+            next(parse_rdb_rows(iter([])))
+
+
+class TestPaginate(TestCase):
+
+    def setUp(self):
+        self.rows = [5, 3, 8, 1, 9, 2, 7]
+
+    def test_first_page(self):
+        self.assertEqual(paginate(iter(self.rows), 1, 3), ([5, 3, 8], 7))
+
+    def test_last_page(self):
+        self.assertEqual(paginate(iter(self.rows), 3, 3), ([7], 7))
+
+    def test_past_last_page(self):
+        self.assertEqual(paginate(iter(self.rows), 4, 3), ([], 7))
+
+    def test_empty(self):
+        self.assertEqual(paginate(iter([]), 1, 3), ([], 0))
+
+
+class TestFingerprint(TestCase):
+
+    def test_equal_values(self):
+        self.assertEqual(fingerprint({'site_no': '01'}, [1, 2]), fingerprint({'site_no': '01'}, [1, 2]))
+
+    def test_changed_values(self):
+        self.assertNotEqual(fingerprint({'site_no': '01'}), fingerprint({'site_no': '02'}))
+        self.assertNotEqual(fingerprint([1, 2]), fingerprint([2, 1]))
+        self.assertEqual(len(fingerprint(None)), 32)
@@ -2,6 +2,7 @@
 Unit tests for the main WDFN views.
 """
 
+import gzip
 import json
 import re
 from unittest import TestCase, mock
@@ -9,12 +10,33 @@ from unittest import TestCase, mock
 import pytest
 import requests_mock
 
-from .. import app
+from .. import app, views
 from ..views import __version__, has_feedback_link
 from ..utils import parse_rdb
 from .mock_test_data import SITE_RDB, PARAMETER_RDB, MOCK_NETWORKS_RESPONSE, MOCK_NETWORK_RESPONSE
 
 
+class TestCreateTimeZoneService(TestCase):
+    def setUp(self):
+        self.config = dict(app.config, TIME_ZONE_ENGINE='boundaries', TIME_ZONE_STORE_PATH=None)
+
+    def test_boundaries(self):
+        with mock.patch('waterdata.views.TimeZoneBoundaryResolver.from_file') as from_file_mock:
+            self.config['TIME_ZONE_BOUNDARY_FILE'] = 'boundaries.json'
+            self.assertIs(views.create_time_zone_service(self.config), from_file_mock.return_value)
+        from_file_mock.assert_called_once_with('boundaries.json')
+
+    def test_no_boundary_file(self):
+        self.config['TIME_ZONE_BOUNDARY_FILE'] = None
+        with self.assertLogs(app.logger, 'ERROR'):
+            self.assertIsInstance(views.create_time_zone_service(self.config), views.TimeZoneService)
+
+    def test_missing_boundary_file(self):
+        self.config['TIME_ZONE_BOUNDARY_FILE'] = '/no/such/boundaries.json'
+        with self.assertLogs(app.logger, 'ERROR'):
+            self.assertIsInstance(views.create_time_zone_service(self.config), views.TimeZoneService)
+
+
 class TestHasFeedbackLink(TestCase):
     def setUp(self):
         self.app_client = app.test_client()
@@ -168,6 +190,44 @@ class TestMonitoringLocationView(TestCase):
         site_mock.assert_called_with(self.test_site_number, 'USGS')
         self.assertEqual(response.status_code, 503)
 
+    @mock.patch.dict(app.config, {'PAGE_CACHE_MAX_ENTRIES': 0})
+    @mock.patch('waterdata.views.TimeZoneService.get_iana_time_zone')
+    @mock.patch('waterdata.views.SiftaService.get')
+    @mock.patch('waterdata.views.SiteService.get_period_of_record')
+    @mock.patch('waterdata.views.SiteService.get_site_data')
+    def test_site_page_model_cache(self, site_mock, param_mock, cooperators_mock, time_zone_mock):
+        # pylint: disable=R0913
+        site_mock.return_value = (200, '', list(parse_rdb(iter(SITE_RDB.split('\n')))))
+        param_mock.return_value = (200, '', list(parse_rdb(iter(PARAMETER_RDB.split('\n')))))
+        cooperators_mock.return_value = (200, 'OK', [])
+        time_zone_mock.return_value = None
+        views.site_page_model_cache.backend.clear()
+        url = f'/monitoring-location/{self.test_site_number}/?agency_cd=USGS'
+
+        with mock.patch('waterdata.views.build_site_page_model', wraps=views.build_site_page_model) as build_mock:
+            self.assertEqual(self.app_client.get(url).status_code, 200)
+            self.assertEqual(self.app_client.get(url).status_code, 200)
+            self.assertEqual(build_mock.call_count, 1)
+
+            # A changed period of record is a different model
+            period_of_record = list(parse_rdb(iter(PARAMETER_RDB.split('\n'))))
+            period_of_record[0]['end_date'] = '2019-01-10'
+            param_mock.return_value = (200, '', period_of_record)
+            self.app_client.get(url)
+            self.assertEqual(build_mock.call_count, 2)
+
+        self.assertEqual(len(views.site_page_model_cache.backend), 2)
+
+    def test_metrics(self):
+        views.site_page_model_cache.hits = 3
+        with app.test_request_context('/metrics/'):
+            metrics = json.loads(views.metrics.__wrapped__().data)
+
+        self.assertEqual(metrics['caches']['site_page_model']['hits'], 3)
+        self.assertIn('site_page_model', metrics['cache_backends'])
+        self.assertEqual(set(metrics['cache_backends']['site_page_model']), {'entries', 'bytes', 'evictions'})
+        self.assertIsInstance(metrics['http_pools'], dict)
+
 
 class TestHydrologicalUnitView:
     # pylint: disable=R0201
@@ -201,6 +261,70 @@ class TestHydrologicalUnitView:
         assert text.count('01630500') == 16, 'Expected site 01630500 in output'
 
 
+SITE_LIST_RDB = """#
+agency_cd	site_no	station_nm	site_tp_cd
+5s	15s	50s	7s
+USGS	01630500	POTOMAC RIVER	ST
+USGS	01646500	POTOMAC RIVER NEAR WASH	ST
+USGS	01594440	PATUXENT RIVER	ST
+USGS	01585200	WEST BRANCH HERRING RUN	ST
+USGS	01589330	DEAD RUN	ST
+"""
+
+
+class TestMonitoringLocationListPages:
+    # pylint: disable=R0201
+
+    @pytest.fixture(autouse=True)
+    def mock_site_call(self):
+        """Return the same mock site list for each call to the site service"""
+        with requests_mock.mock() as req:
+            url = re.compile('{host}.*'.format(host=app.config['SITE_DATA_ENDPOINT']))
+            req.get(url, text=SITE_LIST_RDB)
+            yield
+
+    @staticmethod
+    def site_numbers(response):
+        return re.findall(r'>(\d{8})</a></th>', response.data.decode('utf-8'))
+
+    def test_page(self, client):
+        response = client.get('/hydrological-unit/01010001/monitoring-locations/?page_size=2&page=2')
+        assert response.status_code == 200
+        assert self.site_numbers(response) == ['01594440', '01585200']
+        text = response.data.decode('utf-8')
+        assert 'Showing 3 to 4 of 5 monitoring locations' in text
+        assert 'page=1' in text
+        assert 'page=3' in text
+
+    def test_sort(self, client):
+        response = client.get('/states/24/counties/031/monitoring-locations/?page_size=3&sort=site_no')
+        assert self.site_numbers(response) == ['01585200', '01589330', '01594440']
+
+    def test_sort_descending(self, client):
+        response = client.get('/states/24/counties/031/monitoring-locations/?page_size=3&sort=-site_no')
+        assert self.site_numbers(response) == ['01646500', '01630500', '01594440']
+
+    def test_invalid_sort_column(self, client):
+        response = client.get('/hydrological-unit/01010001/monitoring-locations/?page_size=2&sort=huc_cd')
+        assert self.site_numbers(response) == ['01630500', '01646500']
+
+    def test_page_past_last(self, client):
+        response = client.get('/hydrological-unit/01010001/monitoring-locations/?page_size=2&page=4')
+        assert response.status_code == 404
+
+    def test_page_past_max_page(self, client):
+        max_page = app.config['MONITORING_LOCATIONS_MAX_PAGE']
+        response = client.get(f'/states/24/counties/031/monitoring-locations/?page={max_page + 1}&sort=site_no')
+        assert response.status_code == 404
+
+    def test_stream(self, client):
+        response = client.get('/hydrological-unit/01010001/monitoring-locations/?stream=true')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert self.site_numbers(response) == ['01630500', '01646500', '01594440', '01585200', '01589330']
+        assert 'Showing' not in response.data.decode('utf-8')
+
+
 class TestNetworkView(TestCase):
     # pylint: disable=R0902
 
@@ -274,3 +398,144 @@ class TestTimeSeriesComponentView:
         assert response.status_code == 200
         text = response.data.decode('utf-8')
         assert text.count('class="wdfn-component" data-component="hydrograph"') == 1, 'Component expected'
+
+
+class TestSitesApiView:
+    # pylint: disable=R0201
+
+    @pytest.fixture(autouse=True)
+    def mock_site_calls(self):
+        """Return the site for site data requests and its data series for period of record requests"""
+        with requests_mock.mock() as req:
+            url = re.compile('{host}.*'.format(host=app.config['SITE_DATA_ENDPOINT']))
+            req.get(url, text=SITE_RDB)
+            req.get(re.compile('.*seriesCatalogOutput.*'), text=PARAMETER_RDB)
+            yield req
+
+    def test_sites(self, client, mock_site_calls):
+        response = client.get('/api/sites/?site_no=01630500,01646500&site_no=05427718')
+        assert response.status_code == 200
+        result = response.get_json()
+        assert list(result['sites']) == ['01630500']
+        assert result['sites']['01630500']['site_data'][0]['station_nm'] == 'Some Random Site'
+        assert 'period_of_record' not in result['sites']['01630500']
+        assert result['not_found'] == ['01646500', '05427718']
+        assert result['failed'] == []
+        assert mock_site_calls.call_count == 1
+        assert 'sites=01630500%2c01646500%2c05427718' in mock_site_calls.request_history[0].query
+
+    def test_sites_with_period_of_record(self, client):
+        response = client.get('/api/sites/?site_no=01630500&period_of_record=true')
+        assert response.status_code == 200
+        assert len(response.get_json()['sites']['01630500']['period_of_record']) == 8
+
+    def test_sites_in_chunks(self, client, mock_site_calls):
+        with mock.patch.dict(app.config, {'SITE_SERVICE_BATCH_SIZE': 2}):
+            response = client.get('/api/sites/?site_no=01630500,01646500,05427718')
+        assert response.status_code == 200
+        assert list(response.get_json()['sites']) == ['01630500']
+        assert mock_site_calls.call_count == 2
+
+    def test_no_sites(self, client):
+        assert client.get('/api/sites/').status_code == 400
+
+    def test_too_many_sites(self, client):
+        with mock.patch.dict(app.config, {'SITES_API_MAX_SITES': 2}):
+            response = client.get('/api/sites/?site_no=01630500,01646500,05427718')
+        assert response.status_code == 400
+
+    def test_service_failure(self, client, mock_site_calls):
+        mock_site_calls.get(re.compile('{host}.*'.format(host=app.config['SITE_DATA_ENDPOINT'])), status_code=500)
+        response = client.get('/api/sites/?site_no=01630500')
+        assert response.status_code == 503
+        assert response.get_json()['failed'] == ['01630500']
+        assert response.headers['Surrogate-Control'] == 'no-store'
+
+    def test_partial_failure_not_cached(self, client, mock_site_calls):
+        mock_site_calls.get(re.compile('.*sites=05427718.*'), status_code=500)
+        with mock.patch.dict(app.config, {'SITE_SERVICE_BATCH_SIZE': 2}):
+            response = client.get('/api/sites/?site_no=01630500,01646500,05427718')
+        assert response.status_code == 200
+        assert response.get_json()['failed'] == ['05427718']
+        assert response.cache_control.no_store
+        assert response.headers['Surrogate-Control'] == 'no-store'
+
+
+class TestMonitoringLocationSummaryView:
+    # pylint: disable=R0201
+
+    @pytest.fixture(autouse=True)
+    def mock_site_calls(self):
+        """Return the site for site data requests and its data series for period of record requests"""
+        with requests_mock.mock() as req:
+            req.get(re.compile('{host}.*'.format(host=app.config['SITE_DATA_ENDPOINT'])), text=SITE_RDB)
+            req.get(re.compile('.*seriesCatalogOutput.*'), text=PARAMETER_RDB)
+            yield req
+
+    def test_summary(self, client):
+        response = client.get('/api/v1/monitoring-location/01630500/')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        summary = response.get_json()
+        assert summary['site_no'] == '01630500'
+        assert summary['available_data_types'] == ['uv']
+        assert summary['default_parameter_code'] == '00065'
+        assert summary['iv_period_of_record']['00060'] == {'begin_date': '1972-06-09', 'end_date': '2018-01-10'}
+        assert summary['parm_grp_summary'][0]['start_date'] == '1972-06-09'
+        assert summary['parm_grp_summary'][0]['end_date'] == '2018-01-10'
+        assert response.headers['Cache-Control'] == 'public, max-age=60'
+        assert 'site-01630500' in response.headers['Surrogate-Key']
+
+    def test_rejected_request_not_cached(self, client, mock_site_calls):
+        mock_site_calls.get(re.compile('{host}.*'.format(host=app.config['SITE_DATA_ENDPOINT'])), status_code=429)
+        response = client.get('/api/v1/monitoring-location/01630500/')
+        assert response.status_code == 404
+        assert response.cache_control.no_store
+        assert response.headers['Surrogate-Control'] == 'no-store'
+
+    def test_period_of_record_failure_not_cached(self, client, mock_site_calls):
+        mock_site_calls.get(re.compile('.*seriesCatalogOutput.*'), status_code=500)
+        response = client.get('/api/v1/monitoring-location/01630500/')
+        assert response.status_code == 503
+        assert response.headers['Surrogate-Control'] == 'no-store'
+
+    def test_not_modified(self, client):
+        etag = client.get('/api/v1/monitoring-location/01630500/').headers['ETag']
+        response = client.get('/api/v1/monitoring-location/01630500/', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+    def test_gzip(self, client):
+        response = client.get('/api/v1/monitoring-location/01630500/', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.data))['site_no'] == '01630500'
+
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+        response = client.get('/api/v1/monitoring-location/01630500/',
+                              headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
+
+    def test_site_not_found(self, client, mock_site_calls):
+        mock_site_calls.get(re.compile('{host}.*'.format(host=app.config['SITE_DATA_ENDPOINT'])),
+                            status_code=404, reason='Not Found')
+        response = client.get('/api/v1/monitoring-location/01630500/')
+        assert response.status_code == 404
+        assert response.get_json() == {'error': 'Not Found'}
+        assert response.headers['Cache-Control'] == 'public, max-age=60'
+
+    def test_site_without_series(self, client, mock_site_calls):
+        mock_site_calls.get(re.compile('.*seriesCatalogOutput.*'), status_code=404, reason='Not Found')
+        response = client.get('/api/v1/monitoring-location/01630500/')
+        assert response.status_code == 200
+        summary = response.get_json()
+        assert summary['site_no'] == '01630500'
+        assert summary['available_data_types'] == []
+        assert summary['iv_period_of_record'] == {}
+        assert summary['parm_grp_summary'] == []
+
+    def test_period_of_record_failure(self, client, mock_site_calls):
+        mock_site_calls.get(re.compile('.*seriesCatalogOutput.*'), status_code=503)
+        response = client.get('/api/v1/monitoring-location/01630500/')
+        assert response.status_code == 503
+        assert response.headers['Surrogate-Control'] == 'no-store'
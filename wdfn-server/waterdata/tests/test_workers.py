@@ -0,0 +1,105 @@
+"""
+Tests for the workers module
+"""
+import gc
+import os
+import sys
+import threading
+from unittest import TestCase, mock
+
+from .. import fan_out, views, workers
+
+
+class TestPostFork(TestCase):
+
+    def test_hooks_run_in_order(self):
+        calls = []
+        with mock.patch.object(workers, '_post_fork_hooks', []):
+            first = workers.post_fork(lambda: calls.append('first'))
+            workers.post_fork(lambda: calls.append('second'))
+            workers.init_worker()
+
+        self.assertEqual(calls, ['first', 'second'])
+        self.assertTrue(callable(first))
+
+    def test_application_hooks(self):
+        executor = fan_out.get_executor()
+        session = views.site_service.session
+
+        workers.init_worker()
+
+        self.assertIsNot(fan_out.get_executor(), executor)
+        self.assertIsNot(views.site_service.session, session)
+        self.assertIsNot(views.sifta_service.session, session)
+        executor.shutdown(wait=False)
+
+
+class TestPrepareFork(TestCase):
+
+    def tearDown(self):
+        gc.unfreeze()
+
+    def test_prepare_fork(self):
+        frozen = workers.prepare_fork()
+
+        self.assertGreater(frozen, 0)
+        self.assertEqual(gc.get_freeze_count(), frozen)
+        self.assertTrue(gc.isenabled())
+
+    def test_forked_worker(self):
+        workers.prepare_fork()
+        pid = os.fork()
+        if pid == 0:
+            # pylint: disable=W0212
+            os._exit(0 if gc.get_freeze_count() > 0 else 1)
+        _, status = os.waitpid(pid, 0)
+
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+
+
+class TestIsCooperative(TestCase):
+
+    @mock.patch.dict(sys.modules)
+    def test_without_gevent(self):
+        sys.modules.pop('gevent.monkey', None)
+        self.assertFalse(workers.is_cooperative())
+
+    def test_patched(self):
+        monkey = mock.Mock()
+        with mock.patch.dict(sys.modules, {'gevent.monkey': monkey}):
+            monkey.is_module_patched.return_value = False
+            self.assertFalse(workers.is_cooperative())
+            monkey.is_module_patched.return_value = True
+            self.assertTrue(workers.is_cooperative())
+        monkey.is_module_patched.assert_called_with('threading')
+
+
+class TestWorkerLocal(TestCase):
+
+    def setUp(self):
+        self.worker_local = workers.WorkerLocal(object)
+
+    def get_in_thread(self):
+        values = []
+        thread = threading.Thread(target=lambda: values.append(self.worker_local.get()))
+        thread.start()
+        thread.join()
+        return values[0]
+
+    def test_per_thread(self):
+        with mock.patch('waterdata.workers.is_cooperative', return_value=False):
+            value = self.worker_local.get()
+            self.assertIs(self.worker_local.get(), value)
+            self.assertIsNot(self.get_in_thread(), value)
+
+    def test_per_process_when_cooperative(self):
+        with mock.patch('waterdata.workers.is_cooperative', return_value=True):
+            value = self.worker_local.get()
+            self.assertIs(self.get_in_thread(), value)
+
+    def test_new_after_fork(self):
+        for cooperative in (False, True):
+            with mock.patch('waterdata.workers.is_cooperative', return_value=cooperative):
+                value = self.worker_local.get()
+                with mock.patch('os.getpid', return_value=os.getpid() + 1):
+                    self.assertIsNot(self.worker_local.get(), value)
@@ -2,14 +2,17 @@
 Utility functions
 
 """
-from flask import request
-from functools import update_wrapper
+from collections import namedtuple
+import hashlib
+import json
+from functools import lru_cache, update_wrapper
 from urllib.parse import urlencode, urljoin
 from email.message import EmailMessage
 
 import requests as r
 
 from . import app
+from .http_client import get_shared_session
 
 
 def execute_get_request(hostname, path=None, params=None):
@@ -27,7 +30,7 @@ def execute_get_request(hostname, path=None, params=None):
     target = urljoin(hostname, path)
     try:
         app.logger.debug(f'Requesting data from {target}')
-        resp = r.get(target, params=params)
+        resp = get_shared_session().get(target, params=params)
     except (r.exceptions.Timeout, r.exceptions.ConnectionError) as err:
         app.logger.error(repr(err))
         resp = r.Response()  # return an empty response object
@@ -83,16 +86,22 @@ def construct_url(netloc, path, parameters=()):
     return urljoin(netloc, '{0}?{1}'.format(path, encoded_parameters))
 
 
-def set_cookie_for_banner_message(full_function_response_object):
+def _read_rdb_header(rdb_iter_lines):
     """
-    Checks if a cookie is desired and has not been set. If so it will set a cooke that will turn off
-    the special banner messages, such as the one for pandemics
-    :param full_function_response_object: standard HTTP response object
+    Read lines up to and including the column format line of an RDB file.
+
+    :param iterator rdb_iter_lines: iterator containing lines from an RDB file
+    :return: column names and column formats
+    :rtype: tuple of lists
     """
-    if app.config['SET_COOKIE_TO_HIDE_BANNER_NOTICES']:
-        previously_set_cookie = request.cookies.get('no-show-banner-message')
-        if previously_set_cookie is None:
-            full_function_response_object.set_cookie('no-show-banner-message', 'no-show', max_age=60*60*24*30)
+    for line in rdb_iter_lines:
+        if line and line[0] != '#':
+            headers = line.split('\t')
+            break
+    else:
+        raise Exception('RDB column headers not found.')
+    formats = next(rdb_iter_lines, '').split('\t')
+    return headers, formats
 
 
 def parse_rdb(rdb_iter_lines):
@@ -103,19 +112,7 @@ def parse_rdb(rdb_iter_lines):
     :rtype: Iterator
 
     """
-    found_header = False
-    headers = []
-    while not found_header:
-        try:
-            line = next(rdb_iter_lines)
-        except StopIteration:
-            raise Exception('RDB column headers not found.')
-        else:
-            if line and line[0] != '#':
-                headers = line.split('\t')
-                found_header = True
-    # skip the next line in the RDB file
-    next(rdb_iter_lines)
+    headers, _ = _read_rdb_header(rdb_iter_lines)
     for record in rdb_iter_lines:
         # Ignore empty lines
         if not record.strip():
@@ -124,6 +121,107 @@ def parse_rdb(rdb_iter_lines):
         yield dict(zip(headers, record_values))
 
 
+def _rdb_number(value):
+    """
+    Convert a value from a numeric RDB column to an int or float. Blank values are None.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value) if '.' in value or 'e' in value or 'E' in value else int(value)
+    except ValueError:
+        return value
+
+
+def _rdb_converter(column_format):
+    """
+    Return the function used to convert values in a column with column_format (for example 5s or 16n).
+    String and date columns are left as strings.
+    """
+    return _rdb_number if column_format.strip().endswith('n') else None
+
+
+@lru_cache(maxsize=32)
+def rdb_row_type(headers):
+    """
+    Return the named tuple class used for rows with headers. Column names which are not valid Python
+    identifiers are renamed to _<column index>.
+
+    :param tuple headers: column names
+    :rtype: type
+    """
+    return namedtuple('RdbRow', headers, rename=True)
+
+
+def parse_rdb_rows(rdb_iter_lines, typed=False):
+    """
+    Parse records in an RDB file into named tuples. The column names are kept once in the named tuple
+    class rather than in every record, so rows take much less memory than the dictionaries returned
+    by parse_rdb. Values are read as the records are consumed so large files can be processed lazily.
+    Records with missing trailing values are padded with empty strings and extra values are dropped.
+
+    :param iterator rdb_iter_lines: iterator containing lines from an RDB file
+    :param bool typed: if True, values in numeric (n) columns are converted to int or float and blank
+        numeric values to None. Other columns are left as strings.
+    :rtype: Iterator of named tuples
+    """
+    headers, formats = _read_rdb_header(rdb_iter_lines)
+    row_type = rdb_row_type(tuple(headers))
+    make_row = row_type._make
+    column_count = len(headers)
+    converters = []
+    if typed:
+        converters = [(index, converter) for index, converter in
+                      enumerate(_rdb_converter(column_format) for column_format in formats[:column_count])
+                      if converter is not None]
+
+    for record in rdb_iter_lines:
+        # Ignore empty lines
+        if not record or record.isspace():
+            continue
+        values = record.split('\t')
+        if len(values) != column_count:
+            values = (values + [''] * column_count)[:column_count]
+        for index, converter in converters:
+            values[index] = converter(values[index])
+        yield make_row(values)
+
+
+def paginate(rows, page, page_size):
+    """
+    Return one page of rows in their original order, while only keeping at most page_size rows in memory.
+
+    :param iterable rows:
+    :param int page: page number starting at 1
+    :param int page_size: number of rows on a page
+    :return: the rows on the page and the total number of rows
+    :rtype: tuple of (list, int)
+    """
+    start = (page - 1) * page_size
+    stop = start + page_size
+    total = 0
+    page_rows = []
+    for total, row in enumerate(rows, start=1):
+        if start < total <= stop:
+            page_rows.append(row)
+    return page_rows, total
+
+
+def fingerprint(*values):
+    """
+    Return a digest of values which changes when any of them changes. Dictionaries are serialized in
+    their own order, so equal dictionaries built in a different order may have different fingerprints.
+
+    :param values: JSON serializable values
+    :rtype: str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        digest.update(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+    return digest.hexdigest()
+
+
 def defined_when(condition, fallback):
     """
     Decorator that fallsback to a specified function if `condition` is False.
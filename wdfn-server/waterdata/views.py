@@ -2,31 +2,100 @@
 Main application views.
 """
 import datetime
+import itertools
 import json
+from functools import partial
+import os
 import smtplib
 
-from flask import abort, render_template, redirect, request, Markup, make_response, url_for
+from flask import abort, render_template, redirect, request, Markup, url_for, Response, \
+    stream_with_context, jsonify
 
 from markdown import markdown
-
-from . import app, __version__
+from . import app, lookup_store, __version__
 from .location_utils import build_linked_data, get_disambiguated_values, rollup_dataseries, \
-    get_period_of_record_by_parm_cd, get_default_parameter_code
-from .utils import defined_when, set_cookie_for_banner_message, create_message
+    get_periods_of_record, get_default_parameter_code, LookupIndexes
+from .fan_out import create_fan_out, get_executor
+from .http_client import create_session, get_http_client_stats
+from .page_cache import cached_page, skip_page_cache
+from .static_pages import static_page
+from .utils import defined_when, create_message, paginate, fingerprint
+from .services.cache import get_service_cache, get_memory_cache, get_cache_stats, get_cache_backend_stats
 from .services.camera import get_monitoring_location_camera_details
 from .services.nwissite import SiteService
 from .services.ogc import MonitoringLocationNetworkService
 from .services.sifta import SiftaService
-from .services.timezone import TimeZoneService
+from .services.timezone import TimeZoneService, TimeZoneStore
+from .services.timezone_boundaries import TimeZoneBoundaryResolver
+from .workers import post_fork
 
 # Station Fields Mapping to Descriptions
 from .constants import STATION_FIELDS_D
 
-site_service = SiteService(app.config['SITE_DATA_ENDPOINT'])
+site_service = SiteService(app.config['SITE_DATA_ENDPOINT'], cache=get_service_cache('site'))
 monitoring_location_network_service = \
-    MonitoringLocationNetworkService(app.config['MONITORING_LOCATIONS_OBSERVATIONS_ENDPOINT'])
-time_zone_service = TimeZoneService(app.config['WEATHER_SERVICE_ENDPOINT'])
-sifta_service = SiftaService(app.config['COOPERATOR_SERVICE_ENDPOINT'])
+    MonitoringLocationNetworkService(app.config['MONITORING_LOCATIONS_OBSERVATIONS_ENDPOINT'],
+                                     cache=get_service_cache('networks'))
+
+
+def create_time_zone_service(config):
+    """
+    Return the time zone service of the TIME_ZONE_ENGINE in config. The weather service is used when the
+    boundaries engine has no TIME_ZONE_BOUNDARY_FILE or the file can not be loaded.
+
+    :param dict config:
+    :rtype: TimeZoneBoundaryResolver or TimeZoneService
+    """
+    if config['TIME_ZONE_ENGINE'] == 'boundaries':
+        if not config['TIME_ZONE_BOUNDARY_FILE']:
+            app.logger.error('TIME_ZONE_BOUNDARY_FILE is not set, using the weather service for time zones')
+        else:
+            try:
+                return TimeZoneBoundaryResolver.from_file(config['TIME_ZONE_BOUNDARY_FILE'])
+            except (OSError, ValueError, KeyError) as err:
+                app.logger.error(f'Unable to load {config["TIME_ZONE_BOUNDARY_FILE"]}, '
+                                 f'using the weather service for time zones: {err!r}')
+    return TimeZoneService(
+        config['WEATHER_SERVICE_ENDPOINT'],
+        cache=get_service_cache('time_zone'),
+        store=TimeZoneStore(config['TIME_ZONE_STORE_PATH'], precision=config['TIME_ZONE_STORE_PRECISION'])
+        if config['TIME_ZONE_STORE_PATH'] else None
+    )
+
+
+time_zone_service = create_time_zone_service(app.config)
+sifta_service = SiftaService(app.config['COOPERATOR_SERVICE_ENDPOINT'], cache=get_service_cache('cooperators'))
+
+# Indexes used to disambiguate the codes in site data and in its period of record. The series in the period
+# of record are not disambiguated by country, state and county. The lookup store has the indexes compiled in.
+if lookup_store is not None and lookup_store.has_indexes():
+    site_lookup_indexes = LookupIndexes.from_store(lookup_store)
+else:
+    site_lookup_indexes = LookupIndexes(
+        app.config['NWIS_CODE_LOOKUP'],
+        app.config['COUNTRY_STATE_COUNTY_LOOKUP'],
+        app.config['HUC_LOOKUP']
+    )
+series_lookup_indexes = site_lookup_indexes.without_political_units()
+
+site_page_model_cache = get_memory_cache(
+    'site_page_model',
+    app.config['SITE_PAGE_MODEL_CACHE_TTL'],
+    max_entries=app.config['SITE_PAGE_MODEL_CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['SITE_PAGE_MODEL_CACHE_MAX_BYTES']
+) if app.config['SITE_PAGE_MODEL_CACHE_MAX_ENTRIES'] else None
+
+
+@post_fork
+def create_service_sessions():
+    """
+    Give each worker its own HTTP sessions so that connection pools are never shared with the master
+    process or other workers.
+    """
+    for service in (site_service, monitoring_location_network_service, time_zone_service, sifta_service):
+        if hasattr(service, 'session'):
+            service.session = create_session()
+
 
 def has_feedback_link():
     """
@@ -45,6 +114,7 @@ def inject_has_feedback_link():
 
 
 @app.route('/')
+@static_page()
 def home():
     """Render the home page."""
     return render_template('index.html', version=__version__)
@@ -94,18 +164,95 @@ def feedback_submitted(email_send_result):
 
 
 @app.route('/provisional-data-statement/')
+@static_page()
 def provisional_data_statement():
     """Render the provisional data statement page."""
     return render_template('provisional_data_statement.html')
 
 
 @app.route('/iv-data-availability-statement/')
+@static_page()
 def iv_data_availability():
     """Render the IV data availability statement page."""
     return render_template('iv_data_availability_statement.html')
 
 
+def build_site_page_model(site_no, unique_site, period_of_record):
+    """
+    Derive the data shown on a monitoring location page from the site and its period of record.
+
+    :param str site_no: USGS site number
+    :param dict unique_site: site data
+    :param list period_of_record: period of record (dict) of each data series at the site
+    :rtype: dict
+    """
+    periods_of_record = get_periods_of_record(period_of_record, ('uv', 'gw'))
+    iv_period_of_record = periods_of_record.get('uv', {})
+    gw_period_of_record = periods_of_record.get('gw', {}) if app.config['GROUNDWATER_LEVELS_ENABLED'] else {}
+    site_dataseries = [
+        get_disambiguated_values(param_datum, series_lookup_indexes)
+        for param_datum in period_of_record
+    ]
+    available_parameter_codes = set(param_datum['parm_cd'] for param_datum in period_of_record)
+
+    location_with_values = get_disambiguated_values(unique_site, site_lookup_indexes)
+    try:
+        site_owner_state = (
+            location_with_values['district_cd']['abbreviation']
+            if location_with_values['district_cd']['abbreviation']
+            else location_with_values['state_cd']['abbreviation']
+        )
+    except KeyError:
+        site_owner_state = None
+
+    if site_owner_state is not None:
+        email_for_data_questions = \
+            app.config['EMAIL_TARGET']['contact'].format(state_district_code=site_owner_state.lower())
+    else:
+        email_for_data_questions = app.config['EMAIL_TARGET']['report']
+
+    return {
+        'location_with_values': location_with_values,
+        'json_ld': build_linked_data(
+            site_no,
+            unique_site.get('station_nm'),
+            unique_site.get('agency_cd'),
+            unique_site.get('dec_lat_va', ''),
+            unique_site.get('dec_long_va', ''),
+            available_parameter_codes
+        ),
+        'available_data_types': set(param_datum['data_type_cd'] for param_datum in period_of_record),
+        'iv_period_of_record': iv_period_of_record,
+        'gw_period_of_record': gw_period_of_record,
+        'default_parameter_code': get_default_parameter_code(iv_period_of_record, gw_period_of_record),
+        'parm_grp_summary': rollup_dataseries(site_dataseries),
+        'email_for_data_questions': email_for_data_questions
+    }
+
+
+def get_site_page_model(site_no, agency_cd, unique_site, period_of_record):
+    """
+    Return the monitoring location page data for the site, from the cache if the site and period of
+    record data are unchanged since it was built.
+
+    :param str site_no: USGS site number
+    :param str agency_cd: agency code requested
+    :param dict unique_site: site data
+    :param list period_of_record: period of record (dict) of each data series at the site
+    :rtype: dict
+    """
+    if site_page_model_cache is None:
+        return build_site_page_model(site_no, unique_site, period_of_record)
+    cache_key = f'{agency_cd}:{site_no}:{fingerprint(unique_site, period_of_record)}'
+    site_page_model = site_page_model_cache.get(cache_key)
+    if site_page_model is None:
+        site_page_model = build_site_page_model(site_no, unique_site, period_of_record)
+        site_page_model_cache.set(cache_key, site_page_model)
+    return site_page_model
+
+
 @app.route('/monitoring-location/<site_no>/', methods=['GET'])
+@cached_page(vary=('Accept', 'Cookie'))
 def monitoring_location(site_no):
     """
     Monitoring Location view
@@ -128,74 +275,48 @@ def monitoring_location(site_no):
         if len(site_data) == 1:
             unique_site = site_data[0]
 
-            _, _, period_of_record = site_service.get_period_of_record(site_no, agency_cd)
-            iv_period_of_record = get_period_of_record_by_parm_cd(period_of_record, 'uv')
-            gw_period_of_record = get_period_of_record_by_parm_cd(period_of_record, 'gw') if app.config[
-                'GROUNDWATER_LEVELS_ENABLED'] else {}
-            site_dataseries = [
-                get_disambiguated_values(
-                    param_datum,
-                    app.config['NWIS_CODE_LOOKUP'],
-                    {},
-                    app.config['HUC_LOOKUP']
-                )
-                for param_datum in period_of_record
-            ]
-            grouped_dataseries = rollup_dataseries(site_dataseries)
-            available_parameter_codes = set(param_datum['parm_cd'] for param_datum in period_of_record)
-            available_data_types = set(param_datum['data_type_cd'] for param_datum in period_of_record)
-
-            json_ld = build_linked_data(
-                site_no,
-                unique_site.get('station_nm'),
-                unique_site.get('agency_cd'),
-                unique_site.get('dec_lat_va', ''),
-                unique_site.get('dec_long_va', ''),
-                available_parameter_codes
-            )
-            location_with_values = get_disambiguated_values(
-                unique_site,
-                app.config['NWIS_CODE_LOOKUP'],
-                app.config['COUNTRY_STATE_COUNTY_LOOKUP'],
-                app.config['HUC_LOOKUP']
-            )
-            try:
-                site_owner_state = (
-                    location_with_values['district_cd']['abbreviation']
-                    if location_with_values['district_cd']['abbreviation']
-                    else location_with_values['state_cd']['abbreviation']
-                )
-            except KeyError:
-                site_owner_state = None
-
-            cooperators = sifta_service.get_cooperators(site_no)
-
-            if site_owner_state is not None:
-                email_for_data_questions = \
-                    app.config['EMAIL_TARGET']['contact'].format(state_district_code=site_owner_state.lower())
-            else:
-                email_for_data_questions = app.config['EMAIL_TARGET']['report']
-
-            # Get the time zone for the location
-            time_zone = time_zone_service.get_iana_time_zone(unique_site.get('dec_lat_va', ''), unique_site.get('dec_long_va', ''))
+            # The remaining upstream calls are independent of each other so run them at the same time
+            fan_out = create_fan_out()
+            timeouts = app.config['FAN_OUT_TIMEOUTS']
+            fan_out.submit('period_of_record', site_service.get_period_of_record, site_no, agency_cd,
+                           fallback=(None, None, []), timeout=timeouts.get('period_of_record'))
+            fan_out.submit('cooperators', sifta_service.get, site_no,
+                           fallback=(None, None, []), timeout=timeouts.get('cooperators'))
+            fan_out.submit('time_zone', time_zone_service.get_iana_time_zone,
+                           unique_site.get('dec_lat_va', ''), unique_site.get('dec_long_va', ''),
+                           fallback=None, timeout=timeouts.get('time_zone'))
+            if app.config['MONITORING_LOCATION_CAMERA_ENABLED']:
+                fan_out.submit('cameras', get_monitoring_location_camera_details, site_no,
+                               fallback=[], timeout=timeouts.get('cameras'))
+
+            period_of_record_status, _, period_of_record = fan_out.result('period_of_record')
+            site_page_model = get_site_page_model(site_no, agency_cd, unique_site, period_of_record or [])
+            json_ld = site_page_model['json_ld']
+
+            cooperators_status, _, cooperators = fan_out.result('cooperators')
+            time_zone = fan_out.result('time_zone')
+            cameras = fan_out.result('cameras') if app.config['MONITORING_LOCATION_CAMERA_ENABLED'] else []
+            # A failed call leaves data out of the page, so it must not be cached. A 404 only means that
+            # the site has no data series or cooperators.
+            if fan_out.fallbacks or not {period_of_record_status, cooperators_status} <= {200, 404}:
+                skip_page_cache()
 
             context = {
                 'status_code': site_status,
                 'stations': site_data,
-                'location_with_values': location_with_values,
+                'location_with_values': site_page_model['location_with_values'],
                 'STATION_FIELDS_D': STATION_FIELDS_D,
                 'json_ld': Markup(json.dumps(json_ld, indent=4)),
-                'available_data_types': available_data_types,
+                'available_data_types': site_page_model['available_data_types'],
                 'time_zone': time_zone if time_zone else 'local',
-                'iv_period_of_record': iv_period_of_record,
-                'gw_period_of_record': gw_period_of_record,
-                'default_parameter_code': get_default_parameter_code(iv_period_of_record, gw_period_of_record),
-                'parm_grp_summary': grouped_dataseries,
+                'iv_period_of_record': site_page_model['iv_period_of_record'],
+                'gw_period_of_record': site_page_model['gw_period_of_record'],
+                'default_parameter_code': site_page_model['default_parameter_code'],
+                'parm_grp_summary': site_page_model['parm_grp_summary'],
                 'cooperators': cooperators,
-                'email_for_data_questions': email_for_data_questions,
+                'email_for_data_questions': site_page_model['email_for_data_questions'],
                 'referring_page_type': 'monitoring',
-                'cameras': get_monitoring_location_camera_details(site_no) if app.config[
-                    'MONITORING_LOCATION_CAMERA_ENABLED'] else []
+                'cameras': cameras
             }
 
         http_code = 200
@@ -216,11 +337,148 @@ def monitoring_location(site_no):
         # mimetype would require changing the app's JSONIFY_MIMETYPE,
         # which defaults to application/json... didn't really want to change that
         return app.response_class(json.dumps(json_ld), status=http_code, mimetype='application/ld+json')
-    # At this point 'resp' is not a full response object in the Flask world.
-    # In order to set a cookie to the 'resp', we need to have the full response object, so let's create that here
-    full_function_response_object = make_response(render_template(template, **context), http_code)
-    set_cookie_for_banner_message(full_function_response_object)
-    return full_function_response_object
+    return render_template(template, **context), http_code
+
+
+@app.route('/hide-banner-notices/', methods=['GET'])
+def hide_banner_notices():
+    """
+    Sets the cookie which hides the banner notices. The monitoring location page sets it with a script, so
+    that the page itself can be cached, and requests this from a noscript image for browsers without
+    JavaScript.
+    """
+    response = app.response_class(status=204)
+    if app.config['SET_COOKIE_TO_HIDE_BANNER_NOTICES']:
+        response.set_cookie('no-show-banner-message', 'no-show', max_age=60*60*24*30)
+    response.cache_control.no_store = True
+    return response
+
+
+def _with_iso_dates(value):
+    """
+    Return value with the dates in its dicts and lists replaced by ISO 8601 date strings.
+    """
+    if isinstance(value, dict):
+        return {key: _with_iso_dates(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_with_iso_dates(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+@app.route('/api/v1/monitoring-location/<site_no>/', methods=['GET'])
+@cached_page()
+def monitoring_location_summary(site_no):
+    """
+    Returns the data series summary shown on the monitoring location page as JSON: the parameter group
+    rollup, the iv and gw periods of record, the default parameter code and the available data types.
+
+    :param site_no: USGS site number
+    """
+    agency_cd = request.args.get('agency_cd', '')
+    site_status, site_status_reason, site_data = site_service.get_site_data(site_no, agency_cd)
+    if 400 <= site_status < 500:
+        # Only a site which the service did not find may be cached as not found
+        if site_status != 404:
+            skip_page_cache()
+        return jsonify({'error': site_status_reason}), 404
+    if site_status != 200:
+        skip_page_cache()
+        return jsonify({'error': 'Unable to retrieve the site'}), 503
+    if len(site_data) != 1:
+        return jsonify({
+            'error': 'More than one agency has a site with this number, use agency_cd to choose one',
+            'agency_cds': [site['agency_cd'] for site in site_data]
+        }), 400
+
+    period_of_record_status, _, period_of_record = site_service.get_period_of_record(site_no, agency_cd)
+    # A site without data series has no period of record, which the service reports as not found
+    if period_of_record_status == 404:
+        period_of_record = []
+    elif period_of_record_status != 200:
+        skip_page_cache()
+        return jsonify({'error': 'Unable to retrieve the period of record'}), 503
+    site_page_model = get_site_page_model(site_no, agency_cd, site_data[0], period_of_record)
+    return jsonify({
+        'site_no': site_no,
+        'agency_cd': site_data[0].get('agency_cd'),
+        'available_data_types': sorted(site_page_model['available_data_types']),
+        'iv_period_of_record': site_page_model['iv_period_of_record'],
+        'gw_period_of_record': site_page_model['gw_period_of_record'],
+        'default_parameter_code': site_page_model['default_parameter_code'],
+        'parm_grp_summary': _with_iso_dates(site_page_model['parm_grp_summary'])
+    })
+
+
+# Columns which monitoring location lists can be sorted by
+MONITORING_LOCATION_SORT_COLUMNS = ('site_no', 'station_nm', 'site_tp_cd')
+
+
+def render_monitoring_location_list(template, get_site_rows, **context):
+    """
+    Render a page containing a list of monitoring locations. By default one page of the sites is rendered,
+    using the page, page_size and sort query parameters. Sort is a column name, prefixed with '-' for
+    descending order. Pages past the last page or MONITORING_LOCATIONS_MAX_PAGE are not found. If the stream
+    query parameter is 'true', all of the sites are streamed from the service in their original order and
+    the page is streamed to the client as they are parsed.
+
+    :param str template: name of the template
+    :param callable get_site_rows: function returning the status, reason and named tuples representing the
+        sites, sorted by the optional sort_column and reverse arguments or streamed if the stream argument
+        is True, or None if there is no list, in which case the query parameters are ignored
+    :param context: remaining template context, which must include http_code
+    :return: response
+    """
+    http_code = context['http_code']
+    if get_site_rows is None:
+        # Without a list, as on the static pages, the page does not depend on the query parameters
+        return render_template(template, monitoring_locations=[], pagination=None, **context), http_code
+
+    if request.args.get('stream', '').lower() == 'true':
+        site_rows = get_site_rows(stream=True)[2]
+        first_row = next(site_rows, None)
+        context['monitoring_locations'] = itertools.chain([first_row], site_rows) if first_row else []
+        context['pagination'] = None
+        app.update_template_context(context)
+        stream = app.jinja_env.get_template(template).stream(context)
+        stream.enable_buffering(app.config['MONITORING_LOCATIONS_STREAM_BUFFER'])
+        return Response(stream_with_context(stream), status=http_code)
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    if page > app.config['MONITORING_LOCATIONS_MAX_PAGE']:
+        abort(404)
+    page_size = min(max(request.args.get('page_size', app.config['MONITORING_LOCATIONS_PAGE_SIZE'], type=int), 1),
+                    app.config['MONITORING_LOCATIONS_MAX_PAGE_SIZE'])
+    sort = request.args.get('sort', '')
+    if sort.lstrip('-') not in MONITORING_LOCATION_SORT_COLUMNS:
+        sort = ''
+    _, _, site_rows = get_site_rows(sort_column=sort.lstrip('-') or None, reverse=sort.startswith('-'))
+    monitoring_locations, total = paginate(site_rows, page, page_size)
+    page_count = max((total + page_size - 1) // page_size, 1)
+    if page > page_count:
+        abort(404)
+
+    def page_url(page_number, page_sort):
+        return url_for(request.endpoint, page=page_number, page_size=page_size, sort=page_sort or None,
+                       **request.view_args)
+
+    context['monitoring_locations'] = monitoring_locations
+    context['pagination'] = {
+        'page': page,
+        'page_count': page_count,
+        'total': total,
+        'first': (page - 1) * page_size + 1,
+        'last': (page - 1) * page_size + len(monitoring_locations),
+        'previous_url': page_url(page - 1, sort) if page > 1 else None,
+        'next_url': page_url(page + 1, sort) if page < page_count else None,
+        # Selecting the current sort column again reverses the order
+        'sort_urls': {
+            column: page_url(1, f'-{column}' if sort == column else column)
+            for column in MONITORING_LOCATION_SORT_COLUMNS
+        }
+    }
+    return render_template(template, **context), http_code
 
 
 def return_404():
@@ -228,23 +486,20 @@ def return_404():
     return abort(404)
 
 
-@app.route('/hydrological-unit/', defaults={'huc_cd': None}, methods=['GET'])
-@app.route('/hydrological-unit/<huc_cd>/', methods=['GET'])
-@defined_when(app.config['HYDROLOGIC_PAGES_ENABLED'], return_404)
-def hydrological_unit(huc_cd, show_locations=False):
+def render_hydrological_unit(huc_cd, show_locations=False):
     """
-    Hydrological unit view
+    Render a hydrological unit page
     :param str huc_cd: ID for this unit
     :param bool show_locations:
     """
 
     # Get the data corresponding to this HUC
-    monitoring_locations = []
+    get_site_rows = None
     if huc_cd:
         huc = app.config['HUC_LOOKUP']['hucs'].get(huc_cd, None)
         # If this is a HUC8 site, get the monitoring locations within it.
         if huc and show_locations:
-            _, _, monitoring_locations = site_service.get_huc_sites(huc_cd)
+            get_site_rows = partial(site_service.get_huc_site_rows, huc_cd)
 
     # If we don't have a HUC, display all the root HUC2 units as children.
     else:
@@ -255,26 +510,47 @@ def hydrological_unit(huc_cd, show_locations=False):
 
     http_code = 200 if huc else 404
 
-    return render_template(
+    return render_monitoring_location_list(
         'hydrological_unit.html',
+        get_site_rows,
         http_code=http_code,
         huc=huc,
-        monitoring_locations=monitoring_locations,
         show_locations_link=not show_locations and huc and huc.get('kind') == 'HUC8'
-    ), http_code
+    )
+
+
+def list_hydrological_units():
+    """
+    Returns the URL arguments of every hydrological unit page
+    """
+    return [{'huc_cd': None}] + [{'huc_cd': huc_cd} for huc_cd in app.config['HUC_LOOKUP']['hucs']]
+
+
+@app.route('/hydrological-unit/', defaults={'huc_cd': None}, methods=['GET'])
+@app.route('/hydrological-unit/<huc_cd>/', methods=['GET'])
+@defined_when(app.config['HYDROLOGIC_PAGES_ENABLED'], return_404)
+@static_page(list_hydrological_units)
+def hydrological_unit(huc_cd):
+    """
+    Hydrological unit view. The page only depends on the HUC lookup, so it is a static page.
+    :param str huc_cd: ID for this unit
+    """
+    return render_hydrological_unit(huc_cd)
 
 
 @app.route('/hydrological-unit/<huc_cd>/monitoring-locations/', methods=['GET'])
 @defined_when(app.config['HYDROLOGIC_PAGES_ENABLED'], return_404)
+@cached_page(vary=('Cookie',))
 def hydrological_unit_locations(huc_cd):
     """
     Returns a HUC page with a list of monitoring locations included.
     """
-    return hydrological_unit(huc_cd, show_locations=True)
+    return render_hydrological_unit(huc_cd, show_locations=True)
 
 
 @app.route('/networks/', defaults={'network_cd': ''}, methods=['GET'])
 @app.route('/networks/<network_cd>/', methods=['GET'])
+@cached_page(vary=('Cookie', 'User-Agent'))
 def networks(network_cd):
     """
     Networks view
@@ -312,20 +588,16 @@ def networks(network_cd):
     ), http_code
 
 
-@app.route('/states/', defaults={'state_cd': None, 'county_cd': None}, methods=['GET'])
-@app.route('/states/<state_cd>/', defaults={'county_cd': None}, methods=['GET'])
-@app.route('/states/<state_cd>/counties/<county_cd>/', methods=['GET'])
-@defined_when(app.config['STATE_COUNTY_PAGES_ENABLED'], return_404)
-def states_counties(state_cd, county_cd, show_locations=False):
+def render_states_counties(state_cd, county_cd, show_locations=False):
     """
-    State unit view
+    Render a state or county page
 
     :param state_cd: ID for this political unit - 'state'
     :param county_cd: ID for this political unit - 'county'
     :param bool show_locations:
     """
 
-    monitoring_locations = []
+    get_site_rows = None
     political_unit = {}
     # Get the data associated with this county
     if state_cd and county_cd:
@@ -333,7 +605,7 @@ def states_counties(state_cd, county_cd, show_locations=False):
         political_unit = app.config['COUNTRY_STATE_COUNTY_LOOKUP']['US']['state_cd'].get(state_cd, None)['county_cd']\
             .get(county_cd, None)
         if show_locations:
-            _, _, monitoring_locations = site_service.get_county_sites(state_county_cd)
+            get_site_rows = partial(site_service.get_county_site_rows, state_county_cd)
 
     # Get the data corresponding to this state
     elif state_cd and not county_cd:
@@ -348,24 +620,52 @@ def states_counties(state_cd, county_cd, show_locations=False):
 
     http_code = 200 if political_unit else 404
 
-    return render_template(
+    return render_monitoring_location_list(
         'states_counties.html',
+        get_site_rows,
         http_code=http_code,
         state_cd=state_cd,
         county_cd=county_cd,
         political_unit=political_unit,
-        monitoring_locations=monitoring_locations,
         show_locations_link=not show_locations and political_unit and county_cd
-    ), http_code
+    )
+
+
+def list_states_counties():
+    """
+    Returns the URL arguments of every state and county page
+    """
+    states = app.config['COUNTRY_STATE_COUNTY_LOOKUP']['US']['state_cd']
+    view_args = [{'state_cd': None, 'county_cd': None}]
+    for state_cd, state in states.items():
+        view_args.append({'state_cd': state_cd, 'county_cd': None})
+        view_args.extend({'state_cd': state_cd, 'county_cd': county_cd} for county_cd in state.get('county_cd', {}))
+    return view_args
+
+
+@app.route('/states/', defaults={'state_cd': None, 'county_cd': None}, methods=['GET'])
+@app.route('/states/<state_cd>/', defaults={'county_cd': None}, methods=['GET'])
+@app.route('/states/<state_cd>/counties/<county_cd>/', methods=['GET'])
+@defined_when(app.config['STATE_COUNTY_PAGES_ENABLED'], return_404)
+@static_page(list_states_counties)
+def states_counties(state_cd, county_cd):
+    """
+    State unit view. The page only depends on the state and county lookup, so it is a static page.
+
+    :param state_cd: ID for this political unit - 'state'
+    :param county_cd: ID for this political unit - 'county'
+    """
+    return render_states_counties(state_cd, county_cd)
 
 
 @app.route('/states/<state_cd>/counties/<county_cd>/monitoring-locations/', methods=['GET'])
 @defined_when(app.config['STATE_COUNTY_PAGES_ENABLED'], return_404)
+@cached_page(vary=('Cookie',))
 def county_station_locations(state_cd, county_cd):
     """
     Returns a page listing monitoring locations within a county.
     """
-    return states_counties(state_cd, county_cd, show_locations=True)
+    return render_states_counties(state_cd, county_cd, show_locations=True)
 
 
 @app.route('/components/time-series/<site_no>/', methods=['GET'])
@@ -375,3 +675,54 @@ def time_series_component(site_no):
     Returns an unadorned page with the time series component for a site.
     """
     return render_template('monitoring_location_embed.html', site_no=site_no)
+
+
+@app.route('/api/sites/', methods=['GET'])
+def sites_api():
+    """
+    Returns the metadata of the sites in the site_no query parameters as JSON, along with their periods of
+    record if the period_of_record query parameter is true. A site_no parameter may be a comma separated
+    list of site numbers. The sites are requested SITE_SERVICE_BATCH_SIZE at a time, concurrently.
+    """
+    site_nos = list(dict.fromkeys(
+        site_no.strip() for value in request.args.getlist('site_no') for site_no in value.split(',') if site_no.strip()
+    ))
+    if not site_nos:
+        return jsonify({'error': 'At least one site_no is required'}), 400
+    if len(site_nos) > app.config['SITES_API_MAX_SITES']:
+        return jsonify({'error': f'At most {app.config["SITES_API_MAX_SITES"]} sites can be requested at once'}), 400
+
+    agency_cd = request.args.get('agency_cd', '')
+    batch_options = {'chunk_size': app.config['SITE_SERVICE_BATCH_SIZE'], 'executor': get_executor()}
+    site_data, failed = site_service.get_sites_data(site_nos, agency_cd, **batch_options)
+    sites = {site_no: {'site_data': rows} for site_no, rows in site_data.items() if rows}
+    if request.args.get('period_of_record', '').lower() == 'true' and sites:
+        period_of_record, period_of_record_failed = \
+            site_service.get_sites_period_of_record(list(sites), agency_cd, **batch_options)
+        for site_no, rows in period_of_record.items():
+            sites[site_no]['period_of_record'] = rows
+        failed.extend(period_of_record_failed)
+
+    # The sites in failed requests are missing from the response, so it must not be cached
+    if failed:
+        skip_page_cache()
+    http_code = 503 if failed and not sites else 200
+    return jsonify({
+        'sites': sites,
+        'not_found': [site_no for site_no in site_nos if site_no not in sites and site_no not in failed],
+        'failed': list(dict.fromkeys(failed))
+    }), http_code
+
+
+@app.route('/metrics/', methods=['GET'])
+@defined_when(app.config['METRICS_ENABLED'], return_404)
+def metrics():
+    """
+    Returns cache and HTTP connection pool statistics for the worker which handles the request as JSON.
+    """
+    return jsonify({
+        'pid': os.getpid(),
+        'caches': get_cache_stats(),
+        'cache_backends': get_cache_backend_stats(),
+        'http_pools': get_http_client_stats()
+    })
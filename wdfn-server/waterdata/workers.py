@@ -0,0 +1,97 @@
+"""
+Support for loading the application once in the gunicorn master process and forking the workers from it
+(gunicorn's preload_app setting).
+
+Anything that must not be shared between processes, such as HTTP sessions and thread pools, registers a
+post fork hook with post_fork. gunicorn.conf.py calls prepare_fork in the master once the application has
+been loaded and init_worker in each worker after it is forked.
+
+Workers may also be gevent workers (GUNICORN_WORKER_CLASS=gevent), in which case is_cooperative is True.
+"""
+import gc
+import os
+import sys
+import threading
+
+_post_fork_hooks = []
+
+
+def post_fork(func):
+    """
+    Decorator which registers func to be called with no arguments in each worker after it is forked.
+    Hooks are called in the order they are registered.
+
+    :param callable func:
+    :return: func
+    """
+    _post_fork_hooks.append(func)
+    return func
+
+
+def prepare_fork():
+    """
+    Move every object tracked by the garbage collector into the permanent generation so that collections
+    in the workers never write to the memory pages holding them. Those pages, including the parsed lookups,
+    then stay shared with the master rather than being copied into each worker.
+
+    :return: number of frozen objects
+    :rtype: int
+    """
+    gc.collect()
+    gc.freeze()
+    gc.enable()
+    return gc.get_freeze_count()
+
+
+def init_worker():
+    """
+    Run the post fork hooks. Called in each worker after it is forked.
+    """
+    for hook in _post_fork_hooks:
+        hook()
+
+
+def is_cooperative():
+    """
+    :return: True if gevent has patched the standard library, so threads are greenlets and blocking network
+        I/O lets other requests run rather than blocking the worker
+    :rtype: bool
+    """
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+class WorkerLocal:
+    """
+    An object, such as a database connection, of which each thread of a process has its own, created on
+    first use. In a gevent worker, where threading.local would give every greenlet, and so every request,
+    its own, the object is shared by all of the greenlets of the process instead. The object must
+    therefore not be used across a point where a greenlet yields. A process forked from one which created
+    the object creates its own.
+    """
+
+    def __init__(self, factory):
+        """
+        :param callable factory: function with no arguments returning a new object
+        """
+        self.factory = factory
+        self._thread_local = threading.local()
+        self._process_value = None
+        self._process_pid = None
+
+    def get(self):
+        """
+        :return: the object of the current thread, or of the current process in a gevent worker
+        """
+        pid = os.getpid()
+        if is_cooperative():
+            if self._process_value is None or self._process_pid != pid:
+                self._process_value = self.factory()
+                self._process_pid = pid
+            return self._process_value
+        value = getattr(self._thread_local, 'value', None)
+        if value is None or self._thread_local.pid != pid:
+            value = self.factory()
+            self._thread_local.value = value
+            self._thread_local.pid = pid
+        return value